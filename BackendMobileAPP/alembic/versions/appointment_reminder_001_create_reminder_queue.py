@@ -0,0 +1,46 @@
+"""Create appointment reminder queue
+
+Revision ID: appointment_reminder_001
+Revises: appointment_slot_001
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'appointment_reminder_001'
+down_revision = 'appointment_slot_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('appointment_reminders',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('patient_email', sa.String(), nullable=True),
+        sa.Column('doctor_email', sa.String(), nullable=True),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['appointment_id'], ['public.appointments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('appointment_id', 'kind', name='uq_appointment_reminders_appointment_kind'),
+        schema='public'
+    )
+    op.create_index('ix_appointment_reminders_id', 'appointment_reminders', ['id'], schema='public')
+    op.create_index(
+        'ix_appointment_reminders_status_due_at', 'appointment_reminders', ['status', 'due_at'], schema='public'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_appointment_reminders_status_due_at', table_name='appointment_reminders', schema='public')
+    op.drop_index('ix_appointment_reminders_id', table_name='appointment_reminders', schema='public')
+    op.drop_table('appointment_reminders', schema='public')
@@ -0,0 +1,31 @@
+"""Unique scheduled appointment per doctor slot
+
+Revision ID: appointment_slot_001
+Revises: 94c659cab8aa, rewards_001
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'appointment_slot_001'
+down_revision = ('94c659cab8aa', 'rewards_001')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if the table already holds two scheduled bookings for one slot; cancel the duplicate first
+    op.create_index(
+        'uq_appointments_doctor_slot_scheduled',
+        'appointments',
+        ['doctor_id', 'date', 'start_time'],
+        unique=True,
+        schema='public',
+        postgresql_where=sa.text('status = 0')
+    )
+
+
+def downgrade():
+    op.drop_index('uq_appointments_doctor_slot_scheduled', table_name='appointments', schema='public')
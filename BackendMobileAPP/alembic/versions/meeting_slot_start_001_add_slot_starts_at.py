@@ -0,0 +1,118 @@
+"""Add a parsed slot start to meetings and index schedules on it
+
+Revision ID: meeting_slot_start_001
+Revises: razorpay_webhook_retry_001
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'meeting_slot_start_001'
+down_revision = 'razorpay_webhook_retry_001'
+branch_labels = None
+depends_on = None
+
+CLINIC_TIMEZONE = ZoneInfo(os.getenv("CLINIC_TIMEZONE", "Asia/Kolkata"))
+# Frozen copy of repository.meeting_repository.parse_slot_time's formats
+SLOT_TIME_FORMATS = ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %I:%M%p", "%Y-%m-%d %I %p", "%Y-%m-%d %I:%M:%S %p")
+
+OLD_INDEXES = {
+    'ix_meetings_doctor_name_slot_time': ['doctor_name', 'slot_time'],
+    'ix_meetings_customer_name_slot_time': ['customer_name', 'slot_time'],
+    'ix_meetings_status_slot_time': ['status', 'slot_time'],
+}
+NEW_INDEXES = {
+    'ix_meetings_doctor_name_slot_starts_at': ['doctor_name', 'slot_starts_at', 'id'],
+    'ix_meetings_customer_name_slot_starts_at': ['customer_name', 'slot_starts_at', 'id'],
+    'ix_meetings_status_slot_starts_at': ['status', 'slot_starts_at', 'id'],
+}
+
+
+def _parse(slot_time):
+    text = (slot_time or '').strip()
+    try:
+        starts_at = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in SLOT_TIME_FORMATS:
+            try:
+                return datetime.strptime(text.upper(), fmt)
+            except ValueError:
+                continue
+        return None
+    if starts_at.tzinfo is not None:
+        starts_at = starts_at.astimezone(CLINIC_TIMEZONE).replace(tzinfo=None)
+    return starts_at
+
+
+def _inspect(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        # Created later by create_tables() with the column and indexes already in place
+        return None, None
+    columns = {column['name'] for column in inspector.get_columns(table)}
+    indexes = {index['name'] for index in inspector.get_indexes(table)}
+    return columns, indexes
+
+
+def upgrade():
+    columns, indexes = _inspect('meetings')
+    if columns is None:
+        return
+
+    if 'slot_starts_at' not in columns:
+        op.add_column('meetings', sa.Column('slot_starts_at', sa.DateTime(), nullable=True))
+
+    # Backfill; slot times that cannot be read fall back to when the meeting was booked
+    bind = op.get_bind()
+    meetings = sa.table(
+        'meetings',
+        sa.column('id', sa.Integer),
+        sa.column('slot_time', sa.String),
+        sa.column('slot_starts_at', sa.DateTime),
+        sa.column('created_at', sa.DateTime),
+    )
+    rows = bind.execute(
+        sa.select(meetings.c.id, meetings.c.slot_time, meetings.c.created_at)
+        .where(meetings.c.slot_starts_at.is_(None))
+    ).all()
+    for row in rows:
+        starts_at = _parse(row.slot_time)
+        if starts_at is None:
+            created_at = row.created_at or datetime.now(CLINIC_TIMEZONE)
+            if isinstance(created_at, str):
+                created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is not None:
+                created_at = created_at.astimezone(CLINIC_TIMEZONE)
+            starts_at = created_at.replace(tzinfo=None)
+        bind.execute(meetings.update().where(meetings.c.id == row.id).values(slot_starts_at=starts_at))
+
+    if bind.dialect.name != 'sqlite':
+        op.alter_column('meetings', 'slot_starts_at', existing_type=sa.DateTime(), nullable=False)
+
+    for name in OLD_INDEXES:
+        if name in indexes:
+            op.drop_index(name, table_name='meetings')
+    for name, index_columns in NEW_INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'meetings', index_columns)
+
+
+def downgrade():
+    columns, indexes = _inspect('meetings')
+    if columns is None:
+        return
+
+    for name in NEW_INDEXES:
+        if name in indexes:
+            op.drop_index(name, table_name='meetings')
+    for name, index_columns in OLD_INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, 'meetings', index_columns)
+    if 'slot_starts_at' in columns:
+        op.drop_column('meetings', 'slot_starts_at')
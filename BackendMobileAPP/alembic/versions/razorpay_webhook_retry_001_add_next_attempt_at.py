@@ -0,0 +1,35 @@
+"""Add retry backoff to razorpay_webhook_events
+
+Revision ID: razorpay_webhook_retry_001
+Revises: appointment_reminder_001
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'razorpay_webhook_retry_001'
+down_revision = 'appointment_reminder_001'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        # Created later by create_tables() with the column already in place
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('razorpay_webhook_events')
+    if columns is not None and 'next_attempt_at' not in columns:
+        op.add_column('razorpay_webhook_events', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    columns = _columns('razorpay_webhook_events')
+    if columns is not None and 'next_attempt_at' in columns:
+        op.drop_column('razorpay_webhook_events', 'next_attempt_at')
@@ -63,6 +63,8 @@ class Settings(BaseSettings):
     SENDER_PASSWORD: str = os.getenv("SENDER_PASSWORD", "")
     SMTP_SERVER: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    # Largest roster accepted by POST /api/v1/consultation/meetings/bulk
+    CONSULTATION_BULK_MAX_MEETINGS: int = int(os.getenv("CONSULTATION_BULK_MAX_MEETINGS", "500"))
     
     # Jitsi Configuration
     JITSI_BASE_URL: str = os.getenv("JITSI_BASE_URL", "https://meet.jit.si")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
@@ -12,8 +12,10 @@ from dto.appointment_schema import (
 from models.user import User
 from repository.appointment_repo import WalkinAppointmentRepository
 from security.jwt import get_current_user
-from service.appointment_service import AppointmentService
+from service.appointment_service import AppointmentService, SlotUnavailableError
 from service.auth_service import AuthService
+from services.calendar_feeds import calendar_feed_service, make_feed_token
+from utils.calendar_http import calendar_response
 from utils.email_utils import send_appointment_details_email
 from dto.otp_dto import SendOTPRequest, VerifyOTPRequest
 
@@ -68,6 +70,15 @@ def create_appointment(
 
         return appointment_response['data']  # returning the DTO only
 
+    except SlotUnavailableError as e:
+        next_free = e.next_free_slot
+        raise HTTPException(status_code=409, detail={
+            "message": "Slot already booked",
+            "next_free_slot": {
+                "start_time": next_free[0].strftime("%H:%M"),
+                "end_time": next_free[1].strftime("%H:%M")
+            } if next_free else None
+        })
     except Exception as e:
         traceback.print_exc()
 
@@ -77,6 +88,32 @@ def create_appointment(
         raise HTTPException(status_code=500, detail="Error booking appointment")
 
 
+# 2b. Calendar download for the signed-in patient or doctor
+@router.get("/calendar.ics")
+def download_my_calendar(
+        request: Request,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+):
+    try:
+        feed = calendar_feed_service.get_feed(db, current_user.id)
+        return calendar_response(
+            request, feed, {"Content-Disposition": "attachment; filename=oliva-appointments.ics"}
+        )
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Error generating calendar")
+
+
+# 2c. Subscription URL for the signed-in user's calendar feed
+@router.get("/calendar-feed")
+def my_calendar_feed(
+        request: Request,
+        current_user: User = Depends(get_current_user)
+):
+    return {"url": str(request.url_for("calendar_feed", token=make_feed_token(current_user.id)))}
+
+
 # 3. Appointment History (Zenoti DB)
 @router.get("/history/{guest_id}", response_model=List[AppointmentShortOut])
 async def get_appointment_history(
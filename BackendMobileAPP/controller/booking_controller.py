@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException,Path,Query 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import httpx
 
@@ -8,7 +8,7 @@ from fastapi import Body
 import traceback
 import logging
 
-from database.session import get_db
+from database.async_session import get_async_db
 from dto.booking_schema import BookingResponse, BookingCreate, ReserveSlotRequest, \
     RescheduleBookingRequest
 from models.user import User
@@ -22,7 +22,7 @@ logger = logging.getLogger("uvicorn")
 @router.post("/create", response_model=BookingResponse)
 async def create_service_booking(
     payload: BookingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     try:
@@ -41,7 +41,7 @@ async def create_service_booking(
 async def get_available_slots(
     booking_id: str = Path(..., description="Zenoti booking ID"),
     check_future_day_availability: bool = Query(False, description="Check availability for future days"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     try:
@@ -61,7 +61,7 @@ async def get_available_slots(
 async def reserve_slot(
     booking_id: str = Path(..., description="Zenoti Booking ID"),
     payload: ReserveSlotRequest = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     try:
@@ -72,7 +72,7 @@ async def reserve_slot(
 @router.post("/{booking_id}/slots/confirm")
 async def confirm_booking(
     booking_id: str = Path(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     try:
@@ -86,7 +86,7 @@ async def confirm_booking(
 async def cancel_invoice(
     invoice_id: str = Path(..., description="Invoice ID to cancel"),
     comments: str = Query(..., description="Reason for cancellation"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     try:
@@ -101,7 +101,7 @@ async def cancel_invoice(
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.post("/reschedule")
-async def reschedule_service(payload: RescheduleBookingRequest, db: Session = Depends(get_db)):
+async def reschedule_service(payload: RescheduleBookingRequest, db: AsyncSession = Depends(get_async_db)):
     try:
         return await BookingService.reschedule_booking(payload, db)
     except HTTPException as e:
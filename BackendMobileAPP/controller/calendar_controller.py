@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from database.session import get_db
+from services.calendar_feeds import calendar_feed_service, parse_feed_token
+from utils.calendar_http import calendar_response
+
+router = APIRouter(prefix="/calendar", tags=["Calendar"])
+
+
+@router.get("/{token}.ics", name="calendar_feed")
+def calendar_feed(token: str, request: Request, db: Session = Depends(get_db)):
+    """Subscribable calendar for the token's user; answers 304 when unchanged"""
+    user_id = parse_feed_token(token)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="Calendar not found")
+    return calendar_response(request, calendar_feed_service.get_feed(db, user_id))
@@ -1,21 +1,26 @@
+from datetime import date
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List, Optional
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
 from dto.meeting_schema import (
     CreateMeetingRequest, 
     MeetingResponse, 
     EmailResponse,
     ErrorResponse,
-    MeetingListResponse
+    MeetingListResponse,
+    BulkCreateMeetingRequest,
+    BulkMeetingResponse
 )
 from service.consultation_service import ConsultationService
-from repository.meeting_repository import get_meeting_repository
+from repository.meeting_repository import MeetingRepository, get_meeting_repository
 
 router = APIRouter(prefix="/api/v1/consultation", tags=["consultation"])
 
 # Dependency injection
-def get_consultation_service() -> ConsultationService:
+def get_consultation_service(
+    repository: MeetingRepository = Depends(get_meeting_repository)
+) -> ConsultationService:
     """Dependency to get consultation service instance"""
-    repository = get_meeting_repository()
     return ConsultationService(repository)
 
 @router.get("/", response_model=dict)
@@ -81,6 +86,27 @@ async def send_meeting_email(
             detail=f"Internal server error: {str(e)}"
         )
 
+@router.post(
+    "/meetings/bulk",
+    response_model=BulkMeetingResponse,
+    responses={
+        500: {"model": ErrorResponse, "description": "Internal Server Error"}
+    }
+)
+async def create_meetings_bulk(
+    request: BulkCreateMeetingRequest,
+    consultation_service: ConsultationService = Depends(get_consultation_service)
+):
+    """Create a roster of meetings in one request and queue their invitation emails"""
+    try:
+        return await consultation_service.create_meetings_bulk(request)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+
 @router.get(
     "/meeting/{meeting_id}",
     response_model=MeetingResponse,
@@ -113,20 +139,32 @@ async def get_meeting(
 
 @router.get(
     "/meetings/customer/{customer_name}",
-    response_model=List[MeetingResponse],
+    response_model=MeetingListResponse,
     responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"}
     }
 )
 async def get_meetings_by_customer(
     customer_name: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Meetings per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    date_from: Optional[date] = Query(None, description="First slot date to include"),
+    date_to: Optional[date] = Query(None, description="Last slot date to include"),
     consultation_service: ConsultationService = Depends(get_consultation_service)
 ):
-    """Get all meetings for a specific customer"""
+    """Get a specific customer's meetings in slot order, one keyset page at a time"""
     try:
-        meetings = await consultation_service.get_meetings_by_customer(customer_name)
-        return meetings
+        meetings, next_cursor = await consultation_service.get_meetings_by_customer(
+            customer_name, cursor, limit, date_from, date_to
+        )
+        return MeetingListResponse(meetings=meetings, total=len(meetings), next_cursor=next_cursor)
         
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -135,20 +173,32 @@ async def get_meetings_by_customer(
 
 @router.get(
     "/meetings/doctor/{doctor_name}",
-    response_model=List[MeetingResponse],
+    response_model=MeetingListResponse,
     responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"}
     }
 )
 async def get_meetings_by_doctor(
     doctor_name: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Meetings per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    date_from: Optional[date] = Query(None, description="First slot date to include"),
+    date_to: Optional[date] = Query(None, description="Last slot date to include"),
     consultation_service: ConsultationService = Depends(get_consultation_service)
 ):
-    """Get all meetings for a specific doctor"""
+    """Get a specific doctor's meetings in slot order, one keyset page at a time"""
     try:
-        meetings = await consultation_service.get_meetings_by_doctor(doctor_name)
-        return meetings
+        meetings, next_cursor = await consultation_service.get_meetings_by_doctor(
+            doctor_name, cursor, limit, date_from, date_to
+        )
+        return MeetingListResponse(meetings=meetings, total=len(meetings), next_cursor=next_cursor)
         
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -159,19 +209,32 @@ async def get_meetings_by_doctor(
     "/meetings",
     response_model=MeetingListResponse,
     responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"}
     }
 )
 async def get_all_meetings(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Meetings per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    meeting_status: Optional[str] = Query(
+        None, alias="status", pattern="^(active|completed|cancelled)$", description="Only meetings in this status"
+    ),
+    date_from: Optional[date] = Query(None, description="First slot date to include"),
+    date_to: Optional[date] = Query(None, description="Last slot date to include"),
     consultation_service: ConsultationService = Depends(get_consultation_service)
 ):
-    """Get all meetings with pagination"""
+    """Get meetings in slot order, one keyset page at a time"""
     try:
-        meetings = await consultation_service.get_all_meetings(skip, limit)
-        return MeetingListResponse(meetings=meetings, total=len(meetings))
+        meetings, next_cursor = await consultation_service.get_all_meetings(
+            cursor, limit, meeting_status, date_from, date_to
+        )
+        return MeetingListResponse(meetings=meetings, total=len(meetings), next_cursor=next_cursor)
         
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Request, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, status, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from database.connection import get_db
-from models.order_models import PaymentTransaction, PaymentStatus, PaymentMethod
-from service.payment_service import get_payment_token, create_payment_link, create_shopify_order
+from database.routing import replica_reads
+from database.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, csv_lines, date_range_filters,
+    iter_keyset, keyset_page, ndjson_lines
+)
+from models.order_models import Order, PaymentReconciliationRun, PaymentTransaction, PaymentStatus, PaymentMethod
+from service.payment_service import create_payment_link_async
+from services.payment_reconciliation import ReconciliationInProgressError, payment_reconciler
+from services.razorpay_webhooks import event_id_for, ingest_webhook_event, razorpay_webhook_processor
+from starlette.concurrency import run_in_threadpool
 from utils.razorpay_utils import validate_razorpay_signature
 import hmac
 import hashlib
 import os
-from datetime import datetime
+from datetime import date, datetime
 import uuid
 
 router = APIRouter()
@@ -21,9 +30,8 @@ async def create_payment(request: Request, db: Session = Depends(get_db)):
     try:
         payload = await request.json()
         
-        # Generate payment token and link
-        token = get_payment_token()
-        payment_response = create_payment_link(token, payload)
+        # Generate payment link (the gateway token is cached until it expires)
+        payment_response = await create_payment_link_async(payload)
         
         # Generate unique transaction ID
         transaction_id = f"TXN-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
@@ -57,65 +65,100 @@ async def create_payment(request: Request, db: Session = Depends(get_db)):
 
 @router.post("/webhook")
 async def razorpay_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Razorpay webhook and update payment status"""
+    """Store a Razorpay webhook event and acknowledge; payment updates are applied in the background"""
+    data = await request.body()
+    received_signature = request.headers.get('X-Razorpay-Signature')
+    
+    if not validate_razorpay_signature(data, received_signature or "", RAZORPAY_WEBHOOK_SECRET):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Signature mismatch")
+    
+    event_id = event_id_for(data, request.headers.get('X-Razorpay-Event-Id'))
     try:
-        data = await request.body()
-        received_signature = request.headers.get('X-Razorpay-Signature')
-        
-        if not validate_razorpay_signature(data, received_signature, RAZORPAY_WEBHOOK_SECRET):
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Signature mismatch")
-        
-        payload = await request.json()
-        
-        # Update payment transaction status
-        gateway_transaction_id = payload.get('payload', {}).get('payment', {}).get('entity', {}).get('id')
-        
-        if gateway_transaction_id:
-            payment_transaction = db.query(PaymentTransaction).filter(
-                PaymentTransaction.gateway_transaction_id == gateway_transaction_id
-            ).first()
-            
-            if payment_transaction:
-                payment_transaction.status = PaymentStatus.PAID
-                payment_transaction.gateway_response = payload
-                payment_transaction.updated_at = datetime.utcnow()
-                db.commit()
-        
-        # Create Shopify order
-        shopify_status, shopify_response = create_shopify_order(payload)
-        
-        return JSONResponse(content={
-            "shopify_status": shopify_status, 
-            "shopify_response": shopify_response,
-            "payment_updated": payment_transaction is not None
-        })
-        
+        accepted = await run_in_threadpool(ingest_webhook_event, db, event_id, data)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
+    
+    if accepted:
+        razorpay_webhook_processor.notify()
+    return JSONResponse(content={"status": "accepted", "event_id": event_id, "duplicate": not accepted})
+
+TRANSACTION_EXPORT_FIELDS = [
+    "transaction_id", "order_id", "payment_method", "amount", "status", "created_at", "gateway_transaction_id"
+]
+
+def _transaction_summary(t: PaymentTransaction) -> dict:
+    return {
+        "transaction_id": t.transaction_id,
+        "order_id": t.order_id,
+        "payment_method": t.payment_method.value if t.payment_method else None,
+        "amount": float(t.amount) if t.amount else 0,
+        "status": t.status.value if t.status else None,
+        "created_at": t.created_at.isoformat() if t.created_at else None,
+        "gateway_transaction_id": t.gateway_transaction_id
+    }
+
+def _filtered_transactions(db: Session, status: Optional[List[PaymentStatus]], customer_id: Optional[str],
+                           date_from: Optional[date], date_to: Optional[date]):
+    query = db.query(PaymentTransaction)
+    if status:
+        query = query.filter(PaymentTransaction.status.in_(status))
+    if customer_id:
+        # Served by ix_orders_customer_created_at_id + ix_payment_transactions_order_created_at_id
+        query = query.join(Order, PaymentTransaction.order_id == Order.id).filter(Order.customer_id == customer_id)
+    return query.filter(*date_range_filters(PaymentTransaction.created_at, date_from, date_to))
 
 @router.get("/transactions")
-async def get_payment_transactions(db: Session = Depends(get_db)):
-    """Get all payment transactions"""
+async def get_payment_transactions(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[List[PaymentStatus]] = Query(None),
+    customer_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Get payment transactions, newest first, one keyset page at a time"""
     try:
-        transactions = db.query(PaymentTransaction).order_by(PaymentTransaction.created_at.desc()).all()
+        with replica_reads(db):
+            transactions, next_cursor = keyset_page(
+                _filtered_transactions(db, status, customer_id, date_from, date_to),
+                PaymentTransaction.created_at, PaymentTransaction.id, cursor, limit
+            )
         return {
             "success": True,
-            "transactions": [
-                {
-                    "transaction_id": t.transaction_id,
-                    "payment_method": t.payment_method.value if t.payment_method else None,
-                    "amount": float(t.amount) if t.amount else 0,
-                    "status": t.status.value if t.status else None,
-                    "created_at": t.created_at.isoformat() if t.created_at else None,
-                    "gateway_transaction_id": t.gateway_transaction_id
-                }
-                for t in transactions
-            ]
+            "transactions": [_transaction_summary(t) for t in transactions],
+            "next_cursor": next_cursor
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch transactions: {str(e)}")
 
+@router.get("/transactions/export")
+def export_payment_transactions(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[List[PaymentStatus]] = Query(None),
+    customer_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Stream matching payment transactions as NDJSON or CSV for reconciliation"""
+    rows = iter_keyset(
+        _filtered_transactions(db, status, customer_id, date_from, date_to),
+        PaymentTransaction.created_at, PaymentTransaction.id, around_batch=lambda: replica_reads(db)
+    )
+    records = (_transaction_summary(t) for t in rows)
+    if format == "csv":
+        return StreamingResponse(
+            csv_lines(records, TRANSACTION_EXPORT_FIELDS), media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=payment_transactions.csv"}
+        )
+    return StreamingResponse(ndjson_lines(records), media_type="application/x-ndjson")
+
 @router.get("/transactions/{transaction_id}")
 async def get_payment_transaction(transaction_id: str, db: Session = Depends(get_db)):
     """Get specific payment transaction"""
@@ -143,4 +186,40 @@ async def get_payment_transaction(transaction_id: str, db: Session = Depends(get
             }
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch transaction: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to fetch transaction: {str(e)}")
+
+@router.post("/reconciliation/runs")
+async def start_payment_reconciliation(
+    background_tasks: BackgroundTasks,
+    apply_fixes: bool = True,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Reconcile payment transactions against the gateway in the background"""
+    try:
+        run = payment_reconciler.start_run(db, apply_fixes=apply_fixes, date_from=date_from, date_to=date_to)
+    except ReconciliationInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    background_tasks.add_task(payment_reconciler.run, run.id)
+    return {"success": True, "run": payment_reconciler.run_summary(run)}
+
+@router.get("/reconciliation/runs/{run_id}")
+async def get_payment_reconciliation_run(
+    run_id: int,
+    kind: Optional[str] = None,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """Run progress plus one page of its mismatch report (pass the last id as after_id)"""
+    run = db.get(PaymentReconciliationRun, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Reconciliation run not found")
+    mismatches = payment_reconciler.mismatches(db, run_id, kind=kind, after_id=after_id, limit=limit)
+    return {
+        "success": True,
+        "run": payment_reconciler.run_summary(run),
+        "mismatches": mismatches,
+        "next_after_id": mismatches[-1]["id"] if len(mismatches) == limit else None
+    }
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import datetime
 
 from database.session import get_db
+from database.async_session import get_async_db
+from repository.rewards_repository import AsyncRewardsRepository
 from models.user import User
-from security.jwt import get_current_user
+from security.jwt import get_current_user, get_current_user_async
 from service.rewards_engine_service import RewardsEngineService
 from dto.rewards_schema import (
     UIContentRequest, UIContentResponse, BaseResponse, PaginatedResponse,
@@ -249,15 +252,14 @@ async def get_advertisements(
     section_type: Optional[SectionType] = Query(None),
     audience_type: Optional[AudienceType] = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get advertisements with filtering and pagination
     """
     try:
-        from repository.rewards_repository import RewardsRepository
-        repo = RewardsRepository(db)
+        repo = AsyncRewardsRepository(db)
         
         filter_data = AdFilter(
             page=page_type,
@@ -266,7 +268,7 @@ async def get_advertisements(
             is_active=is_active
         )
         
-        ads, total = repo.get_advertisements_by_filter(filter_data, page, size)
+        ads, total = await repo.get_advertisements_by_filter(filter_data, page, size)
         
         total_pages = (total + size - 1) // size
         
@@ -316,17 +318,16 @@ async def update_advertisement(
 @router.post("/advertisements/{ad_id}/increment-views")
 async def increment_ad_views(
     ad_id: int = Path(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Increment advertisement view count
     """
     try:
-        from repository.rewards_repository import RewardsRepository
-        repo = RewardsRepository(db)
+        repo = AsyncRewardsRepository(db)
         
-        success = repo.increment_ad_views(ad_id)
+        success = await repo.increment_ad_views(ad_id)
         if not success:
             raise HTTPException(status_code=404, detail="Advertisement not found")
         
@@ -341,17 +342,16 @@ async def increment_ad_views(
 @router.post("/advertisements/{ad_id}/increment-clicks")
 async def increment_ad_clicks(
     ad_id: int = Path(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Increment advertisement click count
     """
     try:
-        from repository.rewards_repository import RewardsRepository
-        repo = RewardsRepository(db)
+        repo = AsyncRewardsRepository(db)
         
-        success = repo.increment_ad_clicks(ad_id)
+        success = await repo.increment_ad_clicks(ad_id)
         if not success:
             raise HTTPException(status_code=404, detail="Advertisement not found")
         
@@ -397,15 +397,14 @@ async def get_rewards(
     section_type: Optional[SectionType] = Query(None),
     audience_type: Optional[AudienceType] = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get rewards with filtering and pagination
     """
     try:
-        from repository.rewards_repository import RewardsRepository
-        repo = RewardsRepository(db)
+        repo = AsyncRewardsRepository(db)
         
         filter_data = RewardFilter(
             page=page_type,
@@ -414,7 +413,7 @@ async def get_rewards(
             is_active=is_active
         )
         
-        rewards, total = repo.get_rewards_by_filter(filter_data, page, size)
+        rewards, total = await repo.get_rewards_by_filter(filter_data, page, size)
         
         total_pages = (total + size - 1) // size
         
@@ -496,15 +495,14 @@ async def get_offers(
     audience_type: Optional[AudienceType] = Query(None),
     service_category: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get offers with filtering and pagination
     """
     try:
-        from repository.rewards_repository import RewardsRepository
-        repo = RewardsRepository(db)
+        repo = AsyncRewardsRepository(db)
         
         filter_data = OfferFilter(
             page=page_type,
@@ -514,7 +512,7 @@ async def get_offers(
             is_active=is_active
         )
         
-        offers, total = repo.get_offers_by_filter(filter_data, page, size)
+        offers, total = await repo.get_offers_by_filter(filter_data, page, size)
         
         total_pages = (total + size - 1) // size
         
@@ -591,17 +589,16 @@ async def create_personalized_reward(
 async def get_user_personalized_rewards(
     user_id: str = Path(...),
     unclaimed_only: bool = Query(True),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get personalized rewards for a user
     """
     try:
-        from repository.rewards_repository import RewardsRepository
-        repo = RewardsRepository(db)
+        repo = AsyncRewardsRepository(db)
         
-        rewards = repo.get_user_personalized_rewards(user_id, unclaimed_only)
+        rewards = await repo.get_user_personalized_rewards(user_id, unclaimed_only)
         return [PersonalizedRewardResponse.model_validate(reward) for reward in rewards]
     except Exception as e:
         logger.error(f"Error getting personalized rewards: {e}")
@@ -659,15 +656,14 @@ async def get_user_referrals(
 
 @router.get("/statistics/rewards", response_model=RewardStats)
 async def get_reward_statistics(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get reward system statistics
     """
     try:
-        rewards_service = RewardsEngineService(db)
-        stats = rewards_service.get_reward_statistics()
+        stats = await AsyncRewardsRepository(db).get_reward_statistics()
         return RewardStats(**stats)
     except Exception as e:
         logger.error(f"Error getting reward statistics: {e}")
@@ -1,28 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from database.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.async_session import get_async_db
+from repository.session_repository import AsyncSessionRepository
 from service.session_service import SessionService
 from typing import List
 from datetime import datetime
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
-@router.get("/my-sessions")
-async def get_my_sessions(request: Request, db: Session = Depends(get_db)):
-    """Get current user's active sessions."""
-    session_service = SessionService(db)
-    
-    # Get token from Authorization header
+
+async def _authenticate(request: Request, session_repo: AsyncSessionRepository):
+    """Resolve the bearer token and its user, raising 401 when either is invalid."""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization header")
     
     token = auth_header.split(" ")[1]
-    user = session_service.get_user_from_token(token)
+    payload = SessionService.validate_token(token)
+    user = await session_repo.get_user_by_username(payload.get("sub")) if payload and payload.get("sub") else None
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return token, user
+
+@router.get("/my-sessions")
+async def get_my_sessions(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get current user's active sessions."""
+    session_repo = AsyncSessionRepository(db)
+    token, user = await _authenticate(request, session_repo)
     
-    sessions = session_service.get_user_sessions(user.id)
+    sessions = await session_repo.get_user_sessions(user.id)
     return {
         "user_id": user.id,
         "sessions": [
@@ -40,21 +46,12 @@ async def get_my_sessions(request: Request, db: Session = Depends(get_db)):
     }
 
 @router.get("/my-session-logs")
-async def get_my_session_logs(request: Request, db: Session = Depends(get_db)):
+async def get_my_session_logs(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get current user's session logs."""
-    session_service = SessionService(db)
-    
-    # Get token from Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-    
-    token = auth_header.split(" ")[1]
-    user = session_service.get_user_from_token(token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    session_repo = AsyncSessionRepository(db)
+    token, user = await _authenticate(request, session_repo)
     
-    logs = session_service.get_user_session_logs(user.id)
+    logs = await session_repo.get_user_session_logs(user.id)
     return {
         "user_id": user.id,
         "logs": [
@@ -71,22 +68,13 @@ async def get_my_session_logs(request: Request, db: Session = Depends(get_db)):
     }
 
 @router.post("/logout")
-async def logout(request: Request, db: Session = Depends(get_db)):
+async def logout(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Logout current session."""
-    session_service = SessionService(db)
-    
-    # Get token from Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-    
-    token = auth_header.split(" ")[1]
-    user = session_service.get_user_from_token(token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    session_repo = AsyncSessionRepository(db)
+    token, user = await _authenticate(request, session_repo)
     
     # Deactivate current session
-    success = session_service.deactivate_session(
+    success = await session_repo.deactivate_session(
         token, 
         ip_address=request.client.host,
         user_agent=request.headers.get("User-Agent")
@@ -98,22 +86,13 @@ async def logout(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Session not found or already inactive")
 
 @router.post("/logout-all")
-async def logout_all_devices(request: Request, db: Session = Depends(get_db)):
+async def logout_all_devices(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Logout from all devices."""
-    session_service = SessionService(db)
-    
-    # Get token from Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-    
-    token = auth_header.split(" ")[1]
-    user = session_service.get_user_from_token(token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    session_repo = AsyncSessionRepository(db)
+    token, user = await _authenticate(request, session_repo)
     
     # Deactivate all sessions for user
-    count = session_service.deactivate_all_user_sessions(
+    count = await session_repo.deactivate_all_user_sessions(
         user.id,
         ip_address=request.client.host,
         user_agent=request.headers.get("User-Agent")
@@ -122,43 +101,25 @@ async def logout_all_devices(request: Request, db: Session = Depends(get_db)):
     return {"message": f"Successfully logged out from {count} devices"}
 
 @router.post("/refresh")
-async def refresh_session(request: Request, db: Session = Depends(get_db)):
+async def refresh_session(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Refresh current session activity."""
-    session_service = SessionService(db)
-    
-    # Get token from Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-    
-    token = auth_header.split(" ")[1]
-    user = session_service.get_user_from_token(token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    session_repo = AsyncSessionRepository(db)
+    token, user = await _authenticate(request, session_repo)
     
     # Update session activity
-    success = session_service.update_session_activity(token)
+    success = await session_repo.update_session_activity(token)
     if success:
         return {"message": "Session refreshed successfully"}
     else:
         raise HTTPException(status_code=400, detail="Session not found or expired")
 
 @router.get("/status")
-async def get_session_status(request: Request, db: Session = Depends(get_db)):
+async def get_session_status(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get current session status."""
-    session_service = SessionService(db)
-    
-    # Get token from Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-    
-    token = auth_header.split(" ")[1]
-    user = session_service.get_user_from_token(token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    session_repo = AsyncSessionRepository(db)
+    token, user = await _authenticate(request, session_repo)
     
-    session = session_service.get_active_session(token)
+    session = await session_repo.get_active_session(token)
     if session:
         return {
             "is_active": True,
@@ -0,0 +1,36 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.connection import (
+    DATABASE_REPLICA_URL, DATABASE_URL, DB_ECHO, DB_REPLICA_LAG_CHECK_INTERVAL, DB_REPLICA_MAX_LAG_SECONDS
+)
+from database.engine import create_async_db_engine
+from database.routing import ReplicaRouter, RoutingSession
+
+# Async engine for `async def` endpoints; shares the primary database with SessionLocal
+async_engine = create_async_db_engine(DATABASE_URL, "main_async", echo=DB_ECHO)
+
+# Async twin of the sync replica engine; reads inside replica_reads()/async_read_only go here.
+# The router holds the engine's sync facade, which is what the proxied RoutingSession binds to.
+async_replica_engine = (
+    create_async_db_engine(DATABASE_REPLICA_URL, "replica_async", echo=DB_ECHO) if DATABASE_REPLICA_URL else None
+)
+async_replica_router = ReplicaRouter(
+    async_replica_engine.sync_engine if async_replica_engine is not None else None,
+    max_lag_seconds=DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval_seconds=DB_REPLICA_LAG_CHECK_INTERVAL,
+)
+
+# expire_on_commit=False so returned ORM objects stay readable after commit without a lazy reload
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    info={"replica_router": async_replica_router},
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
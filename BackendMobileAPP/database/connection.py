@@ -1,10 +1,11 @@
 import os
 from dotenv import load_dotenv
 from logger import logger
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from config.logger_config import setup_color_logging
+from database.engine import create_db_engine
+from database.routing import ReplicaRouter, RoutingSession
 
 # Load environment variables from .env file early
 load_dotenv()
@@ -33,9 +34,40 @@ if not DATABASE_URL:
 logger.info(f"Database URL: {DATABASE_URL}")
 logger.info(f"DB_ECHO set to {DB_ECHO}")
 
-# Create SQLAlchemy engine for main app DB
-engine = create_engine(DATABASE_URL, echo=DB_ECHO)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create SQLAlchemy engine for main app DB (pool settings come from DB_POOL_* env vars)
+engine = create_db_engine(DATABASE_URL, "main", echo=DB_ECHO)
+
+# === Read Replica Configuration ===
+# Optional; when unset every read stays on the primary
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+try:
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+except ValueError:
+    logger.warning("Invalid DB_REPLICA_MAX_LAG_SECONDS, falling back to 5")
+    DB_REPLICA_MAX_LAG_SECONDS = 5.0
+
+try:
+    DB_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "5"))
+except ValueError:
+    logger.warning("Invalid DB_REPLICA_LAG_CHECK_INTERVAL, falling back to 5")
+    DB_REPLICA_LAG_CHECK_INTERVAL = 5.0
+
+replica_engine = create_db_engine(DATABASE_REPLICA_URL, "replica", echo=DB_ECHO) if DATABASE_REPLICA_URL else None
+replica_router = ReplicaRouter(
+    replica_engine,
+    max_lag_seconds=DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval_seconds=DB_REPLICA_LAG_CHECK_INTERVAL,
+)
+logger.info(f"Read replica {'enabled' if replica_router.enabled else 'disabled'}")
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    info={"replica_router": replica_router},
+)
 
 # === Zenoti DB Configuration ===
 ZENOTI_DATABASE_URL = os.getenv("ZENOTI_DATABASE_URL")
@@ -43,7 +75,7 @@ if not ZENOTI_DATABASE_URL:
     logger.error("ZENOTI_DATABASE_URL environment variable is required.")
     raise ValueError("Missing ZENOTI_DATABASE_URL")
 
-zenoti_engine = create_engine(ZENOTI_DATABASE_URL, echo=DB_ECHO)
+zenoti_engine = create_db_engine(ZENOTI_DATABASE_URL, "zenoti", echo=DB_ECHO)
 ZenotiSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=zenoti_engine)
 
 # === Setup colored logging (assuming your setup_color_logging function is solid) ===
@@ -96,6 +128,7 @@ except ValueError:
 
 logger.info(f"MAX_DATE_RANGE_DAYS set to {MAX_DATE_RANGE_DAYS}")
 
+from sqlalchemy import inspect
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -104,14 +137,23 @@ Base = declarative_base()
 def create_tables():
     # Create all tables including the order models
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes declared on them later
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name, schema=table.schema)}
+        for index in table.indexes:
+            missing = [column.name for column in index.columns if column.name not in existing]
+            if missing:
+                # The columns come with an alembic revision; the index follows once it has run
+                logger.warning(f"Skipping index {index.name}: {table.name} lacks {', '.join(missing)}, run alembic upgrade")
+                continue
+            index.create(bind=engine, checkfirst=True)
 
 
 def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Shares the request-scoped session opened by DBSessionMiddleware when present
+    from database.request_scope import scoped_db
+    yield from scoped_db(SessionLocal)
 
 
 def get_zenoti_db():
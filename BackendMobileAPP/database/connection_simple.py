@@ -1,7 +1,7 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from database.engine import create_db_engine
 
 # Load environment variables
 load_dotenv()
@@ -11,11 +11,11 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+psycopg2://mobileapp:123@lo
 ZENOTI_DATABASE_URL = os.getenv("ZENOTI_DATABASE_URL", DATABASE_URL)
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_db_engine(DATABASE_URL, "main_simple", echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Zenoti engine (using same database for now)
-zenoti_engine = create_engine(ZENOTI_DATABASE_URL, echo=False)
+zenoti_engine = create_db_engine(ZENOTI_DATABASE_URL, "zenoti_simple", echo=False)
 ZenotiSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=zenoti_engine)
 
 # Base class for models
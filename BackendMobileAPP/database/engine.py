@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from typing import Dict, Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+# === Pool Configuration ===
+# Total connections per process are DB_POOL_SIZE + DB_MAX_OVERFLOW; multiply by the
+# uvicorn worker count (WEB_CONCURRENCY) to stay below the server's max_connections.
+DB_POOL_SIZE = _int_env("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _int_env("DB_POOL_TIMEOUT", 30)  # seconds to wait for a free connection
+DB_POOL_RECYCLE = _int_env("DB_POOL_RECYCLE", 1800)  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "yes")
+DB_STATEMENT_TIMEOUT_MS = _int_env("DB_STATEMENT_TIMEOUT_MS", 30000)  # 0 disables
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "oliva-mobile-backend")
+DB_POOL_WAIT_WARN_MS = _int_env("DB_POOL_WAIT_WARN_MS", 500)
+WEB_CONCURRENCY = _int_env("WEB_CONCURRENCY", 1)
+
+
+class PoolMetrics:
+    """Checkout-wait and utilization counters for one connection pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.slow_checkouts = 0
+
+    def record_wait(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if wait_ms >= DB_POOL_WAIT_WARN_MS:
+                self.slow_checkouts += 1
+        if wait_ms >= DB_POOL_WAIT_WARN_MS:
+            logger.warning(f"[db-pool:{self.name}] connection checkout waited {wait_ms:.1f}ms")
+
+    def record_timeout(self, timeout: float):
+        with self._lock:
+            self.checkout_timeouts += 1
+        logger.error(f"[db-pool:{self.name}] connection checkout timed out after {timeout}s")
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.checkouts
+            stats = {
+                "checkouts": checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "avg_wait_ms": round(self.total_wait_ms / checkouts, 3) if checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+            }
+
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            stats.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+            })
+        return stats
+
+
+class _InstrumentedPoolMixin:
+    """Measures how long callers wait for a connection."""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics:
+                self.metrics.record_timeout(self._timeout)
+            raise
+        if self.metrics:
+            self.metrics.record_wait((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool that measures how long callers wait for a connection."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that measures how long callers wait for a connection."""
+
+
+_engine_metrics: Dict[str, PoolMetrics] = {}
+_engines: Dict[str, Engine] = {}
+
+
+def create_db_engine(url: str, name: str, echo: bool = False, **overrides) -> Engine:
+    """Create an engine with the shared pool, timeout and application_name settings."""
+    kwargs: Dict[str, Any] = {"echo": echo, "pool_pre_ping": DB_POOL_PRE_PING}
+    connect_args: Dict[str, Any] = {}
+
+    if not url.startswith("sqlite"):
+        kwargs.update({
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+        })
+
+    if url.startswith("postgresql"):
+        connect_args["application_name"] = f"{DB_APPLICATION_NAME}:{name}"
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+    kwargs.update(overrides)
+
+    engine = create_engine(url, **kwargs)
+    _register_engine(engine, name)
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync driver for its asyncio counterpart (psycopg2 -> asyncpg, pysqlite -> aiosqlite)."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+def create_async_db_engine(url: str, name: str, echo: bool = False, **overrides) -> AsyncEngine:
+    """Create an asyncio engine with the same pool sizing as create_db_engine."""
+    url = to_async_url(url)
+    kwargs: Dict[str, Any] = {"echo": echo, "pool_pre_ping": DB_POOL_PRE_PING}
+
+    if not url.startswith("sqlite"):
+        kwargs.update({
+            "poolclass": InstrumentedAsyncQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+        })
+
+    if url.startswith("postgresql+asyncpg"):
+        # asyncpg takes session settings through server_settings instead of libpq options
+        server_settings = {"application_name": f"{DB_APPLICATION_NAME}:{name}"}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        kwargs["connect_args"] = {"server_settings": server_settings}
+
+    kwargs.update(overrides)
+
+    engine = create_async_engine(url, **kwargs)
+    _register_engine(engine.sync_engine, name)
+    return engine
+
+
+def _register_engine(engine: Engine, name: str):
+    metrics = PoolMetrics(name)
+    if isinstance(engine.pool, _InstrumentedPoolMixin):
+        engine.pool.metrics = metrics
+    _engine_metrics[name] = metrics
+    _engines[name] = engine
+
+    if isinstance(engine.pool, QueuePool):
+        per_worker = engine.pool.size() + max(engine.pool._max_overflow, 0)
+        logger.info(
+            f"[db-pool:{name}] pool_size={engine.pool.size()} max_overflow={engine.pool._max_overflow} "
+            f"timeout={DB_POOL_TIMEOUT}s recycle={DB_POOL_RECYCLE}s "
+            f"max_connections={per_worker} per worker, {per_worker * WEB_CONCURRENCY} across {WEB_CONCURRENCY} worker(s)"
+        )
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Get checkout-wait and utilization metrics for every engine created by the factory."""
+    return {
+        name: _engine_metrics[name].snapshot(engine.pool)
+        for name, engine in _engines.items()
+    }
+
+
+@event.listens_for(Engine, "handle_error")
+def _log_statement_timeout(context):
+    # Postgres reports statement_timeout cancellations as QueryCanceled (SQLSTATE 57014)
+    orig = getattr(context, "original_exception", None)
+    if getattr(orig, "pgcode", None) == "57014":
+        logger.error(f"Statement timeout exceeded ({DB_STATEMENT_TIMEOUT_MS}ms): {context.statement}")
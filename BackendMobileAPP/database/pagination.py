@@ -0,0 +1,155 @@
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, tuple_
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor for the last row of a page, ordered by (created_at, id) descending."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def encode_key_cursor(values: Sequence) -> str:
+    """Opaque cursor holding the sort key (JSON-serialisable values or datetimes) of a page's last row."""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values],
+                     separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_key_cursor(cursor: str, size: int) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def date_range_filters(column, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List:
+    """Half-open datetime bounds for an inclusive date range, so an index on ``column`` is usable."""
+    filters = []
+    if date_from:
+        filters.append(column >= datetime.combine(date_from, time.min))
+    if date_to:
+        filters.append(column < datetime.combine(date_to + timedelta(days=1), time.min))
+    return filters
+
+
+def keyset_page(query: Query, created_col, id_col, cursor: Optional[str] = None,
+                limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of ``query`` newest first, starting after ``cursor``.
+
+    Uses a (created_at, id) row comparison instead of OFFSET, so every page is an
+    index range scan on a composite (…, created_at, id) index no matter how deep
+    the client has paged. Returns the rows and the cursor for the next page
+    (None on the last page).
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, row_id))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
+
+def keyset_page_by(query: Query, columns: Sequence, cursor: Optional[str] = None,
+                   limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List, Optional[str]]:
+    """
+    Like keyset_page(), but ascending on arbitrary ``columns`` (the last one must be
+    unique, normally the primary key) for lists ordered by something other than
+    creation time, e.g. (slot_starts_at, id) under a (doctor_name, slot_starts_at, id) index.
+    """
+    if cursor:
+        values = decode_key_cursor(cursor, len(columns))
+        try:
+            # DateTime keys travel as ISO strings; compare them as datetimes again
+            values = [datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+                      for column, value in zip(columns, values)]
+        except (ValueError, TypeError) as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+        query = query.filter(tuple_(*columns) > tuple_(*values))
+
+    rows = query.order_by(*(column.asc() for column in columns)).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_key_cursor([getattr(last, column.key) for column in columns])
+
+
+def iter_keyset(query: Query, created_col, id_col, batch_size: int = EXPORT_BATCH_SIZE,
+                around_batch: Optional[Callable] = None) -> Iterator:
+    """
+    Yield every row of ``query`` in keyset-sized batches for exports.
+
+    Each batch is its own short query. After each fetch the batch is detached and
+    the session's transaction rolled back, so the connection returns to the pool
+    instead of idling in transaction while the client downloads; the session must
+    therefore be read-only (nothing pending on it is kept). ``around_batch`` is an
+    optional context-manager factory wrapped around each fetch (e.g. replica reads).
+    """
+    session = query.session
+    cursor = None
+    while True:
+        if around_batch is not None:
+            with around_batch():
+                rows, cursor = keyset_page(query, created_col, id_col, cursor, batch_size)
+        else:
+            rows, cursor = keyset_page(query, created_col, id_col, cursor, batch_size)
+        # Detached rows keep their loaded columns and are not expired by the rollback
+        session.expunge_all()
+        session.rollback()
+        yield from rows
+        if cursor is None:
+            return
+
+
+def ndjson_lines(records: Iterable[Dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, default=str) + "\n"
+
+
+def csv_lines(records: Iterable[Dict], fieldnames: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,93 @@
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# Counting is always on inside a request; headers default to DEBUG so production responses stay clean
+DB_QUERY_STATS_HEADERS = os.getenv(
+    "DB_QUERY_STATS_HEADERS", os.getenv("DEBUG", "True")
+).lower() in ("true", "1", "yes")
+
+try:
+    DB_REPEATED_QUERY_THRESHOLD = int(os.getenv("DB_REPEATED_QUERY_THRESHOLD", "10"))
+except ValueError:
+    logger.warning("Invalid DB_REPEATED_QUERY_THRESHOLD, falling back to 10")
+    DB_REPEATED_QUERY_THRESHOLD = 10
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|\$\d+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so the same query with different parameters compares equal."""
+    shape = _LITERALS.sub("?", statement)
+    shape = _IN_LISTS.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    """Query count, DB time and repeated statement shapes for one request."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.query_count = 0
+        self.total_time_ms = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.query_count += 1
+        self.total_time_ms += elapsed_ms
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_statements(self, threshold: int = DB_REPEATED_QUERY_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statement shapes executed more than ``threshold`` times (likely N+1 loops)."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def report(self):
+        """Log every repeated statement shape for the request."""
+        for shape, count in self.repeated_statements():
+            logger.warning(
+                f"[db-queries] {self.label}: possible N+1, statement ran {count} times "
+                f"(threshold {DB_REPEATED_QUERY_THRESHOLD}): {shape[:300]}"
+            )
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+def start_query_stats(label: str = ""):
+    """Begin collecting for the current request; returns the reset token for stop_query_stats()."""
+    return _current_stats.set(RequestQueryStats(label))
+
+
+def stop_query_stats(token):
+    _current_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    starts = conn.info.get("query_stats_start")
+    if stats is None or not starts:
+        return
+    stats.record(statement, (time.perf_counter() - starts.pop()) * 1000)
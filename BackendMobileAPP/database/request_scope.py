@@ -0,0 +1,153 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# Leak warnings default to on wherever DEBUG is on (development), like settings.DEBUG
+DB_SESSION_LEAK_WARNINGS = os.getenv(
+    "DB_SESSION_LEAK_WARNINGS", os.getenv("DEBUG", "True")
+).lower() in ("true", "1", "yes")
+
+
+class RequestSessionScope:
+    """One lazily opened Session shared by every middleware and dependency of a request."""
+
+    def __init__(self, session_factory: sessionmaker, label: str = ""):
+        self.session_factory = session_factory
+        self.label = label
+        self._session: Optional[Session] = None
+        self.open_connections = 0
+        self.peak_connections = 0
+        self.closed = False
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._session = self.session_factory()
+        return self._session
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def close(self):
+        """Close the shared session and, in development, report anything left behind."""
+        if self.closed:
+            return
+        self.closed = True
+
+        if self._session is not None:
+            if DB_SESSION_LEAK_WARNINGS and (self._session.new or self._session.dirty or self._session.deleted):
+                logger.warning(f"[db-session] {self.label}: uncommitted changes discarded at end of request")
+            self._session.close()
+            self._session = None
+
+        if not DB_SESSION_LEAK_WARNINGS:
+            return
+        if self.open_connections > 0:
+            logger.warning(
+                f"[db-session] {self.label}: {self.open_connections} connection(s) still checked out "
+                f"after the request finished; a session was opened outside get_db() and never closed"
+            )
+        if self.peak_connections > 1:
+            logger.warning(
+                f"[db-session] {self.label}: held {self.peak_connections} connections at once; "
+                f"use the request session from get_db() instead of opening new ones"
+            )
+
+
+_current_scope: ContextVar[Optional[RequestSessionScope]] = ContextVar("request_db_scope", default=None)
+
+
+def current_scope() -> Optional[RequestSessionScope]:
+    return _current_scope.get()
+
+
+def enter_scope(session_factory: sessionmaker, label: str = ""):
+    """Start a request scope; returns the reset token for exit_scope()."""
+    return _current_scope.set(RequestSessionScope(session_factory, label))
+
+
+def exit_scope(token):
+    scope = _current_scope.get()
+    try:
+        if scope is not None:
+            scope.close()
+    finally:
+        _current_scope.reset(token)
+
+
+def _scope_for(session_factory: sessionmaker) -> Optional[RequestSessionScope]:
+    scope = _current_scope.get()
+    if scope is not None and scope.session_factory is session_factory:
+        return scope
+    return None
+
+
+def scoped_db(session_factory: sessionmaker):
+    """
+    Generator dependency body for get_db().
+
+    Inside a request scope it yields the shared session and leaves closing to the
+    middleware; outside one (scripts, background jobs) it owns a private session.
+    """
+    scope = _scope_for(session_factory)
+    if scope is not None:
+        yield scope.session
+        return
+
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def request_db_session(session_factory: sessionmaker):
+    """Context-manager form of scoped_db() for middleware and other non-dependency code."""
+    scope = _scope_for(session_factory)
+    if scope is not None:
+        yield scope.session
+        return
+
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+_watched_engines = set()
+
+
+def watch_engine_connections(engine: Engine):
+    """Count per-request connection checkouts on ``engine`` so leaks can be reported."""
+    if not DB_SESSION_LEAK_WARNINGS or id(engine) in _watched_engines:
+        return
+    _watched_engines.add(id(engine))
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        scope = _current_scope.get()
+        if scope is None:
+            return
+        connection_record.info["request_scope"] = scope
+        scope.open_connections += 1
+        scope.peak_connections = max(scope.peak_connections, scope.open_connections)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        if connection_record is None:
+            return
+        scope = connection_record.info.pop("request_scope", None)
+        if scope is not None:
+            scope.open_connections -= 1
@@ -0,0 +1,150 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# Zero when the replica has replayed everything it received, otherwise seconds since the last replayed commit
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """Holds the replica engine and decides whether it is fresh enough to serve reads."""
+
+    def __init__(self, replica_engine: Optional[Engine], max_lag_seconds: float = 5.0,
+                 check_interval_seconds: float = 5.0):
+        self.replica_engine = replica_engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = replica_engine is not None
+        self.last_lag_seconds: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica_engine is not None
+
+    def is_available(self) -> bool:
+        """Check (at most once per interval) that the replica is reachable and within the lag budget."""
+        if not self.enabled:
+            return False
+
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_seconds:
+            return self._healthy
+
+        with self._lock:
+            if now - self._checked_at < self.check_interval_seconds:
+                return self._healthy
+            self._checked_at = now
+            self._healthy = self._probe()
+        return self._healthy
+
+    def _probe(self) -> bool:
+        if self.replica_engine.dialect.name != "postgresql":
+            self.last_lag_seconds = 0.0
+            return True
+        try:
+            with self.replica_engine.connect() as connection:
+                lag = float(connection.execute(_REPLICA_LAG_SQL).scalar() or 0)
+        except Exception as e:
+            logger.warning(f"Replica health check failed, routing reads to primary: {e}")
+            self.last_lag_seconds = None
+            return False
+
+        self.last_lag_seconds = lag
+        if lag > self.max_lag_seconds:
+            logger.warning(f"Replica lag {lag:.1f}s exceeds {self.max_lag_seconds}s, routing reads to primary")
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads inside ``replica_reads()`` to the replica engine.
+
+    Once the session has flushed a write it stays on the primary for the rest of
+    its life (one request), so callers always read their own writes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replica_depth = 0
+        self.has_written = False
+
+    @property
+    def router(self) -> Optional[ReplicaRouter]:
+        return self.info.get("replica_router")
+
+    @contextmanager
+    def replica_reads(self):
+        """Route SELECTs issued inside this block to the replica when it is safe to do so."""
+        self._replica_depth += 1
+        try:
+            yield self
+        finally:
+            self._replica_depth -= 1
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self._replica_depth
+            and not self.has_written
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and self.router is not None
+            and self.router.is_available()
+        ):
+            return self.router.replica_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary_after_flush(session, flush_context):
+    session.has_written = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _stick_to_primary_after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.has_written = True
+
+
+@contextmanager
+def replica_reads(db: Session):
+    """Route reads on ``db`` to the replica; a no-op for sessions without routing."""
+    if isinstance(db, RoutingSession):
+        with db.replica_reads():
+            yield db
+    else:
+        yield db
+
+
+def read_only(method):
+    """Mark a repository/service method (with a ``self.db`` session) as safe to serve from the replica."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with replica_reads(self.db):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def async_read_only(method):
+    """read_only for coroutine methods whose ``self.db`` is an AsyncSession over a RoutingSession."""
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        with replica_reads(self.db.sync_session):
+            return await method(self, *args, **kwargs)
+    return wrapper
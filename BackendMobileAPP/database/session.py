@@ -1,12 +1,10 @@
 from .connection import SessionLocal, ZenotiSessionLocal
+from .request_scope import scoped_db
 
 
 def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Shares the request-scoped session opened by DBSessionMiddleware when present
+    yield from scoped_db(SessionLocal)
 
 def get_zenoti_db():
     db = ZenotiSessionLocal()
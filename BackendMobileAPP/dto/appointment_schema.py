@@ -65,6 +65,8 @@ class AppointmentCreateDTO(BaseModel):
     date: datetime.date = Field(..., example="2025-07-01")
     start_time: datetime.time = Field(..., example="10:00:00")
     end_time: datetime.time = Field(..., example="10:15:00")
+    # Book the next free slot that day if this one is taken
+    book_next_free: bool = Field(False, example=False)
 
 
 # ----------------------------
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Literal
 from datetime import datetime
+from config.settings import settings
 
 class CreateMeetingRequest(BaseModel):
     customer_name: str
@@ -35,4 +36,24 @@ class ErrorResponse(BaseModel):
 
 class MeetingListResponse(BaseModel):
     meetings: List[MeetingResponse]
-    total: int
+    total: int  # meetings on this page
+    next_cursor: Optional[str] = None
+
+
+class BulkCreateMeetingRequest(BaseModel):
+    meetings: List[CreateMeetingRequest] = Field(..., min_length=1, max_length=settings.CONSULTATION_BULK_MAX_MEETINGS)
+    send_emails: bool = True
+
+class BulkMeetingResult(BaseModel):
+    index: int  # position in the request's meetings list
+    status: Literal["created", "invalid", "duplicate", "failed"]
+    meeting: Optional[MeetingResponse] = None
+    emails_queued: List[str] = []
+    error: Optional[str] = None
+
+class BulkMeetingResponse(BaseModel):
+    results: List[BulkMeetingResult]
+    created: int
+    failed: int
+    emails_queued: int
+    message: str
@@ -6,9 +6,12 @@ from typing import Dict, Any, Optional
 import time
 import json
 
-from database.session import get_db
+from database.connection import SessionLocal
+from database.request_scope import request_db_session
 from service.security_service import SecurityService
 from middleware.rate_limit import GENERAL_RATE_LIMIT
+from middleware.db_session import DBSessionMiddleware
+from middleware.query_stats import QueryStatsMiddleware
 from security.jwt import get_current_user
 
 
@@ -40,6 +43,12 @@ class APIGateway:
         
         # Rate limiting middleware
         self.app.middleware("http")(self._rate_limit_middleware)
+        
+        # Request-scoped DB session (outermost of the DB users so it closes after them)
+        self.app.add_middleware(DBSessionMiddleware)
+        
+        # Query count / DB time headers and N+1 warnings
+        self.app.add_middleware(QueryStatsMiddleware)
     
     def _setup_routes(self):
         """Setup gateway routes."""
@@ -111,18 +120,17 @@ class APIGateway:
         if request.url.path in ["/health", "/docs", "/openapi.json"]:
             return await call_next(request)
         
-        # Apply general rate limiting
-        db = next(get_db())
-        security_service = SecurityService(db)
-        
         # Get identifier
         client_ip = request.client.host
         x_forwarded_for = request.headers.get("x-forwarded-for")
         if x_forwarded_for:
             client_ip = x_forwarded_for.split(",")[0].strip()
         
-        # Check rate limit
-        if not security_service.check_rate_limit(client_ip, "api_request", 100, 15):
+        # Apply general rate limiting
+        with request_db_session(SessionLocal) as db:
+            allowed = SecurityService(db).check_rate_limit(client_ip, "api_request", 100, 15)
+        
+        if not allowed:
             return JSONResponse(
                 status_code=429,
                 content={
@@ -1,5 +1,8 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from controller import booking_controller, guest_data_controller
 from controller import appointment_controller
@@ -9,9 +12,13 @@ from controller import service_controller
 from controller.loyalty_controller import router as loyalty_router
 from controller.rewards_controller import router as rewards_router
 from controller.session_controller import router as session_router
-from database.connection import create_tables
+from database.connection import SessionLocal, create_tables
+from database.engine import get_pool_stats
+from middleware.db_session import DBSessionMiddleware
+from middleware.query_stats import QueryStatsMiddleware
 from controller.guest_data_controller import router as collections_router
 from controller.consultation_controller import router as consultation_router
+from controller.calendar_controller import router as calendar_router
 
 from fastapi import APIRouter
 
@@ -21,7 +28,19 @@ from shopify_controller import router as shopify_router
 import models
 
 # Import order models to ensure tables are created
-from models.order_models import Order, OrderItem, PaymentTransaction, OrderEvent, Customer, Product, InventoryLog
+from models.order_models import Order, OrderItem, PaymentTransaction, OrderEvent, Customer, Product, InventoryLog, OrderDailyRollup
+from models.order_models import ShopifyCatalogProduct, ShopifyCatalogVariant, ShopifyCatalogSyncState, ShopifyOrderOutbox, RazorpayWebhookEvent
+
+# Registers the flush hook that keeps order_daily_rollups in step with orders
+from services.order_rollups import backfill_order_rollups_if_empty
+from services.shopify_catalog import SHOPIFY_CATALOG_SYNC_INTERVAL, run_catalog_sync_loop
+from shopify_service import shopify_service
+from services.shopify_scheduler import shopify_scheduler
+from services.shopify_outbox import shopify_outbox_worker
+from services.razorpay_webhooks import razorpay_webhook_processor
+from services.appointment_reminders import appointment_reminder_worker
+from service.consultation_mailer import consultation_mailer
+from utils.http_client import close_http_clients
 
 # Import rewards models to ensure tables are created
 
@@ -43,6 +62,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One request-scoped DB session shared by middleware and dependencies
+app.add_middleware(DBSessionMiddleware)
+
+# Per-request query count / DB time headers and repeated-statement (N+1) warnings
+app.add_middleware(QueryStatsMiddleware)
+
 @app.on_event("startup")
 def startup_db_client():
     try:
@@ -50,6 +75,72 @@ def startup_db_client():
         print("Database tables created successfully")
     except Exception as e:
         print(f"Error creating tables: {e}")
+    try:
+        with SessionLocal() as db:
+            backfill_order_rollups_if_empty(db)
+    except Exception as e:
+        print(f"Error backfilling order rollups: {e}")
+
+catalog_sync_task = None
+
+@app.on_event("startup")
+async def start_shopify_catalog_sync():
+    global catalog_sync_task
+    if SHOPIFY_CATALOG_SYNC_INTERVAL > 0 and shopify_service.access_token:
+        catalog_sync_task = asyncio.create_task(run_catalog_sync_loop())
+
+@app.on_event("shutdown")
+async def stop_shopify_catalog_sync():
+    if catalog_sync_task is not None:
+        catalog_sync_task.cancel()
+
+outbox_worker_task = None
+
+@app.on_event("startup")
+async def start_shopify_outbox_worker():
+    global outbox_worker_task
+    # Without credentials rows simply stay pending until the worker can deliver them
+    if shopify_service.access_token:
+        outbox_worker_task = asyncio.create_task(shopify_outbox_worker.run())
+
+@app.on_event("shutdown")
+async def stop_shopify_outbox_worker():
+    if outbox_worker_task is not None:
+        outbox_worker_task.cancel()
+
+webhook_processor_task = None
+
+@app.on_event("startup")
+async def start_razorpay_webhook_processor():
+    global webhook_processor_task
+    webhook_processor_task = asyncio.create_task(razorpay_webhook_processor.run())
+
+@app.on_event("shutdown")
+async def stop_razorpay_webhook_processor():
+    if webhook_processor_task is not None:
+        webhook_processor_task.cancel()
+
+reminder_worker_task = None
+
+@app.on_event("startup")
+async def start_appointment_reminder_worker():
+    global reminder_worker_task
+    # Runs in every worker process; only the advisory-lock holder sends
+    reminder_worker_task = asyncio.create_task(appointment_reminder_worker.run())
+
+@app.on_event("shutdown")
+async def stop_appointment_reminder_worker():
+    if reminder_worker_task is not None:
+        reminder_worker_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_consultation_mailer():
+    # Sends whatever invitations are still queued before the process exits
+    await run_in_threadpool(consultation_mailer.close)
+
+@app.on_event("shutdown")
+async def close_upstream_http_clients():
+    await close_http_clients()
 
 app.include_router(auth_controller.router)
 app.include_router(user_controller.router)
@@ -64,6 +155,7 @@ app.include_router(guest_data_controller.router)
 app.include_router(payment_controller.router)
 app.include_router(shopify_router)
 app.include_router(consultation_router)
+app.include_router(calendar_router)
 
 @app.get("/")
 def root():
@@ -77,6 +169,19 @@ def test_endpoint():
 def health_check():
     return {"status": "healthy", "message": "Backend is running"}
 
+@app.get("/health/db-pool")
+def db_pool_health():
+    return {"status": "healthy", "pools": get_pool_stats()}
+
+@app.get("/health/shopify-queue")
+def shopify_queue_health():
+    return {"status": "healthy", "shopify": shopify_scheduler.stats()}
+
+@app.get("/health/reminders")
+def appointment_reminders_health():
+    with SessionLocal() as db:
+        return {"status": "healthy", "reminders": appointment_reminder_worker.stats(db)}
+
 @app.get("/api/status")
 def api_status():
     return {
@@ -87,6 +192,7 @@ def api_status():
             "/",
             "/test",
             "/health",
+            "/health/db-pool",
             "/api/status",
             "/docs"
         ]
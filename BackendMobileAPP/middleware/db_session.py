@@ -0,0 +1,35 @@
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from database.connection import SessionLocal
+from database.request_scope import current_scope, enter_scope, exit_scope, watch_engine_connections
+
+
+class DBSessionMiddleware:
+    """
+    Open one request-scoped database session shared by middleware and dependencies.
+
+    The session is created lazily on first use and closed once the response has
+    been fully sent, so connections go back to the pool deterministically instead
+    of on garbage collection.
+    """
+
+    def __init__(self, app: ASGIApp, session_factory=SessionLocal):
+        self.app = app
+        self.session_factory = session_factory
+        watch_engine_connections(session_factory.kw["bind"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = enter_scope(self.session_factory, label=f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_scope = current_scope()
+            if request_scope is not None and request_scope.opened:
+                # Closing rolls back / returns the connection, which is blocking I/O
+                await run_in_threadpool(request_scope.close)
+            exit_scope(token)
@@ -0,0 +1,42 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database.query_stats import (
+    DB_QUERY_STATS_HEADERS, current_query_stats, start_query_stats, stop_query_stats
+)
+
+
+class QueryStatsMiddleware:
+    """
+    Count queries and DB time per request and flag repeated statements.
+
+    Adds X-DB-Query-Count, X-DB-Query-Time-Ms and X-DB-Repeated-Statements response
+    headers when DB_QUERY_STATS_HEADERS is on, and logs a warning for every statement
+    shape that runs more than DB_REPEATED_QUERY_THRESHOLD times in one request.
+    """
+
+    def __init__(self, app: ASGIApp, headers: bool = DB_QUERY_STATS_HEADERS):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_query_stats(label=f"{scope['method']} {scope['path']}")
+        stats = current_query_stats()
+
+        async def send_with_stats(message: Message):
+            if message["type"] == "http.response.start" and self.headers:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.query_count)
+                headers["X-DB-Query-Time-Ms"] = f"{stats.total_time_ms:.1f}"
+                headers["X-DB-Repeated-Statements"] = str(len(stats.repeated_statements()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            stats.report()
+            stop_query_stats(token)
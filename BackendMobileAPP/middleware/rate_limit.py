@@ -2,7 +2,8 @@ from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, Optional
 import time
-from database.session import get_db
+from database.connection import SessionLocal
+from database.request_scope import request_db_session
 from service.security_service import SecurityService
 
 
@@ -16,30 +17,30 @@ class RateLimitMiddleware:
         identifier = self._get_identifier(request)
         action = self._get_action(request)
         
-        # Check rate limit
-        db = next(get_db())
-        security_service = SecurityService(db)
-        
-        if not security_service.check_rate_limit(identifier, action, self.max_attempts, self.window_minutes):
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": "Rate limit exceeded",
-                    "message": f"Too many requests. Please try again in {self.window_minutes} minutes.",
-                    "retry_after": self.window_minutes * 60
-                }
+        # Check rate limit (shares the request-scoped session when DBSessionMiddleware is installed)
+        with request_db_session(SessionLocal) as db:
+            security_service = SecurityService(db)
+            
+            if not security_service.check_rate_limit(identifier, action, self.max_attempts, self.window_minutes):
+                return JSONResponse(
+                    status_code=429,
+                    content={
+                        "error": "Rate limit exceeded",
+                        "message": f"Too many requests. Please try again in {self.window_minutes} minutes.",
+                        "retry_after": self.window_minutes * 60
+                    }
+                )
+            
+            # Log the request
+            security_service.log_audit_event(
+                user_id=self._get_user_id(request),
+                action=action,
+                resource=request.url.path,
+                ip_address=request.client.host,
+                user_agent=request.headers.get("user-agent"),
+                success=True
             )
         
-        # Log the request
-        security_service.log_audit_event(
-            user_id=self._get_user_id(request),
-            action=action,
-            resource=request.url.path,
-            ip_address=request.client.host,
-            user_agent=request.headers.get("user-agent"),
-            success=True
-        )
-        
         response = await call_next(request)
         return response
     
@@ -1,16 +1,26 @@
 from sqlalchemy import (
     Column, String, Boolean, DateTime, Float, BigInteger,
-    Date, Time, Integer, ForeignKey
+    Date, Time, Integer, ForeignKey, Index, UniqueConstraint, text
 )
 from sqlalchemy.orm import relationship
+from datetime import datetime
 
 from database.base import Base
 
+# One scheduled appointment per doctor slot; cancelled/completed rows do not hold the slot
+SLOT_UNIQUE_INDEX = "uq_appointments_doctor_slot_scheduled"
+
 
 
 class Appointment(Base):
     __tablename__ = "appointments"
-    __table_args__ = {"schema": "public", "extend_existing": True}
+    __table_args__ = (
+        Index(
+            SLOT_UNIQUE_INDEX, "doctor_id", "date", "start_time", unique=True,
+            postgresql_where=text("status = 0"), sqlite_where=text("status = 0")
+        ),
+        {"schema": "public", "extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     appointment_id = Column(String, unique=True, index=True)
@@ -98,3 +108,29 @@ class AppointmentWalkin(Base):
     recommendations = Column(String)
     crt_name = Column(String)
     inserted_date_time = Column(DateTime)
+
+
+class AppointmentReminder(Base):
+    """Reminder email queued for an appointment; sent by the reminder worker when due"""
+    __tablename__ = "appointment_reminders"
+    __table_args__ = (
+        Index("ix_appointment_reminders_status_due_at", "status", "due_at"),
+        UniqueConstraint("appointment_id", "kind", name="uq_appointment_reminders_appointment_kind"),
+        {"schema": "public", "extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    appointment_id = Column(Integer, ForeignKey("public.appointments.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(30), nullable=False, default="reminder")
+    patient_email = Column(String, nullable=True)
+    doctor_email = Column(String, nullable=True)
+    due_at = Column(DateTime, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, skipped, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    appointment = relationship("Appointment")
+
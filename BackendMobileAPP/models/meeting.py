@@ -1,16 +1,25 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer
+from sqlalchemy import Column, String, DateTime, Text, Integer, Index
 from sqlalchemy.sql import func
 from database.connection import Base
 
 class Meeting(Base):
     __tablename__ = "meetings"
-    
+    # Per-party and per-status schedules are read in slot order; create_tables() adds
+    # these to an existing meetings table
+    __table_args__ = (
+        Index("ix_meetings_doctor_name_slot_starts_at", "doctor_name", "slot_starts_at", "id"),
+        Index("ix_meetings_customer_name_slot_starts_at", "customer_name", "slot_starts_at", "id"),
+        Index("ix_meetings_status_slot_starts_at", "status", "slot_starts_at", "id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     meeting_id = Column(String(255), unique=True, index=True, nullable=False)
     meeting_link = Column(Text, nullable=False)
     customer_name = Column(String(255), nullable=False)
     doctor_name = Column(String(255), nullable=False)
     slot_time = Column(String(255), nullable=False)
+    # slot_time parsed to clinic-local time on insert; what schedules sort and filter on
+    slot_starts_at = Column(DateTime, nullable=False)
     customer_email = Column(String(255), nullable=True)
     doctor_email = Column(String(255), nullable=True)
     status = Column(String(50), default="active")  # active, completed, cancelled
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, DECIMAL, JSON, Enum, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Date, DECIMAL, JSON, Enum, ForeignKey, Text, Index
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 import enum
 from database.connection import Base
@@ -30,6 +30,12 @@ class PaymentMethod(enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    # Keyset pagination indexes: (filter column, created_at, id) serve filtered, newest-first pages
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "order_status", "created_at", "id"),
+        Index("ix_orders_customer_created_at_id", "customer_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(String(50), unique=True, index=True)  # External order ID
@@ -37,9 +43,11 @@ class Order(Base):
     shopify_order_id = Column(String(50), nullable=True)  # Shopify order ID
     
     # Order details
-    order_status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
+    # active_history: services.order_rollups needs the old status/amount even when the
+    # instance was expired or never loaded before the change
+    order_status = column_property(Column(Enum(OrderStatus), default=OrderStatus.PENDING), active_history=True)
     payment_status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING)
-    total_amount = Column(DECIMAL(10, 2))
+    total_amount = column_property(Column(DECIMAL(10, 2)), active_history=True)
     subtotal_amount = Column(DECIMAL(10, 2))
     tax_amount = Column(DECIMAL(10, 2))
     shipping_amount = Column(DECIMAL(10, 2))
@@ -94,6 +102,11 @@ class OrderItem(Base):
 
 class PaymentTransaction(Base):
     __tablename__ = "payment_transactions"
+    __table_args__ = (
+        Index("ix_payment_transactions_created_at_id", "created_at", "id"),
+        Index("ix_payment_transactions_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_payment_transactions_order_created_at_id", "order_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(String(100), unique=True, index=True)
@@ -201,4 +214,150 @@ class InventoryLog(Base):
     reference_id = Column(String(100), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow) 
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OrderDailyRollup(Base):
+    """Order count and revenue per creation day and current status, kept in step by services/order_rollups.py"""
+    __tablename__ = "order_daily_rollups"
+    
+    day = Column(Date, primary_key=True)
+    order_status = Column(String(20), primary_key=True)  # OrderStatus value
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(14, 2), nullable=False, default=0)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ShopifyCatalogProduct(Base):
+    """Local mirror of a Shopify product, maintained by services/shopify_catalog.py"""
+    __tablename__ = "shopify_catalog_products"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=False)  # Shopify product ID
+    title = Column(String(255), index=True)
+    handle = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=True)  # active, draft, archived
+    product_type = Column(String(255), nullable=True)
+    vendor = Column(String(255), nullable=True)
+    data = Column(JSON)  # Product JSON as returned by the Admin API, without variants
+    
+    # Timestamps
+    shopify_updated_at = Column(DateTime, nullable=True, index=True)
+    synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    variants = relationship("ShopifyCatalogVariant", back_populates="product", cascade="all, delete-orphan")
+
+class ShopifyCatalogVariant(Base):
+    __tablename__ = "shopify_catalog_variants"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=False)  # Shopify variant ID
+    product_id = Column(BigInteger, ForeignKey("shopify_catalog_products.id", ondelete="CASCADE"), index=True)
+    title = Column(String(255))
+    sku = Column(String(100), nullable=True, index=True)
+    price = Column(DECIMAL(10, 2), nullable=True)
+    inventory_quantity = Column(Integer, nullable=True)
+    position = Column(Integer, nullable=True)
+    data = Column(JSON)
+    
+    # Relationships
+    product = relationship("ShopifyCatalogProduct", back_populates="variants")
+
+class ShopifyCatalogSyncState(Base):
+    __tablename__ = "shopify_catalog_sync_state"
+    
+    name = Column(String(50), primary_key=True)
+    updated_at_watermark = Column(DateTime, nullable=True)  # Highest product updated_at seen
+    last_full_sync_at = Column(DateTime, nullable=True)
+    last_incremental_sync_at = Column(DateTime, nullable=True)
+
+class ShopifyOrderOutbox(Base):
+    """Shopify order creation queued in the same transaction as the local Order; see services/shopify_outbox.py"""
+    __tablename__ = "shopify_order_outbox"
+    __table_args__ = (
+        Index("ix_shopify_order_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
+    idempotency_key = Column(String(64), unique=True, nullable=False)  # Sent as the Shopify order's source_identifier
+    
+    # Delivery payload
+    payload = Column(JSON)  # order_data for ShopifyService (line_items, customer, shipping_address)
+    financial_status = Column(String(20), default="paid")
+    
+    # Delivery state
+    status = Column(String(20), default="pending")  # pending, processing, delivered, dead
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    shopify_order_id = Column(String(50), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    order = relationship("Order")
+
+class RazorpayWebhookEvent(Base):
+    """Raw Razorpay webhook delivery, stored once per event id; processed by services/razorpay_webhooks.py"""
+    __tablename__ = "razorpay_webhook_events"
+    __table_args__ = (
+        Index("ix_razorpay_webhook_events_status_id", "status", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String(100), unique=True, nullable=False)  # X-Razorpay-Event-Id
+    event_type = Column(String(50))
+    payment_id = Column(String(100), nullable=True, index=True)  # Gateway payment ID the event is about
+    payload = Column(JSON)
+    
+    # Processing state
+    status = Column(String(20), default="received")  # received, processed, ignored, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # Retry backoff after a failed attempt; NULL = due now
+    
+    # Timestamps
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+class PaymentReconciliationRun(Base):
+    """One reconciliation pass of PaymentTransaction rows against the payment gateway"""
+    __tablename__ = "payment_reconciliation_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(20), default="running")  # running, completed, failed
+    apply_fixes = Column(Integer, default=1)
+    filters = Column(JSON)
+    
+    # Counters
+    scanned = Column(Integer, default=0)
+    mismatches = Column(Integer, default=0)
+    fixed = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    
+    # Timestamps
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class PaymentReconciliationMismatch(Base):
+    __tablename__ = "payment_reconciliation_mismatches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("payment_reconciliation_runs.id"), index=True)
+    payment_transaction_id = Column(Integer, ForeignKey("payment_transactions.id"), index=True)
+    gateway_transaction_id = Column(String(100), nullable=True)
+    kind = Column(String(30))  # missing_at_gateway, status_mismatch, amount_mismatch, order_status_mismatch, gateway_error
+    local_status = Column(String(30), nullable=True)
+    gateway_status = Column(String(30), nullable=True)
+    local_amount = Column(DECIMAL(10, 2), nullable=True)
+    gateway_amount = Column(DECIMAL(10, 2), nullable=True)
+    fixed = Column(Integer, default=0)
+    details = Column(JSON, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
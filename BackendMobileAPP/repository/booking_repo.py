@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.booking_model import Booking, ReservedSlot, ConfirmedBooking
@@ -35,4 +37,38 @@ class BookingRepository:
             db.delete(booking)
             db.commit()
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+class AsyncBookingRepository:
+    @staticmethod
+    async def _save(db: AsyncSession, instance):
+        db.add(instance)
+        await db.commit()
+        await db.refresh(instance)
+        return instance
+
+    @staticmethod
+    async def save_booking(db: AsyncSession, booking: Booking):
+        return await AsyncBookingRepository._save(db, booking)
+
+    @staticmethod
+    async def save_reserved_slot(db: AsyncSession, slot: ReservedSlot):
+        return await AsyncBookingRepository._save(db, slot)
+
+    @staticmethod
+    async def save_confirmed_booking(db: AsyncSession, booking: ConfirmedBooking):
+        return await AsyncBookingRepository._save(db, booking)
+
+    @staticmethod
+    async def get_booking(db: AsyncSession, booking_id: str):
+        return await db.scalar(select(Booking).where(Booking.booking_id == booking_id))
+
+    @staticmethod
+    async def delete_confirmed_booking_by_invoice_id(db: AsyncSession, invoice_id: str):
+        booking = await db.scalar(select(ConfirmedBooking).where(ConfirmedBooking.invoice_id == invoice_id))
+        if booking:
+            await db.delete(booking)
+            await db.commit()
+            return True
+        return False
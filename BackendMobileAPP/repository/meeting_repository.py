@@ -1,60 +1,235 @@
+from datetime import date, datetime
+from fastapi import Depends
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Iterable, List, Optional, Set, Tuple
 from models.meeting import Meeting
-from database.connection_simple import get_db
+from database.pagination import DEFAULT_PAGE_SIZE, date_range_filters, keyset_page_by
+from database.session import get_db
+from utils.ics_utils import CLINIC_TIMEZONE
+
+# Lists are keyset-paged in schedule order, served by the (…, slot_starts_at, id) indexes on meetings
+PAGE_ORDER = (Meeting.slot_starts_at, Meeting.id)
+
+# Accepted slot_time spellings besides ISO 8601 ("2024-08-15 10:00", "2024-08-15T10:00:00+05:30")
+SLOT_TIME_FORMATS = ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %I:%M%p", "%Y-%m-%d %I %p", "%Y-%m-%d %I:%M:%S %p")
+
+# pg_advisory_xact_lock key serialising bulk creations, so a retried roster sees the first one's rows
+BULK_CREATE_LOCK_KEY = 7302114403
+# Fresh meeting_ids tried for a row whose id collided with a stored meeting
+MEETING_ID_ATTEMPTS = 3
+
+_DUPLICATE = object()
+
+
+def parse_slot_time(slot_time: str) -> Optional[datetime]:
+    """Start of a free-text slot ("2024-08-15 10:00 AM") in naive clinic-local time, None if unreadable"""
+    text = (slot_time or "").strip()
+    try:
+        starts_at = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in SLOT_TIME_FORMATS:
+            try:
+                return datetime.strptime(text.upper(), fmt)
+            except ValueError:
+                continue
+        return None
+    if starts_at.tzinfo is not None:
+        starts_at = starts_at.astimezone(CLINIC_TIMEZONE).replace(tzinfo=None)
+    return starts_at
+
+
+def meeting_key(customer_name: str, doctor_name: str, slot_starts_at: datetime) -> Tuple[str, str, datetime]:
+    """What makes two meetings the same booking: customer, doctor (case-insensitive) and slot start"""
+    return customer_name.strip().lower(), doctor_name.strip().lower(), slot_starts_at
+
+
+def _with_start(row: dict) -> dict:
+    if row.get("slot_starts_at") is not None:
+        return row
+    starts_at = parse_slot_time(row["slot_time"])
+    if starts_at is None:
+        raise ValueError(f"Unreadable slot time: {row['slot_time']}")
+    return {**row, "slot_starts_at": starts_at}
+
+
+def _row_key(row: dict) -> Tuple[str, str, datetime]:
+    return meeting_key(row["customer_name"], row["doctor_name"], row["slot_starts_at"])
+
+
+def slot_date_filters(date_from: Optional[date] = None, date_to: Optional[date] = None) -> List:
+    """Inclusive date window on the slot start"""
+    return date_range_filters(Meeting.slot_starts_at, date_from, date_to)
+
 
 class MeetingRepository:
+    """
+    Meeting persistence for the consultation API.
+
+    The async methods run their (blocking) queries in the threadpool so the
+    event loop keeps serving other requests while the database answers.
+    """
+
     def __init__(self, db: Session):
         self.db = db
-    
-    async def create_meeting(self, meeting_data: dict) -> Meeting:
-        """Create a new meeting"""
-        meeting = Meeting(**meeting_data)
+
+    # ==== Blocking queries ====
+
+    def _create(self, meeting_data: dict) -> Meeting:
+        meeting = Meeting(**_with_start(meeting_data))
         self.db.add(meeting)
         self.db.commit()
         self.db.refresh(meeting)
         return meeting
-    
-    async def get_meeting_by_id(self, meeting_id: str) -> Optional[Meeting]:
-        """Get meeting by meeting_id"""
+
+    def _lock_bulk_create(self):
+        if self.db.get_bind().dialect.name == "postgresql":
+            # Held until commit/rollback: a concurrent retry of the same roster waits, then sees these rows
+            self.db.execute(select(func.pg_advisory_xact_lock(BULK_CREATE_LOCK_KEY)))
+
+    def _active_keys(self, rows: Iterable[dict]) -> Set[Tuple[str, str, str]]:
+        """Keys of the given rows that already have an active stored meeting"""
+        rows = list(rows)
+        starts = {row["slot_starts_at"] for row in rows}
+        doctors = {row["doctor_name"].strip().lower() for row in rows}
+        stored = self.db.query(Meeting.customer_name, Meeting.doctor_name, Meeting.slot_starts_at).filter(
+            Meeting.status == "active",
+            Meeting.slot_starts_at.in_(starts),
+            func.lower(func.trim(Meeting.doctor_name)).in_(doctors)
+        )
+        wanted = {_row_key(row) for row in rows}
+        return {key for key in (meeting_key(*meeting) for meeting in stored) if key in wanted}
+
+    def _create_many(self, rows: List[dict],
+                     renew_id: Callable[[dict], dict]) -> Tuple[List[Optional[Meeting]], Set[int]]:
+        stored: List[Optional[Meeting]] = [None] * len(rows)
+        if not rows:
+            return stored, set()
+        rows = [_with_start(row) for row in rows]
+        self._lock_bulk_create()
+        active = self._active_keys(rows)
+        duplicates = {i for i, row in enumerate(rows) if _row_key(row) in active}
+        positions = [i for i in range(len(rows)) if i not in duplicates]
+        if not positions:
+            self.db.rollback()
+            return stored, duplicates
+        try:
+            # One multi-row INSERT … RETURNING; plain rows, so nothing is reloaded after the commit
+            meetings = self.db.execute(
+                insert(Meeting).returning(*Meeting.__table__.columns, sort_by_parameter_order=True),
+                [rows[i] for i in positions]
+            ).all()
+            self.db.commit()
+            for i, meeting in zip(positions, meetings):
+                stored[i] = meeting
+            return stored, duplicates
+        except IntegrityError:
+            self.db.rollback()
+
+        # A meeting_id collided with a stored one: store row by row, renewing ids that collide
+        for i in positions:
+            meeting = self._create_unique(rows[i], renew_id)
+            if meeting is _DUPLICATE:
+                duplicates.add(i)
+            else:
+                stored[i] = meeting
+        return stored, duplicates
+
+    def _create_unique(self, row: dict, renew_id: Callable[[dict], dict]):
+        for _ in range(MEETING_ID_ATTEMPTS):
+            self._lock_bulk_create()
+            if self._active_keys([row]):
+                self.db.rollback()
+                return _DUPLICATE
+            try:
+                return self._create(row)
+            except IntegrityError:
+                self.db.rollback()
+                row = renew_id(row)
+        return None
+
+    def _get(self, meeting_id: str) -> Optional[Meeting]:
         return self.db.query(Meeting).filter(Meeting.meeting_id == meeting_id).first()
-    
-    async def get_meetings_by_customer(self, customer_name: str) -> List[Meeting]:
-        """Get all meetings for a customer"""
-        return self.db.query(Meeting).filter(Meeting.customer_name == customer_name).all()
-    
-    async def get_meetings_by_doctor(self, doctor_name: str) -> List[Meeting]:
-        """Get all meetings for a doctor"""
-        return self.db.query(Meeting).filter(Meeting.doctor_name == doctor_name).all()
-    
-    async def get_all_meetings(self, skip: int = 0, limit: int = 100) -> List[Meeting]:
-        """Get all meetings with pagination"""
-        return self.db.query(Meeting).offset(skip).limit(limit).all()
-    
-    async def update_meeting_status(self, meeting_id: str, status: str) -> Optional[Meeting]:
-        """Update meeting status"""
-        meeting = await self.get_meeting_by_id(meeting_id)
+
+    def _page(self, filters: List, cursor: Optional[str], limit: int) -> Tuple[List[Meeting], Optional[str]]:
+        return keyset_page_by(self.db.query(Meeting).filter(*filters), PAGE_ORDER, cursor, limit)
+
+    def _update_status(self, meeting_id: str, status: str) -> Optional[Meeting]:
+        meeting = self._get(meeting_id)
         if meeting:
             meeting.status = status
             self.db.commit()
             self.db.refresh(meeting)
         return meeting
-    
-    async def delete_meeting(self, meeting_id: str) -> bool:
-        """Delete a meeting"""
-        meeting = await self.get_meeting_by_id(meeting_id)
+
+    def _delete(self, meeting_id: str) -> bool:
+        meeting = self._get(meeting_id)
         if meeting:
             self.db.delete(meeting)
             self.db.commit()
             return True
         return False
-    
-    async def get_active_meetings(self) -> List[Meeting]:
-        """Get all active meetings"""
-        return self.db.query(Meeting).filter(Meeting.status == "active").all()
 
-def get_meeting_repository():
+    # ==== Async API ====
+
+    async def create_meeting(self, meeting_data: dict) -> Meeting:
+        """Create a new meeting"""
+        return await run_in_threadpool(self._create, meeting_data)
+
+    async def create_meetings(self, rows: List[dict],
+                              renew_id: Callable[[dict], dict]) -> Tuple[List[Optional[Meeting]], Set[int]]:
+        """
+        Insert many meetings at once, skipping rows that match an active stored meeting.
+
+        Returns the meetings in input order (None where a row was not stored) and the
+        positions skipped as duplicates. ``renew_id`` gives a row a fresh meeting_id
+        (and link) when its id collides with a stored one.
+        """
+        return await run_in_threadpool(self._create_many, rows, renew_id)
+
+    async def get_meeting_by_id(self, meeting_id: str) -> Optional[Meeting]:
+        """Get meeting by meeting_id"""
+        return await run_in_threadpool(self._get, meeting_id)
+
+    async def get_meetings_by_customer(self, customer_name: str, cursor: Optional[str] = None,
+                                       limit: int = DEFAULT_PAGE_SIZE, date_from: Optional[date] = None,
+                                       date_to: Optional[date] = None) -> Tuple[List[Meeting], Optional[str]]:
+        """One page of a customer's meetings in slot order, and the next cursor"""
+        filters = [Meeting.customer_name == customer_name, *slot_date_filters(date_from, date_to)]
+        return await run_in_threadpool(self._page, filters, cursor, limit)
+
+    async def get_meetings_by_doctor(self, doctor_name: str, cursor: Optional[str] = None,
+                                     limit: int = DEFAULT_PAGE_SIZE, date_from: Optional[date] = None,
+                                     date_to: Optional[date] = None) -> Tuple[List[Meeting], Optional[str]]:
+        """One page of a doctor's meetings in slot order, and the next cursor"""
+        filters = [Meeting.doctor_name == doctor_name, *slot_date_filters(date_from, date_to)]
+        return await run_in_threadpool(self._page, filters, cursor, limit)
+
+    async def get_all_meetings(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                               status: Optional[str] = None, date_from: Optional[date] = None,
+                               date_to: Optional[date] = None) -> Tuple[List[Meeting], Optional[str]]:
+        """One page of meetings in slot order, optionally by status, and the next cursor"""
+        filters = slot_date_filters(date_from, date_to)
+        if status:
+            filters.append(Meeting.status == status)
+        return await run_in_threadpool(self._page, filters, cursor, limit)
+
+    async def update_meeting_status(self, meeting_id: str, status: str) -> Optional[Meeting]:
+        """Update meeting status"""
+        return await run_in_threadpool(self._update_status, meeting_id, status)
+
+    async def delete_meeting(self, meeting_id: str) -> bool:
+        """Delete a meeting"""
+        return await run_in_threadpool(self._delete, meeting_id)
+
+    async def get_active_meetings(self, cursor: Optional[str] = None,
+                                  limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Meeting], Optional[str]]:
+        """One page of active meetings in slot order, and the next cursor"""
+        return await self.get_all_meetings(cursor, limit, status="active")
+
+
+def get_meeting_repository(db: Session = Depends(get_db)):
     """Dependency to get meeting repository"""
-    db = next(get_db())
     return MeetingRepository(db)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc, func
+from sqlalchemy import and_, or_, desc, asc, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 from models.rewards_models import (
@@ -11,11 +12,47 @@ from models.rewards_models import (
 from dto.rewards_schema import (
     RewardFilter, OfferFilter, AdFilter, PageType, SectionType, AudienceType
 )
+from database.routing import async_read_only, read_only
 from utils.logger import get_logger
 
 logger = get_logger()
 
 
+def _active_window(model):
+    """Condition for rows whose valid_from/valid_till window contains today"""
+    today = date.today()
+    return and_(model.valid_from <= today, or_(model.valid_till.is_(None), model.valid_till >= today))
+
+
+def _placement_filters(model, filter_data) -> list:
+    """Shared page/section/audience/status/date conditions for rewards, offers and ads"""
+    conditions = []
+    if filter_data.page:
+        conditions.append(model.page == filter_data.page.value)
+    if filter_data.section:
+        conditions.append(model.section == filter_data.section.value)
+    if filter_data.audience:
+        conditions.append(model.audience == filter_data.audience.value)
+    if filter_data.is_active is not None:
+        conditions.append(model.status == (StatusType.ACTIVE if filter_data.is_active else StatusType.INACTIVE).value)
+    conditions.append(_active_window(model))
+    return conditions
+
+
+def _offer_filters(filter_data: OfferFilter) -> list:
+    conditions = _placement_filters(OffersDiscounts, filter_data)
+    if filter_data.service_category:
+        conditions.append(OffersDiscounts.conditions_json.contains({"service": filter_data.service_category}))
+    return conditions
+
+
+def _personalized_filters(user_id: str, unclaimed_only: bool) -> list:
+    conditions = [PersonalizedRewards.user_id == user_id, _active_window(PersonalizedRewards)]
+    if unclaimed_only:
+        conditions.append(PersonalizedRewards.status == StatusType.ACTIVE.value)
+    return conditions
+
+
 class RewardsRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -40,28 +77,10 @@ class RewardsRepository:
         """Get reward by ID"""
         return self.db.query(RewardsPoints).filter(RewardsPoints.reward_id == reward_id).first()
 
+    @read_only
     def get_rewards_by_filter(self, filter_data: RewardFilter, page: int = 1, size: int = 20) -> tuple:
         """Get rewards with filtering and pagination"""
-        query = self.db.query(RewardsPoints)
-        
-        # Apply filters
-        if filter_data.page:
-            query = query.filter(RewardsPoints.page == filter_data.page.value)
-        if filter_data.section:
-            query = query.filter(RewardsPoints.section == filter_data.section.value)
-        if filter_data.audience:
-            query = query.filter(RewardsPoints.audience == filter_data.audience.value)
-        if filter_data.is_active is not None:
-            query = query.filter(RewardsPoints.status == StatusType.ACTIVE if filter_data.is_active else StatusType.INACTIVE)
-        
-        # Apply date filters
-        today = date.today()
-        query = query.filter(
-            and_(
-                RewardsPoints.valid_from <= today,
-                or_(RewardsPoints.valid_till.is_(None), RewardsPoints.valid_till >= today)
-            )
-        )
+        query = self.db.query(RewardsPoints).filter(*_placement_filters(RewardsPoints, filter_data))
         
         # Count total
         total = query.count()
@@ -130,30 +149,10 @@ class RewardsRepository:
         """Get offer by ID"""
         return self.db.query(OffersDiscounts).filter(OffersDiscounts.offer_id == offer_id).first()
 
+    @read_only
     def get_offers_by_filter(self, filter_data: OfferFilter, page: int = 1, size: int = 20) -> tuple:
         """Get offers with filtering and pagination"""
-        query = self.db.query(OffersDiscounts)
-        
-        # Apply filters
-        if filter_data.page:
-            query = query.filter(OffersDiscounts.page == filter_data.page.value)
-        if filter_data.section:
-            query = query.filter(OffersDiscounts.section == filter_data.section.value)
-        if filter_data.audience:
-            query = query.filter(OffersDiscounts.audience == filter_data.audience.value)
-        if filter_data.service_category:
-            query = query.filter(OffersDiscounts.conditions_json.contains({"service": filter_data.service_category}))
-        if filter_data.is_active is not None:
-            query = query.filter(OffersDiscounts.status == StatusType.ACTIVE if filter_data.is_active else StatusType.INACTIVE)
-        
-        # Apply date filters
-        today = date.today()
-        query = query.filter(
-            and_(
-                OffersDiscounts.valid_from <= today,
-                or_(OffersDiscounts.valid_till.is_(None), OffersDiscounts.valid_till >= today)
-            )
-        )
+        query = self.db.query(OffersDiscounts).filter(*_offer_filters(filter_data))
         
         # Count total
         total = query.count()
@@ -205,28 +204,10 @@ class RewardsRepository:
         """Get advertisement by ID"""
         return self.db.query(Advertisements).filter(Advertisements.ad_id == ad_id).first()
 
+    @read_only
     def get_advertisements_by_filter(self, filter_data: AdFilter, page: int = 1, size: int = 20) -> tuple:
         """Get advertisements with filtering and pagination"""
-        query = self.db.query(Advertisements)
-        
-        # Apply filters
-        if filter_data.page:
-            query = query.filter(Advertisements.page == filter_data.page.value)
-        if filter_data.section:
-            query = query.filter(Advertisements.section == filter_data.section.value)
-        if filter_data.audience:
-            query = query.filter(Advertisements.audience == filter_data.audience.value)
-        if filter_data.is_active is not None:
-            query = query.filter(Advertisements.status == StatusType.ACTIVE if filter_data.is_active else StatusType.INACTIVE)
-        
-        # Apply date filters
-        today = date.today()
-        query = query.filter(
-            and_(
-                Advertisements.valid_from <= today,
-                or_(Advertisements.valid_till.is_(None), Advertisements.valid_till >= today)
-            )
-        )
+        query = self.db.query(Advertisements).filter(*_placement_filters(Advertisements, filter_data))
         
         # Count total
         total = query.count()
@@ -412,20 +393,7 @@ class RewardsRepository:
 
     def get_user_personalized_rewards(self, user_id: str, unclaimed_only: bool = True) -> List[PersonalizedRewards]:
         """Get personalized rewards for a user"""
-        query = self.db.query(PersonalizedRewards).filter(PersonalizedRewards.user_id == user_id)
-        
-        if unclaimed_only:
-            query = query.filter(PersonalizedRewards.status == StatusType.ACTIVE)
-        
-        # Apply date filters
-        today = date.today()
-        query = query.filter(
-            and_(
-                PersonalizedRewards.valid_from <= today,
-                or_(PersonalizedRewards.valid_till.is_(None), PersonalizedRewards.valid_till >= today)
-            )
-        )
-        
+        query = self.db.query(PersonalizedRewards).filter(*_personalized_filters(user_id, unclaimed_only))
         return query.order_by(desc(PersonalizedRewards.created_at)).all()
 
     def claim_personalized_reward(self, reward_id: int, user_id: str) -> bool:
@@ -465,6 +433,7 @@ class RewardsRepository:
 
     # ==================== LOYALTY TIERS OPERATIONS ====================
     
+    @read_only
     def get_loyalty_tiers(self) -> List[LoyaltyTiers]:
         """Get all active loyalty tiers"""
         return self.db.query(LoyaltyTiers).filter(LoyaltyTiers.status == StatusType.ACTIVE)\
@@ -568,6 +537,7 @@ class RewardsRepository:
 
     # ==================== STATISTICS OPERATIONS ====================
     
+    @read_only
     def get_reward_statistics(self) -> Dict[str, Any]:
         """Get reward system statistics"""
         try:
@@ -612,3 +582,99 @@ class RewardsRepository:
         except Exception as e:
             logger.error(f"Error getting user reward statistics: {e}")
             return {}
+
+
+class AsyncRewardsRepository:
+    """AsyncSession counterpart of RewardsRepository for the hot read/counter paths"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @async_read_only
+    async def _paginate(self, model, conditions: list, page: int, size: int) -> tuple:
+        total = await self.db.scalar(select(func.count()).select_from(model).where(*conditions))
+        result = await self.db.scalars(
+            select(model).where(*conditions)
+            .order_by(desc(model.priority), desc(model.created_at))
+            .offset((page - 1) * size).limit(size)
+        )
+        return result.all(), total or 0
+
+    # ==================== LISTING OPERATIONS ====================
+
+    async def get_rewards_by_filter(self, filter_data: RewardFilter, page: int = 1, size: int = 20) -> tuple:
+        """Get rewards with filtering and pagination"""
+        return await self._paginate(RewardsPoints, _placement_filters(RewardsPoints, filter_data), page, size)
+
+    async def get_offers_by_filter(self, filter_data: OfferFilter, page: int = 1, size: int = 20) -> tuple:
+        """Get offers with filtering and pagination"""
+        return await self._paginate(OffersDiscounts, _offer_filters(filter_data), page, size)
+
+    async def get_advertisements_by_filter(self, filter_data: AdFilter, page: int = 1, size: int = 20) -> tuple:
+        """Get advertisements with filtering and pagination"""
+        return await self._paginate(Advertisements, _placement_filters(Advertisements, filter_data), page, size)
+
+    @async_read_only
+    async def get_user_personalized_rewards(self, user_id: str, unclaimed_only: bool = True) -> List[PersonalizedRewards]:
+        """Get personalized rewards for a user"""
+        result = await self.db.scalars(
+            select(PersonalizedRewards).where(*_personalized_filters(user_id, unclaimed_only))
+            .order_by(desc(PersonalizedRewards.created_at))
+        )
+        return result.all()
+
+    @async_read_only
+    async def get_user_loyalty(self, user_id: str) -> Optional[UserLoyalty]:
+        """Get user loyalty information"""
+        return await self.db.scalar(select(UserLoyalty).where(UserLoyalty.user_id == user_id))
+
+    # ==================== AD COUNTER OPERATIONS ====================
+
+    async def _increment_ad_counter(self, ad_id: int, column) -> bool:
+        try:
+            result = await self.db.execute(
+                update(Advertisements).where(Advertisements.ad_id == ad_id).values({column: func.coalesce(column, 0) + 1})
+            )
+            await self.db.commit()
+            return result.rowcount > 0
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error incrementing ad {column.key}: {e}")
+            raise
+
+    async def increment_ad_views(self, ad_id: int) -> bool:
+        """Increment advertisement view count"""
+        return await self._increment_ad_counter(ad_id, Advertisements.view_count)
+
+    async def increment_ad_clicks(self, ad_id: int) -> bool:
+        """Increment advertisement click count"""
+        return await self._increment_ad_counter(ad_id, Advertisements.click_count)
+
+    # ==================== STATISTICS OPERATIONS ====================
+
+    @async_read_only
+    async def get_reward_statistics(self) -> Dict[str, Any]:
+        """Get reward system statistics"""
+        try:
+            reward_counts = (await self.db.execute(
+                select(
+                    func.count(RewardsPoints.reward_id),
+                    func.count(RewardsPoints.reward_id).filter(RewardsPoints.status == StatusType.ACTIVE.value),
+                )
+            )).one()
+            points = (await self.db.execute(
+                select(
+                    func.sum(RewardTransactions.points_amount).filter(RewardTransactions.transaction_type == "earned"),
+                    func.sum(RewardTransactions.points_amount).filter(RewardTransactions.transaction_type == "redeemed"),
+                )
+            )).one()
+
+            return {
+                "total_rewards": reward_counts[0],
+                "active_rewards": reward_counts[1],
+                "total_points_issued": points[0] or 0,
+                "total_points_redeemed": abs(points[1] or 0)
+            }
+        except Exception as e:
+            logger.error(f"Error getting reward statistics: {e}")
+            return {}
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Optional, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.session import UserSession, SessionLog
+from models.user import User
+
+
+class AsyncSessionRepository:
+    """AsyncSession counterpart of the queries in SessionService, used by the session endpoints."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        """Get user by username."""
+        return await self.db.scalar(select(User).where(User.username == username))
+
+    async def get_active_session(self, token: str) -> Optional[UserSession]:
+        """Get active session by token."""
+        return await self.db.scalar(
+            select(UserSession).where(
+                UserSession.session_token == token,
+                UserSession.is_active == True,
+                UserSession.expires_at > datetime.utcnow()
+            )
+        )
+
+    async def get_user_sessions(self, user_id: int) -> List[UserSession]:
+        """Get all sessions for a user."""
+        result = await self.db.scalars(
+            select(UserSession).where(UserSession.user_id == user_id).order_by(UserSession.created_at.desc())
+        )
+        return result.all()
+
+    async def get_user_session_logs(self, user_id: int, limit: int = 50) -> List[SessionLog]:
+        """Get session logs for a user."""
+        result = await self.db.scalars(
+            select(SessionLog).where(SessionLog.user_id == user_id)
+            .order_by(SessionLog.created_at.desc()).limit(limit)
+        )
+        return result.all()
+
+    async def update_session_activity(self, token: str) -> bool:
+        """Update last activity time for session."""
+        session = await self.get_active_session(token)
+        if session:
+            session.last_activity = datetime.utcnow()
+            await self.db.commit()
+            return True
+        return False
+
+    async def deactivate_session(self, token: str, ip_address: str = None,
+                                 user_agent: str = None) -> bool:
+        """Deactivate a session (logout)."""
+        session = await self.get_active_session(token)
+        if session:
+            session.is_active = False
+            self.add_session_log(session.user_id, "logout", token, ip_address, user_agent, True)
+            await self.db.commit()
+            return True
+        return False
+
+    async def deactivate_all_user_sessions(self, user_id: int, ip_address: str = None,
+                                           user_agent: str = None) -> int:
+        """Deactivate all sessions for a user."""
+        result = await self.db.scalars(
+            select(UserSession).where(UserSession.user_id == user_id, UserSession.is_active == True)
+        )
+        sessions = result.all()
+
+        for session in sessions:
+            session.is_active = False
+            self.add_session_log(user_id, "logout", session.session_token, ip_address, user_agent, True)
+
+        await self.db.commit()
+        return len(sessions)
+
+    def add_session_log(self, user_id: int, action: str, token: str = None,
+                        ip_address: str = None, user_agent: str = None,
+                        success: bool = True, error_message: str = None):
+        """Stage a session log row; it is written with the caller's commit."""
+        self.db.add(SessionLog(
+            user_id=user_id,
+            action=action,
+            session_token=token,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            success=success,
+            error_message=error_message
+        ))
@@ -3,9 +3,12 @@ from jose import JWTError, jwt
 
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from config.settings import settings
+from database.async_session import get_async_db
 from database.session import get_db
 from models.user import User
 
@@ -52,3 +55,32 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             detail="User not found",
         )
     return user
+
+# Same check on the request's AsyncSession, so async endpoints hold one pooled connection instead of two
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    payload = verify_access_token(token)
+    username: str = payload.get("sub")
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+    user = await db.scalar(select(User).where(User.username == username))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    return user
+
+# Dependency factory: current user must hold resource:action through a role or a direct grant
+def require_permission(resource: str, action: str):
+    def dependency(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
+        from service.rbac_service import RBACService
+        if not RBACService(db).check_permission(current_user.id, resource, action):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        return current_user
+    return dependency
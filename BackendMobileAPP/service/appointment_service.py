@@ -1,15 +1,17 @@
 from datetime import datetime, time, timedelta
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 import os
 import logging
 
-from models.appointment import Appointment, AppointmentWalkin
+from models.appointment import Appointment, AppointmentWalkin, SLOT_UNIQUE_INDEX
 from dto.appointment_schema import AppointmentCreateDTO, AppointmentResponseDTO
 from repository.appointment_repo import WalkinAppointmentRepository
-from utils.email_utils import send_appointment_details_email, send_reminder_email
-from utils.ics_utils import generate_ics_file
+from utils.email_utils import send_appointment_details_email
+from services.calendar_feeds import calendar_feed_service
+from services.appointment_reminders import appointment_reminder_worker, build_appointment_reminder
 from constants.status_codes import STATUS_MAP
 
 # Optional admin alert
@@ -22,12 +24,24 @@ except:
 # Logging setup
 logger = logging.getLogger("uvicorn.error")
 
-# Singleton-safe scheduler
-scheduler = None
-if os.getenv("RUN_MAIN") != "true":
-    from apscheduler.schedulers.background import BackgroundScheduler
-    scheduler = BackgroundScheduler()
-    scheduler.start()
+# Extra slots tried when the requested one is taken and the caller asked for the next free one
+BOOKING_MAX_SLOT_RETRIES = int(os.getenv("BOOKING_MAX_SLOT_RETRIES", "3"))
+
+
+class SlotUnavailableError(Exception):
+    """The requested slot is taken; carries the next free slot of that day, if any."""
+
+    def __init__(self, next_free_slot: Optional[tuple] = None):
+        super().__init__("Slot already booked")
+        self.next_free_slot = next_free_slot
+
+
+def _is_slot_conflict(error: IntegrityError) -> bool:
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None and getattr(diag, "constraint_name", None):
+        return diag.constraint_name == SLOT_UNIQUE_INDEX
+    message = str(error.orig)
+    return SLOT_UNIQUE_INDEX in message or "appointments.doctor_id, appointments.date, appointments.start_time" in message
 
 
 class AppointmentService:
@@ -45,75 +59,93 @@ class AppointmentService:
     @staticmethod
     def get_available_slots(db: Session, doctor_id: int, date_: datetime.date) -> List[tuple]:
         all_slots = AppointmentService.generate_time_slots(time(10, 0), time(18, 0))
-        booked = db.query(Appointment).filter_by(doctor_id=doctor_id, date=date_).all()
-        booked_slots = {(a.start_time, a.end_time) for a in booked}
+        booked = db.query(Appointment.start_time, Appointment.end_time).filter_by(
+            doctor_id=doctor_id, date=date_, status=STATUS_MAP["Scheduled"]
+        ).all()
+        booked_slots = {(start, end) for start, end in booked}
         return [slot for slot in all_slots if slot not in booked_slots]
 
     @staticmethod
-    def book_appointment(db: Session, patient_id: int, data: AppointmentCreateDTO):
-        existing = db.query(Appointment).filter_by(
-            doctor_id=data.doctor_id,
-            date=data.date,
-            start_time=data.start_time,
-            end_time=data.end_time
-        ).first()
-
-        if existing:
-            logger.warning("❌ Slot already booked for doctor %s on %s %s–%s",
-                           data.doctor_id, data.date, data.start_time, data.end_time)
-            raise Exception("Slot already booked")
-
+    def _try_book(db: Session, patient_id: int, doctor_id: int, date_, start_time: time,
+                  end_time: time, patient_email: Optional[str] = None,
+                  doctor_email: Optional[str] = None) -> Optional[Appointment]:
+        """
+        Reserve the slot with a single INSERT; the partial unique index rejects a
+        second scheduled booking, so concurrent requests cannot both succeed.
+        When both emails are known the reminder row is inserted in the same
+        transaction, so a booking is never committed without its reminder.
+        Returns None when the slot is already taken.
+        """
         appointment = Appointment(
             appointment_id=str(uuid.uuid4()),
             patient_id=patient_id,
-            doctor_id=data.doctor_id,
-            date=data.date,
-            start_time=data.start_time,
-            end_time=data.end_time,
+            doctor_id=doctor_id,
+            date=date_,
+            start_time=start_time,
+            end_time=end_time,
             video_call_link=f"https://meet.jit.si/{uuid.uuid4()}",
             status=STATUS_MAP["Scheduled"]
         )
-
         try:
             db.add(appointment)
+            if patient_email and doctor_email:
+                db.add(build_appointment_reminder(appointment, patient_email, doctor_email))
             db.commit()
             db.refresh(appointment)
+            calendar_feed_service.invalidate(patient_id, doctor_id)
+            if patient_email and doctor_email:
+                appointment_reminder_worker.notify()
+            return appointment
+        except IntegrityError as db_err:
+            db.rollback()
+            if _is_slot_conflict(db_err):
+                logger.warning("❌ Slot already booked for doctor %s on %s %s–%s",
+                               doctor_id, date_, start_time, end_time)
+                return None
+            logger.error("❌ DB Error while booking appointment: %s", str(db_err))
+            raise Exception("Failed to save appointment")
         except Exception as db_err:
             db.rollback()
             logger.error("❌ DB Error while booking appointment: %s", str(db_err))
             raise Exception("Failed to save appointment")
 
-        try:
-            patient = db.query(Appointment.patient.property.mapper.class_).filter_by(id=patient_id).first()
-            doctor = db.query(Appointment.doctor.property.mapper.class_).filter_by(id=data.doctor_id).first()
-
-            patient_email = getattr(patient, 'email', None)
-            doctor_email = getattr(doctor, 'email', None)
-
-            if patient_email and doctor_email:
-                # 1. Generate .ics file
-                ics_path = generate_ics_file(appointment)
+    @staticmethod
+    def _next_free_slots(db: Session, doctor_id: int, date_, after: time) -> List[tuple]:
+        return [slot for slot in AppointmentService.get_available_slots(db, doctor_id, date_) if slot[0] > after]
 
-                # 2. Send email with .ics attachment
-                send_appointment_details_email(patient_email, doctor_email, appointment)
+    @staticmethod
+    def book_appointment(db: Session, patient_id: int, data: AppointmentCreateDTO):
+        patient = db.query(Appointment.patient.property.mapper.class_).filter_by(id=patient_id).first()
+        doctor = db.query(Appointment.doctor.property.mapper.class_).filter_by(id=data.doctor_id).first()
+        patient_email = getattr(patient, 'email', None)
+        doctor_email = getattr(doctor, 'email', None)
 
-                # 3. Schedule reminder
-                appointment_time = datetime.combine(appointment.date, appointment.start_time)
-                reminder_time = appointment_time - timedelta(minutes=10)
+        appointment = AppointmentService._try_book(
+            db, patient_id, data.doctor_id, data.date, data.start_time, data.end_time, patient_email, doctor_email
+        )
+        if appointment is None and data.book_next_free:
+            # Looked up only after a conflict, so the common path stays a single INSERT
+            next_slots = AppointmentService._next_free_slots(db, data.doctor_id, data.date, data.start_time)
+            for start_time, end_time in next_slots[:BOOKING_MAX_SLOT_RETRIES]:
+                appointment = AppointmentService._try_book(
+                    db, patient_id, data.doctor_id, data.date, start_time, end_time, patient_email, doctor_email
+                )
+                if appointment is not None:
+                    break
 
-                if scheduler:
-                    scheduler.add_job(
-                        send_reminder_email,
-                        'date',
-                        run_date=reminder_time,
-                        args=[patient_email, doctor_email, appointment]
-                    )
+        if appointment is None:
+            remaining = AppointmentService._next_free_slots(db, data.doctor_id, data.date, data.start_time)
+            raise SlotUnavailableError(remaining[0] if remaining else None)
 
+        # The reminder is already committed with the booking; only the invite email can fail here
+        try:
+            if patient_email and doctor_email:
+                send_appointment_details_email(patient_email, doctor_email, appointment)
         except Exception as post_error:
             logger.warning("⚠️ Post-processing failed: %s", str(post_error))
             try:
                 send_alert_to_admin(
-                    f"📢 Appointment booked (ID: {appointment.appointment_id}), but email/reminder failed: {post_error}"
+                    f"📢 Appointment booked (ID: {appointment.appointment_id}), but the invite email failed: {post_error}"
                 )
             except Exception as alert_err:
                 logger.error("❌ Failed to notify admin: %s", str(alert_err))
@@ -122,7 +154,7 @@ class AppointmentService:
             "message": "✅ Appointment booked successfully",
             "appointmentId": appointment.appointment_id,
             "videoCallLink": appointment.video_call_link,
-            "note": "⚠️ Calendar invite or reminder might not have been sent due to an error.",
+            "note": "⚠️ Calendar invite might not have been sent due to an error.",
             "data": AppointmentResponseDTO.from_orm(appointment)
         }
 
@@ -3,14 +3,14 @@ import uuid
 import asyncio
 import logging
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
 import json
 from config.settings import settings
 from models.booking_model import Booking, ReservedSlot, ConfirmedBooking,RescheduleLog
 from dto.booking_schema import BookingCreate, ReserveSlotRequest
-from repository.booking_repo import BookingRepository
+from repository.booking_repo import AsyncBookingRepository
 
 
 
@@ -23,7 +23,7 @@ RETRY_DELAY = 2  # seconds
 
 class BookingService:
     @staticmethod
-    async def create_booking(payload: BookingCreate, db: Session, current_user):
+    async def create_booking(payload: BookingCreate, db: AsyncSession, current_user):
         guest_ids = [guest.id for guest in payload.guests]
         if current_user.guest_id not in guest_ids:
             raise ValueError("Unauthorized: Guest ID mismatch")
@@ -73,10 +73,10 @@ class BookingService:
             updated_at=datetime.utcnow()
         )
 
-        return BookingRepository.save_booking(db, booking)
+        return await AsyncBookingRepository.save_booking(db, booking)
 
     @staticmethod
-    async def get_available_slots(booking_id: str, check_future_day_availability: bool, db: Session, current_user):
+    async def get_available_slots(booking_id: str, check_future_day_availability: bool, db: AsyncSession, current_user):
         headers = {
             "Authorization": f"apikey {settings.ZENOTI_API_KEY}",
             "accept": "application/json"
@@ -92,7 +92,7 @@ class BookingService:
         return response.json()
 
     @staticmethod
-    async def reserve_slot(booking_id: str, payload: ReserveSlotRequest, db: Session):
+    async def reserve_slot(booking_id: str, payload: ReserveSlotRequest, db: AsyncSession):
         headers = {
             "Authorization": f"apikey {settings.ZENOTI_API_KEY}",
             "accept": "application/json",
@@ -130,7 +130,7 @@ class BookingService:
                     created_at=datetime.utcnow()
                 )
 
-                return BookingRepository.save_reserved_slot(db, reservation)
+                return await AsyncBookingRepository.save_reserved_slot(db, reservation)
 
             except httpx.HTTPStatusError as http_err:
                 logger.warning(f"[Attempt {attempt}] Zenoti API returned {http_err.response.status_code}: {http_err.response.text}")
@@ -143,7 +143,7 @@ class BookingService:
             await asyncio.sleep(RETRY_DELAY)
 
     @staticmethod
-    async def confirm_booking(booking_id: str, db: Session):
+    async def confirm_booking(booking_id: str, db: AsyncSession):
         headers = {
             "Authorization": f"apikey {settings.ZENOTI_API_KEY}",
             "accept": "application/json",
@@ -197,11 +197,11 @@ class BookingService:
             created_at=datetime.utcnow()
         )
 
-        return BookingRepository.save_confirmed_booking(db, confirmed)
+        return await AsyncBookingRepository.save_confirmed_booking(db, confirmed)
     
     @staticmethod
 
-    async def cancel_invoice(invoice_id: str, comment: str, db: Session, current_user):
+    async def cancel_invoice(invoice_id: str, comment: str, db: AsyncSession, current_user):
         headers = {
             "Authorization": f"apikey {settings.ZENOTI_API_KEY}",
             "accept": "application/json",
@@ -223,10 +223,7 @@ class BookingService:
             raise HTTPException(status_code=500, detail="Internal Server Error")
 
         # Delete from ConfirmedBooking
-        booking = db.query(ConfirmedBooking).filter(ConfirmedBooking.invoice_id == invoice_id).first()
-        if booking:
-            db.delete(booking)
-            db.commit()
+        await AsyncBookingRepository.delete_confirmed_booking_by_invoice_id(db, invoice_id)
 
         return {
             "status": "success",
@@ -235,7 +232,7 @@ class BookingService:
         }
  
     @staticmethod
-    async def reschedule_booking(payload, db):
+    async def reschedule_booking(payload, db: AsyncSession):
         headers = {
             "Authorization": f"apikey {settings.ZENOTI_API_KEY}",
             "accept": "application/json",
@@ -273,7 +270,7 @@ class BookingService:
             raise HTTPException(status_code=500, detail="No booking ID returned")
 
         # Update existing booking
-        booking = db.query(Booking).filter(Booking.booking_id == payload.invoice_id).first()
+        booking = await AsyncBookingRepository.get_booking(db, payload.invoice_id)
         if booking:
             booking.booking_id = new_booking_id
             booking.date = payload.date
@@ -288,6 +285,6 @@ class BookingService:
             invoice_item_id=payload.invoice_item_id
         )
         db.add(log)
-        db.commit()
+        await db.commit()
 
         return {"new_booking_id": new_booking_id, "message": "Booking rescheduled successfully."}
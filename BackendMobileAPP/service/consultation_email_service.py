@@ -47,6 +47,11 @@ class ConsultationEmailService:
             print(f"Email sending failed: {e}")
             return False
     
+    @staticmethod
+    def create_meeting_email_subject(customer_name: str, doctor_name: str) -> str:
+        """Subject line of the meeting invitation"""
+        return f"Oliva Clinic - Consultation Meeting for {customer_name} & {doctor_name}"
+    
     @staticmethod
     def create_meeting_email_body(customer_name: str, doctor_name: str, slot_time: str, meeting_link: str) -> str:
         """Create HTML email body for meeting invitation"""
@@ -128,7 +133,7 @@ class ConsultationEmailService:
     ) -> List[str]:
         """Send meeting emails to both parties"""
         emails_sent = []
-        subject = f"Oliva Clinic - Consultation Meeting for {customer_name} & {doctor_name}"
+        subject = ConsultationEmailService.create_meeting_email_subject(customer_name, doctor_name)
         body = ConsultationEmailService.create_meeting_email_body(customer_name, doctor_name, slot_time, meeting_link)
         
         # Send to customer
@@ -0,0 +1,167 @@
+import os
+import queue
+import smtplib
+import threading
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+from config.settings import settings
+from service.consultation_email_service import ConsultationEmailService
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+# Worker threads, each holding one SMTP connection
+CONSULTATION_EMAIL_WORKERS = int(_float_env("CONSULTATION_EMAIL_WORKERS", 4))
+# A connection with nothing to send for this long is closed (SMTP servers drop idle clients anyway)
+CONSULTATION_EMAIL_IDLE_SECONDS = _float_env("CONSULTATION_EMAIL_IDLE_SECONDS", 30.0)
+CONSULTATION_EMAIL_MAX_ATTEMPTS = int(_float_env("CONSULTATION_EMAIL_MAX_ATTEMPTS", 3))
+CONSULTATION_EMAIL_TIMEOUT_SECONDS = _float_env("CONSULTATION_EMAIL_TIMEOUT_SECONDS", 30.0)
+
+
+class ConsultationMailer:
+    """
+    Background SMTP sender for consultation invitations.
+
+    Messages go on an in-process queue drained by a few worker threads. Each
+    worker logs in once and reuses its connection for every message until it
+    sits idle, instead of a connect/STARTTLS/login per email as
+    ConsultationEmailService.send_email does. A failed send drops the
+    connection and is retried up to CONSULTATION_EMAIL_MAX_ATTEMPTS times.
+    The queue is memory only: mail still queued when the process dies is lost.
+    """
+
+    def __init__(self, workers: int = CONSULTATION_EMAIL_WORKERS,
+                 idle_seconds: float = CONSULTATION_EMAIL_IDLE_SECONDS,
+                 max_attempts: int = CONSULTATION_EMAIL_MAX_ATTEMPTS):
+        self.workers = max(1, workers)
+        self.idle_seconds = idle_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.SENDER_EMAIL and settings.SENDER_PASSWORD)
+
+    # ==== Queueing ====
+
+    def enqueue(self, to_email: str, subject: str, body: str) -> bool:
+        """Queue one HTML email; False when it cannot be sent (no SMTP credentials or a bad address)"""
+        if not self.configured or not to_email or not ConsultationEmailService.validate_email(to_email):
+            return False
+        self._start_workers()
+        self._queue.put((to_email, subject, body, 1))
+        return True
+
+    def _start_workers(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._run, name=f"consultation-mailer-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self, timeout: float = 10.0):
+        """Let the workers finish what is queued, then stop them"""
+        with self._lock:
+            threads = [thread for thread in self._threads if thread.is_alive()]
+            self._threads = []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "workers": sum(thread.is_alive() for thread in self._threads)
+        }
+
+    # ==== Sending ====
+
+    @staticmethod
+    def _connect() -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=CONSULTATION_EMAIL_TIMEOUT_SECONDS)
+        try:
+            server.starttls()
+            server.login(settings.SENDER_EMAIL, settings.SENDER_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    @staticmethod
+    def _disconnect(server: Optional[smtplib.SMTP]):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _message(to_email: str, subject: str, body: str) -> str:
+        msg = MIMEMultipart()
+        msg['From'] = settings.SENDER_EMAIL
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'html'))
+        return msg.as_string()
+
+    def _run(self):
+        server = None
+        while True:
+            try:
+                # Only time out (and hang up) while a connection is open
+                job = self._queue.get(timeout=self.idle_seconds if server is not None else None)
+            except queue.Empty:
+                self._disconnect(server)
+                server = None
+                continue
+
+            if job is None:
+                self._disconnect(server)
+                self._queue.task_done()
+                return
+
+            to_email, subject, body, attempt = job
+            try:
+                if server is None:
+                    server = self._connect()
+                server.sendmail(settings.SENDER_EMAIL, to_email, self._message(to_email, subject, body))
+                with self._lock:
+                    self.sent += 1
+            except Exception as e:
+                # Dropped or refused: the next message gets a fresh connection
+                self._disconnect(server)
+                server = None
+                if attempt < self.max_attempts:
+                    logger.warning(f"Consultation email to {to_email} failed (attempt {attempt}), retrying: {e}")
+                    self._queue.put((to_email, subject, body, attempt + 1))
+                else:
+                    logger.error(f"Consultation email to {to_email} failed after {attempt} attempts: {e}")
+                    with self._lock:
+                        self.failed += 1
+            finally:
+                self._queue.task_done()
+
+
+consultation_mailer = ConsultationMailer()
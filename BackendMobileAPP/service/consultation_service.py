@@ -1,18 +1,26 @@
 import secrets
 import string
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Optional, List, Tuple
+from starlette.concurrency import run_in_threadpool
 from config.settings import settings
+from database.pagination import DEFAULT_PAGE_SIZE
 from service.consultation_email_service import ConsultationEmailService
-from repository.meeting_repository import MeetingRepository
-from dto.meeting_schema import CreateMeetingRequest, MeetingResponse, EmailResponse
+from service.consultation_mailer import ConsultationMailer, consultation_mailer
+from repository.meeting_repository import MeetingRepository, meeting_key, parse_slot_time
+from models.meeting import Meeting
+from dto.meeting_schema import (
+    CreateMeetingRequest, MeetingResponse, EmailResponse,
+    BulkCreateMeetingRequest, BulkMeetingResult, BulkMeetingResponse
+)
 
 class ConsultationService:
     """Service for handling consultation-related operations"""
     
-    def __init__(self, repository: MeetingRepository):
+    def __init__(self, repository: MeetingRepository, mailer: ConsultationMailer = consultation_mailer):
         """Initialize service with repository dependency injection"""
         self.repository = repository
+        self.mailer = mailer
     
     @staticmethod
     def sanitize_name(name: str) -> str:
@@ -35,6 +43,9 @@ class ConsultationService:
         if not slot_time or not slot_time.strip():
             return False, "Slot time is required"
         
+        if parse_slot_time(slot_time) is None:
+            return False, "Slot time must start with a date and time, e.g. 2024-08-15 10:00 AM"
+        
         return True, ""
     
     @staticmethod
@@ -56,6 +67,22 @@ class ConsultationService:
         """Create Jitsi Meet link with configuration parameters"""
         return f"{settings.JITSI_BASE_URL}/{meeting_id}#{settings.JITSI_CONFIG_PARAMS}"
     
+    @staticmethod
+    def renew_meeting_id(meeting_data: dict) -> dict:
+        """Same meeting data under a freshly generated meeting_id and link"""
+        meeting_id = ConsultationService.generate_meeting_id(meeting_data["customer_name"], meeting_data["doctor_name"])
+        return {**meeting_data, "meeting_id": meeting_id, "meeting_link": ConsultationService.create_meeting_link(meeting_id)}
+    
+    @staticmethod
+    def resolve_doctor_email(request: CreateMeetingRequest) -> Optional[str]:
+        """Doctor email from the request, else from settings"""
+        return request.doctor_email or settings.DOCTOR_EMAILS.get(request.doctor_name)
+    
+    @staticmethod
+    def to_response(meeting: Meeting) -> MeetingResponse:
+        """Convert a stored meeting to its response DTO"""
+        return MeetingResponse.model_validate(meeting)
+    
     async def generate_meeting(self, request: CreateMeetingRequest) -> MeetingResponse:
         """Generate a new meeting with Jitsi Meet link and store it"""
         # Validate request
@@ -73,9 +100,7 @@ class ConsultationService:
         meeting_link = ConsultationService.create_meeting_link(meeting_id)
         
         # Get doctor email from settings if not provided
-        doctor_email = request.doctor_email
-        if not doctor_email and request.doctor_name in settings.DOCTOR_EMAILS:
-            doctor_email = settings.DOCTOR_EMAILS[request.doctor_name]
+        doctor_email = ConsultationService.resolve_doctor_email(request)
         
         # Create meeting data
         meeting_data = {
@@ -93,17 +118,7 @@ class ConsultationService:
         meeting = await self.repository.create_meeting(meeting_data)
         
         # Convert to response format
-        return MeetingResponse(
-            meeting_id=meeting.meeting_id,
-            meeting_link=meeting.meeting_link,
-            customer_name=meeting.customer_name,
-            doctor_name=meeting.doctor_name,
-            slot_time=meeting.slot_time,
-            customer_email=meeting.customer_email,
-            doctor_email=meeting.doctor_email,
-            status=meeting.status,
-            created_at=meeting.created_at
-        )
+        return ConsultationService.to_response(meeting)
     
     async def send_meeting_emails(self, request: CreateMeetingRequest) -> EmailResponse:
         """Generate meeting and send emails to both parties"""
@@ -111,12 +126,11 @@ class ConsultationService:
         meeting_response = await self.generate_meeting(request)
         
         # Get doctor email from settings if not provided
-        doctor_email = request.doctor_email
-        if not doctor_email and request.doctor_name in settings.DOCTOR_EMAILS:
-            doctor_email = settings.DOCTOR_EMAILS[request.doctor_name]
+        doctor_email = ConsultationService.resolve_doctor_email(request)
         
-        # Send emails
-        emails_sent = ConsultationEmailService.send_meeting_emails(
+        # Send emails (blocking SMTP, so off the event loop)
+        emails_sent = await run_in_threadpool(
+            ConsultationEmailService.send_meeting_emails,
             customer_name=request.customer_name,
             doctor_name=request.doctor_name,
             slot_time=request.slot_time,
@@ -132,94 +146,154 @@ class ConsultationService:
             message="Meeting created and emails sent successfully"
         )
     
+    async def create_meetings_bulk(self, request: BulkCreateMeetingRequest) -> BulkMeetingResponse:
+        """
+        Create a roster of meetings with one bulk insert and queue their invitations.
+        
+        Each item gets its own result: invalid and repeated items are skipped
+        without failing the rest. An item is a duplicate when it repeats an earlier
+        item or matches an active stored meeting (same customer, doctor and slot), so
+        resubmitting a roster, e.g. a client retry after a timeout, books and emails
+        nothing twice. Invitations go to the pooled background sender, so
+        emails_queued means queued, not yet delivered.
+        """
+        results: List[Optional[BulkMeetingResult]] = [None] * len(request.meetings)
+        pending = []
+        seen = {}
+        meeting_ids = set()
+        
+        for index, item in enumerate(request.meetings):
+            is_valid, error_message = ConsultationService.validate_meeting_request(
+                item.customer_name, item.doctor_name, item.slot_time
+            )
+            if not is_valid:
+                results[index] = BulkMeetingResult(index=index, status="invalid", error=error_message)
+                continue
+            
+            slot_starts_at = parse_slot_time(item.slot_time)
+            key = meeting_key(item.customer_name, item.doctor_name, slot_starts_at)
+            if key in seen:
+                results[index] = BulkMeetingResult(
+                    index=index, status="duplicate", error=f"Same meeting as item {seen[key]}"
+                )
+                continue
+            seen[key] = index
+            
+            meeting_id = ConsultationService.generate_meeting_id(item.customer_name, item.doctor_name)
+            while meeting_id in meeting_ids:
+                meeting_id = ConsultationService.generate_meeting_id(item.customer_name, item.doctor_name)
+            meeting_ids.add(meeting_id)
+            
+            pending.append((index, item, {
+                "meeting_id": meeting_id,
+                "meeting_link": ConsultationService.create_meeting_link(meeting_id),
+                "customer_name": item.customer_name,
+                "doctor_name": item.doctor_name,
+                "slot_time": item.slot_time,
+                "slot_starts_at": slot_starts_at,
+                "customer_email": item.customer_email,
+                "doctor_email": ConsultationService.resolve_doctor_email(item),
+                "status": "active"
+            }))
+        
+        meetings, duplicates = await self.repository.create_meetings(
+            [data for _, _, data in pending], ConsultationService.renew_meeting_id
+        )
+        
+        for position, ((index, item, data), meeting) in enumerate(zip(pending, meetings)):
+            if position in duplicates:
+                results[index] = BulkMeetingResult(
+                    index=index, status="duplicate",
+                    error="An active meeting for this customer, doctor and slot already exists"
+                )
+                continue
+            if meeting is None:
+                results[index] = BulkMeetingResult(index=index, status="failed", error="Meeting could not be stored")
+                continue
+            
+            emails_queued = []
+            if request.send_emails:
+                subject = ConsultationEmailService.create_meeting_email_subject(item.customer_name, item.doctor_name)
+                body = ConsultationEmailService.create_meeting_email_body(
+                    item.customer_name, item.doctor_name, item.slot_time, meeting.meeting_link
+                )
+                for email in (meeting.customer_email, meeting.doctor_email):
+                    if email and self.mailer.enqueue(email, subject, body):
+                        emails_queued.append(email)
+            
+            results[index] = BulkMeetingResult(
+                index=index,
+                status="created",
+                meeting=ConsultationService.to_response(meeting),
+                emails_queued=emails_queued
+            )
+        
+        created = sum(result.status == "created" for result in results)
+        message = f"{created} of {len(results)} meetings created"
+        if request.send_emails and not self.mailer.configured:
+            message += "; email configuration not set, no invitations sent"
+        return BulkMeetingResponse(
+            results=results,
+            created=created,
+            failed=len(results) - created,
+            emails_queued=sum(len(result.emails_queued) for result in results),
+            message=message
+        )
+    
     async def get_meeting_by_id(self, meeting_id: str) -> Optional[MeetingResponse]:
         """Get meeting by ID"""
         meeting = await self.repository.get_meeting_by_id(meeting_id)
         if meeting:
-            return MeetingResponse(
-                meeting_id=meeting.meeting_id,
-                meeting_link=meeting.meeting_link,
-                customer_name=meeting.customer_name,
-                doctor_name=meeting.doctor_name,
-                slot_time=meeting.slot_time,
-                customer_email=meeting.customer_email,
-                doctor_email=meeting.doctor_email,
-                status=meeting.status,
-                created_at=meeting.created_at
-            )
+            return ConsultationService.to_response(meeting)
         return None
     
-    async def get_meetings_by_customer(self, customer_name: str) -> List[MeetingResponse]:
-        """Get all meetings for a customer"""
-        meetings = await self.repository.get_meetings_by_customer(customer_name)
-        return [
-            MeetingResponse(
-                meeting_id=meeting.meeting_id,
-                meeting_link=meeting.meeting_link,
-                customer_name=meeting.customer_name,
-                doctor_name=meeting.doctor_name,
-                slot_time=meeting.slot_time,
-                customer_email=meeting.customer_email,
-                doctor_email=meeting.doctor_email,
-                status=meeting.status,
-                created_at=meeting.created_at
-            )
-            for meeting in meetings
-        ]
-    
-    async def get_meetings_by_doctor(self, doctor_name: str) -> List[MeetingResponse]:
-        """Get all meetings for a doctor"""
-        meetings = await self.repository.get_meetings_by_doctor(doctor_name)
-        return [
-            MeetingResponse(
-                meeting_id=meeting.meeting_id,
-                meeting_link=meeting.meeting_link,
-                customer_name=meeting.customer_name,
-                doctor_name=meeting.doctor_name,
-                slot_time=meeting.slot_time,
-                customer_email=meeting.customer_email,
-                doctor_email=meeting.doctor_email,
-                status=meeting.status,
-                created_at=meeting.created_at
-            )
-            for meeting in meetings
-        ]
+    async def get_meetings_by_customer(
+        self,
+        customer_name: str,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Tuple[List[MeetingResponse], Optional[str]]:
+        """One page of a customer's meetings in slot order, and the next cursor"""
+        meetings, next_cursor = await self.repository.get_meetings_by_customer(
+            customer_name, cursor, limit, date_from, date_to
+        )
+        return [ConsultationService.to_response(meeting) for meeting in meetings], next_cursor
+    
+    async def get_meetings_by_doctor(
+        self,
+        doctor_name: str,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Tuple[List[MeetingResponse], Optional[str]]:
+        """One page of a doctor's meetings in slot order, and the next cursor"""
+        meetings, next_cursor = await self.repository.get_meetings_by_doctor(
+            doctor_name, cursor, limit, date_from, date_to
+        )
+        return [ConsultationService.to_response(meeting) for meeting in meetings], next_cursor
     
     async def update_meeting_status(self, meeting_id: str, status: str) -> Optional[MeetingResponse]:
         """Update meeting status"""
         meeting = await self.repository.update_meeting_status(meeting_id, status)
         if meeting:
-            return MeetingResponse(
-                meeting_id=meeting.meeting_id,
-                meeting_link=meeting.meeting_link,
-                customer_name=meeting.customer_name,
-                doctor_name=meeting.doctor_name,
-                slot_time=meeting.slot_time,
-                customer_email=meeting.customer_email,
-                doctor_email=meeting.doctor_email,
-                status=meeting.status,
-                created_at=meeting.created_at
-            )
+            return ConsultationService.to_response(meeting)
         return None
     
     async def delete_meeting(self, meeting_id: str) -> bool:
         """Delete a meeting by ID"""
         return await self.repository.delete_meeting(meeting_id)
     
-    async def get_all_meetings(self, skip: int = 0, limit: int = 100) -> List[MeetingResponse]:
-        """Get all meetings with pagination"""
-        meetings = await self.repository.get_all_meetings(skip, limit)
-        return [
-            MeetingResponse(
-                meeting_id=meeting.meeting_id,
-                meeting_link=meeting.meeting_link,
-                customer_name=meeting.customer_name,
-                doctor_name=meeting.doctor_name,
-                slot_time=meeting.slot_time,
-                customer_email=meeting.customer_email,
-                doctor_email=meeting.doctor_email,
-                status=meeting.status,
-                created_at=meeting.created_at
-            )
-            for meeting in meetings
-        ]
+    async def get_all_meetings(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Tuple[List[MeetingResponse], Optional[str]]:
+        """One page of meetings in slot order, and the next cursor"""
+        meetings, next_cursor = await self.repository.get_all_meetings(cursor, limit, status, date_from, date_to)
+        return [ConsultationService.to_response(meeting) for meeting in meetings], next_cursor
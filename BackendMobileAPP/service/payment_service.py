@@ -1,7 +1,16 @@
-import requests
+import asyncio
+import os
+import threading
+import time
+
+from utils.http_client import PooledHTTPClient
 
 RAZORPAY_TOKEN_URL = "https://payments.olivaclinic.com/api/token"
 RAZORPAY_PAYMENT_URL = "https://payments.olivaclinic.com/api/payment"
+# Single-payment status lookup used by reconciliation
+RAZORPAY_PAYMENT_STATUS_URL = os.getenv(
+    "RAZORPAY_PAYMENT_STATUS_URL", "https://payments.olivaclinic.com/api/payment/{payment_id}"
+)
 RAZORPAY_USERNAME = "test@example.com"  # TODO: Replace with your username
 RAZORPAY_PASSWORD = "123"  # TODO: Replace with your password
 
@@ -9,8 +18,50 @@ SHOPIFY_STORE = "your-store.myshopify.com"  # TODO: Replace
 SHOPIFY_API_KEY = "your_api_key"  # TODO: Replace
 SHOPIFY_PASSWORD = "your_password"  # TODO: Replace
 
+# Used when the token response has no expires_in; refresh this many seconds early
+DEFAULT_TOKEN_TTL = 3600
+TOKEN_EXPIRY_MARGIN = 60
+
+payment_gateway_http = PooledHTTPClient("payment-gateway")
+shopify_http = PooledHTTPClient("shopify-payments")
+
+
+class _PaymentTokenCache:
+    """Bearer token for the payment gateway, reused until shortly before it expires."""
+
+    def __init__(self):
+        self.token = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+        self._async_lock = None
+
+    def valid(self):
+        return self.token if self.token and time.monotonic() < self.expires_at else None
+
+    def store(self, body):
+        try:
+            ttl = float(body.get("expires_in") or DEFAULT_TOKEN_TTL)
+        except (TypeError, ValueError):
+            ttl = DEFAULT_TOKEN_TTL
+        self.token = body.get("access_token")
+        self.expires_at = time.monotonic() + max(0.0, ttl - TOKEN_EXPIRY_MARGIN)
+        return self.token
+
+    def invalidate(self):
+        self.token = None
+        self.expires_at = 0.0
+
+    @property
+    def async_lock(self):
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        return self._async_lock
+
 
-def get_payment_token():
+_token_cache = _PaymentTokenCache()
+
+
+def _token_request():
     data = {
         "username": RAZORPAY_USERNAME,
         "password": RAZORPAY_PASSWORD
@@ -19,23 +70,86 @@ def get_payment_token():
         "Accept": "application/json",
         "Content-Type": "application/x-www-form-urlencoded"
     }
-    response = requests.post(RAZORPAY_TOKEN_URL, data=data, headers=headers)
-    response.raise_for_status()
-    return response.json().get("access_token")
+    return {"data": data, "headers": headers}
 
 
-def create_payment_link(token, payment_payload):
+def _payment_request(token, payment_payload):
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
         "Accept": "application/json, text/plain, */*"
     }
-    response = requests.post(RAZORPAY_PAYMENT_URL, json=payment_payload, headers=headers)
+    return {"json": payment_payload, "headers": headers}
+
+
+def get_payment_token(force_refresh=False):
+    token = None if force_refresh else _token_cache.valid()
+    if token:
+        return token
+    with _token_cache._lock:
+        # Another thread may have refreshed it while we waited
+        token = None if force_refresh else _token_cache.valid()
+        if token:
+            return token
+        response = payment_gateway_http.request("POST", RAZORPAY_TOKEN_URL, retry_unsafe=True, **_token_request())
+        response.raise_for_status()
+        return _token_cache.store(response.json())
+
+
+async def get_payment_token_async(force_refresh=False):
+    token = None if force_refresh else _token_cache.valid()
+    if token:
+        return token
+    async with _token_cache.async_lock:
+        token = None if force_refresh else _token_cache.valid()
+        if token:
+            return token
+        response = await payment_gateway_http.arequest(
+            "POST", RAZORPAY_TOKEN_URL, retry_unsafe=True, **_token_request()
+        )
+        response.raise_for_status()
+        return _token_cache.store(response.json())
+
+
+def create_payment_link(token, payment_payload):
+    response = payment_gateway_http.request("POST", RAZORPAY_PAYMENT_URL, **_payment_request(token, payment_payload))
     response.raise_for_status()
     return response.json()
 
 
-def create_shopify_order(payment_data):
+async def create_payment_link_async(payment_payload):
+    """Create a payment link with the cached token, refreshing it once if the gateway rejects it."""
+    token = await get_payment_token_async()
+    response = await payment_gateway_http.arequest(
+        "POST", RAZORPAY_PAYMENT_URL, **_payment_request(token, payment_payload)
+    )
+    if response.status_code == 401:
+        _token_cache.invalidate()
+        token = await get_payment_token_async(force_refresh=True)
+        response = await payment_gateway_http.arequest(
+            "POST", RAZORPAY_PAYMENT_URL, **_payment_request(token, payment_payload)
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_payment_status_async(payment_id):
+    """Gateway view of one payment, or None when the gateway does not know it."""
+    token = await get_payment_token_async()
+    url = RAZORPAY_PAYMENT_STATUS_URL.format(payment_id=payment_id)
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+    response = await payment_gateway_http.arequest("GET", url, headers=headers)
+    if response.status_code == 401:
+        token = await get_payment_token_async(force_refresh=True)
+        headers["Authorization"] = f"Bearer {token}"
+        response = await payment_gateway_http.arequest("GET", url, headers=headers)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def _shopify_order_request(payment_data):
     headers = {"Content-Type": "application/json"}
     order_data = {
         "order": {
@@ -52,9 +166,19 @@ def create_shopify_order(payment_data):
             "financial_status": "paid"
         }
     }
-    response = requests.post(
-        f"https://{SHOPIFY_API_KEY}:{SHOPIFY_PASSWORD}@{SHOPIFY_STORE}/admin/api/2024-04/orders.json",
-        json=order_data,
-        headers=headers
-    )
-    return response.status_code, response.json()
\ No newline at end of file
+    return {
+        "url": f"https://{SHOPIFY_STORE}/admin/api/2024-04/orders.json",
+        "auth": (SHOPIFY_API_KEY, SHOPIFY_PASSWORD),
+        "json": order_data,
+        "headers": headers
+    }
+
+
+def create_shopify_order(payment_data):
+    response = shopify_http.request("POST", **_shopify_order_request(payment_data))
+    return response.status_code, response.json()
+
+
+async def create_shopify_order_async(payment_data):
+    response = await shopify_http.arequest("POST", **_shopify_order_request(payment_data))
+    return response.status_code, response.json()
@@ -11,6 +11,7 @@ from fastapi import HTTPException, Request
 from models.auth_models import RefreshToken, EnhancedUserSession, AuditLog, RateLimitLog, SessionStatus
 from models.user import User
 from config.settings import settings
+from database.routing import read_only
 
 
 class SecurityService:
@@ -264,6 +265,7 @@ class SecurityService:
         self.db.add(audit_log)
         self.db.commit()
     
+    @read_only
     def get_audit_logs(self, user_id: int = None, action: str = None, 
                       limit: int = 100) -> List[Dict[str, Any]]:
         """Get audit logs with optional filtering."""
@@ -123,7 +123,8 @@ class SessionService:
         self.db.add(log)
         self.db.commit()
     
-    def validate_token(self, token: str) -> Optional[dict]:
+    @staticmethod
+    def validate_token(token: str) -> Optional[dict]:
         """Validate JWT token and return payload."""
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -1,15 +1,45 @@
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import os
 import uuid
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, selectinload
 from models.order_models import Order, OrderItem, PaymentTransaction, OrderEvent, Customer, Product, InventoryLog
 from models.order_models import OrderStatus, PaymentStatus, PaymentMethod
 from shopify_service import shopify_service
+from database.pagination import date_range_filters
+from services.inventory_engine import InventoryEngine
+from services.order_rollups import query_order_rollups
+from utils.ttl_cache import TTLCache
+
+# Order-status screens poll get_order_details; keep results for a few seconds per process
+ORDER_DETAILS_CACHE_TTL = float(os.getenv("ORDER_DETAILS_CACHE_TTL", "5"))
+order_details_cache = TTLCache(ttl_seconds=ORDER_DETAILS_CACHE_TTL, max_entries=2048)
+
+
+def invalidate_order_details_on_commit(db: Session, *order_ids: str):
+    """Drop cached details for order_ids when db commits, for writers that change orders outside this service"""
+    db.info.setdefault("order_details_invalidate", set()).update(order_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_order_details(session):
+    # After the commit, so a read racing the write cannot cache the old row again
+    for order_id in session.info.pop("order_details_invalidate", ()):
+        order_details_cache.invalidate(order_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_order_details(session):
+    session.info.pop("order_details_invalidate", None)
+
 
 class AdvancedOrderService:
     def __init__(self, db_session: Session):
         self.db = db_session
+        self.inventory = InventoryEngine(db_session)
     
     def create_order(self, order_data: Dict) -> Dict:
         """Create a new order with comprehensive validation"""
@@ -119,6 +149,7 @@ class AdvancedOrderService:
             self.db.add(event)
             
             self.db.commit()
+            order_details_cache.invalidate(order_id)
             
             return {
                 'success': True,
@@ -177,6 +208,7 @@ class AdvancedOrderService:
                 order.shopify_order_id = shopify_result.get('shopify_order_id')
             
             self.db.commit()
+            order_details_cache.invalidate(order_id)
             
             return {
                 'success': True,
@@ -211,6 +243,7 @@ class AdvancedOrderService:
             self.db.add(event)
             
             self.db.commit()
+            order_details_cache.invalidate(order_id)
             
             return {
                 'success': True,
@@ -223,18 +256,31 @@ class AdvancedOrderService:
             return {'success': False, 'error': str(e)}
     
     def get_order_details(self, order_id: str) -> Dict:
-        """Get comprehensive order details"""
+        """
+        Get comprehensive order details. Cached per process for ORDER_DETAILS_CACHE_TTL
+        seconds: a status, payment or Shopify-id change drops the entry in the process
+        that made it, and other workers see it once their entry expires.
+        """
+        cached = order_details_cache.get(order_id)
+        if cached is not None:
+            return cached
+        
         try:
-            order = self.db.query(Order).filter(Order.order_id == order_id).first()
+            # Four fixed queries: the order, then one IN query per collection. Joining all three
+            # collections in one statement would return items x payments x events rows.
+            order = self.db.execute(
+                select(Order)
+                .options(selectinload(Order.items), selectinload(Order.payments), selectinload(Order.events))
+                .where(Order.order_id == order_id)
+            ).scalar_one_or_none()
             if not order:
                 return {'success': False, 'error': 'Order not found'}
             
-            # Get related data
-            items = self.db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-            payments = self.db.query(PaymentTransaction).filter(PaymentTransaction.order_id == order.id).all()
-            events = self.db.query(OrderEvent).filter(OrderEvent.order_id == order.id).order_by(OrderEvent.created_at).all()
+            items = order.items
+            payments = order.payments
+            events = sorted(order.events, key=lambda event: event.created_at or datetime.min)
             
-            return {
+            details = {
                 'success': True,
                 'order': {
                     'order_id': order.order_id,
@@ -282,43 +328,19 @@ class AdvancedOrderService:
                     for event in events
                 ]
             }
+            order_details_cache.set(order_id, details)
+            return details
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def _validate_inventory(self, items: List[Dict]) -> Dict:
         """Validate inventory availability"""
-        for item in items:
-            product = self.db.query(Product).filter(Product.product_id == item.get('product_id')).first()
-            if not product:
-                return {'success': False, 'error': f'Product {item.get("product_id")} not found'}
-            
-            if product.inventory_quantity < item.get('quantity', 1):
-                return {
-                    'success': False, 
-                    'error': f'Insufficient inventory for {product.name}. Available: {product.inventory_quantity}, Requested: {item.get("quantity", 1)}'
-                }
-        
-        return {'success': True}
+        return self.inventory.validate(items)
     
     def _reserve_inventory(self, items: List[Dict], order_id: str):
-        """Reserve inventory for order"""
-        for item in items:
-            product = self.db.query(Product).filter(Product.product_id == item.get('product_id')).first()
-            if product:
-                previous_quantity = product.inventory_quantity
-                product.inventory_quantity -= item.get('quantity', 1)
-                
-                # Log inventory change
-                inventory_log = InventoryLog(
-                    product_id=item.get('product_id'),
-                    change_type='order_placed',
-                    quantity_change=-item.get('quantity', 1),
-                    previous_quantity=previous_quantity,
-                    new_quantity=product.inventory_quantity,
-                    order_id=order_id
-                )
-                self.db.add(inventory_log)
+        """Reserve inventory for order (all items or none; raises InsufficientInventoryError)"""
+        self.inventory.reserve(items, order_id)
     
     def _create_shopify_order(self, order: Order, payment_data: Dict) -> Dict:
         """Create order in Shopify"""
@@ -356,27 +378,46 @@ class AdvancedOrderService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_order_analytics(self) -> Dict:
-        """Get order analytics (like big e-commerce companies)"""
+    def get_order_analytics(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                            statuses: Optional[List[str]] = None) -> Dict:
+        """Get order analytics from the daily rollups (cost grows with days in range, not orders)"""
         try:
-            # Total orders
-            total_orders = self.db.query(Order).count()
-            
-            # Orders by status
-            orders_by_status = self.db.query(Order.order_status, self.db.func.count(Order.id)).group_by(Order.order_status).all()
-            
-            # Revenue analytics
-            total_revenue = self.db.query(self.db.func.sum(Order.total_amount)).scalar() or 0
-            
-            # Recent orders
-            recent_orders = self.db.query(Order).order_by(Order.created_at.desc()).limit(10).all()
-            
+            rollups = query_order_rollups(self.db, date_from, date_to, statuses)
+
+            total_orders = 0
+            total_revenue = Decimal('0')
+            orders_by_status: Dict[str, int] = {}
+            revenue_by_status: Dict[str, float] = {}
+            daily: Dict[str, Dict] = {}
+            for rollup in rollups:
+                if not rollup.order_count:
+                    continue
+                revenue = rollup.revenue or Decimal('0')
+                total_orders += rollup.order_count
+                total_revenue += revenue
+                orders_by_status[rollup.order_status] = orders_by_status.get(rollup.order_status, 0) + rollup.order_count
+                revenue_by_status[rollup.order_status] = revenue_by_status.get(rollup.order_status, 0.0) + float(revenue)
+                day = daily.setdefault(rollup.day.isoformat(), {'date': rollup.day.isoformat(), 'orders': 0, 'revenue': 0.0})
+                day['orders'] += rollup.order_count
+                day['revenue'] += float(revenue)
+
+            # Recent orders (served by the created_at index, same filters as the rollups)
+            recent_query = self.db.query(Order)
+            recent_query = recent_query.filter(*date_range_filters(Order.created_at, date_from, date_to))
+            if statuses:
+                recent_query = recent_query.filter(Order.order_status.in_([OrderStatus(s) for s in statuses]))
+            recent_orders = recent_query.order_by(Order.created_at.desc()).limit(10).all()
+
             return {
                 'success': True,
                 'analytics': {
+                    'date_from': date_from.isoformat() if date_from else None,
+                    'date_to': date_to.isoformat() if date_to else None,
                     'total_orders': total_orders,
                     'total_revenue': float(total_revenue),
-                    'orders_by_status': {status.value: count for status, count in orders_by_status},
+                    'orders_by_status': orders_by_status,
+                    'revenue_by_status': revenue_by_status,
+                    'daily': list(daily.values()),
                     'recent_orders': [
                         {
                             'order_id': order.order_id,
@@ -388,6 +429,6 @@ class AdvancedOrderService:
                     ]
                 }
             }
-            
+
         except Exception as e:
             return {'success': False, 'error': str(e)} 
\ No newline at end of file
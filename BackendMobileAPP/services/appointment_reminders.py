@@ -0,0 +1,281 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from constants.status_codes import STATUS_MAP
+from database.connection import SessionLocal, engine
+from models.appointment import Appointment, AppointmentReminder
+from utils.email_utils import send_reminder_email
+from utils.logger import get_logger
+
+logger = get_logger()
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# Appointment date/start_time are clinic-local, so due_at and leases use local time (datetime.now())
+
+# pg_advisory_lock key shared by every process running the reminder worker
+REMINDER_LEADER_LOCK_KEY = 7302114401
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+APPOINTMENT_REMINDER_LEAD_MINUTES = _float_env("APPOINTMENT_REMINDER_LEAD_MINUTES", 10.0)
+APPOINTMENT_REMINDER_BATCH_SIZE = int(_float_env("APPOINTMENT_REMINDER_BATCH_SIZE", 50))
+APPOINTMENT_REMINDER_CONCURRENCY = int(_float_env("APPOINTMENT_REMINDER_CONCURRENCY", 8))
+APPOINTMENT_REMINDER_POLL_INTERVAL = _float_env("APPOINTMENT_REMINDER_POLL_INTERVAL", 15.0)
+APPOINTMENT_REMINDER_MAX_ATTEMPTS = int(_float_env("APPOINTMENT_REMINDER_MAX_ATTEMPTS", 5))
+APPOINTMENT_REMINDER_LEASE_SECONDS = _float_env("APPOINTMENT_REMINDER_LEASE_SECONDS", 300.0)
+APPOINTMENT_REMINDER_RETRY_SECONDS = _float_env("APPOINTMENT_REMINDER_RETRY_SECONDS", 60.0)
+# Reminders more overdue than this (e.g. after a long outage) are skipped rather than sent late
+APPOINTMENT_REMINDER_MAX_LATENESS_MINUTES = _float_env("APPOINTMENT_REMINDER_MAX_LATENESS_MINUTES", 60.0)
+
+
+def build_appointment_reminder(appointment: Appointment, patient_email: str, doctor_email: str,
+                               lead_minutes: float = APPOINTMENT_REMINDER_LEAD_MINUTES) -> AppointmentReminder:
+    """
+    The reminder row for ``appointment``, not yet added to any session.
+
+    Add it in the transaction that inserts the appointment, so the booking and
+    its reminder commit together; then call appointment_reminder_worker.notify().
+    """
+    appointment_time = datetime.combine(appointment.date, appointment.start_time)
+    return AppointmentReminder(
+        appointment=appointment,
+        kind="reminder",
+        patient_email=patient_email,
+        doctor_email=doctor_email,
+        due_at=appointment_time - timedelta(minutes=lead_minutes),
+        status=PENDING,
+        attempts=0,
+        created_at=datetime.utcnow()
+    )
+
+
+class AppointmentReminderWorker:
+    """
+    Send due appointment reminders from the appointment_reminders table.
+
+    Every process runs the loop, but only the one holding the Postgres advisory
+    lock (kept on a dedicated connection) polls; if that process dies its
+    connection closes, the lock is released and another process takes over. Due
+    rows are leased with FOR UPDATE SKIP LOCKED and dispatched concurrently. A row
+    is marked sent right after its email goes out; delivery is at least once, since
+    a process dying between those two steps re-sends the reminder after its lease
+    expires.
+    """
+
+    def __init__(self, session_factory=SessionLocal, bind=engine,
+                 batch_size: int = APPOINTMENT_REMINDER_BATCH_SIZE,
+                 concurrency: int = APPOINTMENT_REMINDER_CONCURRENCY,
+                 sender=send_reminder_email):
+        self.session_factory = session_factory
+        self.bind = bind
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.sender = sender
+        self._leader_connection = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ==== Leadership ====
+
+    def _try_become_leader(self) -> bool:
+        if self.bind.dialect.name != "postgresql":
+            # No advisory locks (local SQLite); a single process is assumed
+            return True
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.exec_driver_sql("SELECT 1")
+                # End the autobegun transaction, or the session sits "idle in transaction"
+                self._leader_connection.commit()
+                return True
+            except Exception as e:
+                logger.warning(f"Reminder worker lost its leader connection: {e}")
+                self._release_leadership()
+        # AUTOCOMMIT: the lock is session-level, so nothing on this connection needs a server transaction
+        connection = self.bind.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(select(func.pg_try_advisory_lock(REMINDER_LEADER_LOCK_KEY))).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._leader_connection = connection
+        logger.info("Appointment reminder worker is now the leader")
+        return True
+
+    def _release_leadership(self):
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.close()
+            except Exception:
+                pass
+            self._leader_connection = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_connection is not None or self.bind.dialect.name != "postgresql"
+
+    # ==== Claiming ====
+
+    def _claim(self, db: Session) -> List[Dict]:
+        now = datetime.now()
+        rows = (
+            db.query(AppointmentReminder)
+            .filter(or_(
+                and_(
+                    AppointmentReminder.status == PENDING,
+                    AppointmentReminder.due_at <= now,
+                    # A failed attempt parks the row until its retry time
+                    or_(AppointmentReminder.locked_until.is_(None), AppointmentReminder.locked_until <= now),
+                ),
+                and_(AppointmentReminder.status == SENDING, AppointmentReminder.locked_until < now),
+            ))
+            .order_by(AppointmentReminder.due_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = []
+        for row in rows:
+            appointment = row.appointment
+            too_late = row.due_at < now - timedelta(minutes=APPOINTMENT_REMINDER_MAX_LATENESS_MINUTES)
+            if appointment is None or appointment.status != STATUS_MAP["Scheduled"] or too_late:
+                row.status = SKIPPED
+                continue
+            row.status = SENDING
+            row.locked_until = now + timedelta(seconds=APPOINTMENT_REMINDER_LEASE_SECONDS)
+            # Plain snapshot: the email is sent from another thread, after this session is closed
+            claimed.append({
+                "id": row.id,
+                "patient_email": row.patient_email,
+                "doctor_email": row.doctor_email,
+                "appointment": SimpleNamespace(
+                    date=appointment.date,
+                    start_time=appointment.start_time,
+                    end_time=appointment.end_time,
+                    video_call_link=appointment.video_call_link
+                )
+            })
+        db.commit()
+        return claimed
+
+    def claim_due(self) -> List[Dict]:
+        with self.session_factory() as db:
+            return self._claim(db)
+
+    # ==== Dispatch ====
+
+    def _send(self, reminder: Dict):
+        self.sender(reminder["patient_email"], reminder["doctor_email"], reminder["appointment"])
+
+    def _mark(self, reminder_id: int, error: Optional[str] = None):
+        with self.session_factory() as db:
+            row = db.get(AppointmentReminder, reminder_id)
+            if row is None:
+                return
+            row.attempts = (row.attempts or 0) + 1
+            row.locked_until = None
+            if error is None:
+                row.status = SENT
+                row.sent_at = datetime.now()
+                row.last_error = None
+            else:
+                row.last_error = error[:2000]
+                row.status = FAILED if row.attempts >= APPOINTMENT_REMINDER_MAX_ATTEMPTS else PENDING
+                if row.status == PENDING:
+                    row.locked_until = datetime.now() + timedelta(seconds=APPOINTMENT_REMINDER_RETRY_SECONDS * row.attempts)
+                logger.warning(f"Appointment reminder {reminder_id} attempt {row.attempts} failed: {error}")
+            db.commit()
+
+    async def _dispatch(self, reminders: List[Dict]):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(reminder: Dict):
+            async with semaphore:
+                try:
+                    await run_in_threadpool(self._send, reminder)
+                    error = None
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                await run_in_threadpool(self._mark, reminder["id"], error)
+
+        await asyncio.gather(*(send(reminder) for reminder in reminders))
+
+    async def process_due(self) -> int:
+        reminders = await run_in_threadpool(self.claim_due)
+        if reminders:
+            await self._dispatch(reminders)
+        return len(reminders)
+
+    # ==== Background loop ====
+
+    def notify(self):
+        """Wake the loop after a reminder is queued (safe from any thread)"""
+        if self._wakeup is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, poll_interval: float = APPOINTMENT_REMINDER_POLL_INTERVAL):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                processed = 0
+                try:
+                    if await run_in_threadpool(self._try_become_leader):
+                        processed = await self.process_due()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Appointment reminder batch failed: {e}")
+                if processed >= self.batch_size:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        finally:
+            self._release_leadership()
+
+    # ==== Admin ====
+
+    def stats(self, db: Session) -> Dict:
+        counts = dict(
+            db.query(AppointmentReminder.status, func.count(AppointmentReminder.id))
+            .group_by(AppointmentReminder.status)
+            .all()
+        )
+        next_due = (
+            db.query(func.min(AppointmentReminder.due_at))
+            .filter(AppointmentReminder.status == PENDING)
+            .scalar()
+        )
+        return {
+            "leader": self.is_leader,
+            "counts": {status: counts.get(status, 0) for status in (PENDING, SENDING, SENT, SKIPPED, FAILED)},
+            "next_due_at": next_due.isoformat() if next_due else None
+        }
+
+
+appointment_reminder_worker = AppointmentReminderWorker()
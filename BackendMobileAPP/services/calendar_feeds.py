@@ -0,0 +1,171 @@
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from models.appointment import Appointment
+from utils.ics_utils import render_event, render_feed
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+# Feed tokens are HMACs of the user id, so a feed request needs no token lookup
+CALENDAR_FEED_SECRET = os.getenv("CALENDAR_FEED_SECRET") or settings.SECRET_KEY
+# How long a cached feed is served without asking the database whether anything changed.
+# Bookings made by this process mark the feed stale at once; this only bounds how long
+# other workers' (or Zenoti sync) changes take to show up.
+CALENDAR_FEED_RECHECK_SECONDS = _float_env("CALENDAR_FEED_RECHECK_SECONDS", 300.0)
+CALENDAR_FEED_CACHE_MAX_ENTRIES = int(_float_env("CALENDAR_FEED_CACHE_MAX_ENTRIES", 10000))
+# How far back feeds and downloads go, and how many events they hold at most
+CALENDAR_PAST_DAYS = int(_float_env("CALENDAR_PAST_DAYS", 30))
+CALENDAR_MAX_EVENTS = int(_float_env("CALENDAR_MAX_EVENTS", 500))
+
+TOKEN_PATTERN = re.compile(r"^(\d+)-([0-9a-f]{32})$")
+
+
+def _signature(user_id: int) -> str:
+    message = f"calendar-feed:{user_id}".encode()
+    return hmac.new(CALENDAR_FEED_SECRET.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def make_feed_token(user_id: int) -> str:
+    return f"{user_id}-{_signature(user_id)}"
+
+
+def parse_feed_token(token: str) -> Optional[int]:
+    """User id for a valid feed token, else None"""
+    match = TOKEN_PATTERN.match(token)
+    if not match:
+        return None
+    user_id = int(match.group(1))
+    if not hmac.compare_digest(match.group(2), _signature(user_id)):
+        return None
+    return user_id
+
+
+class CalendarFeed:
+    """Rendered feed for one user plus the per-event pieces it was built from"""
+
+    def __init__(self, body: bytes, etag: str, last_modified: datetime, events: Dict[int, Tuple[tuple, str]]):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        # appointment row id -> (version, folded VEVENT); unchanged events are reused on rebuild
+        self.events = events
+        self.checked_at = time.monotonic()
+        self.stale = False
+
+
+class CalendarFeedService:
+    """
+    Per-user iCalendar feed covering appointments as patient and as doctor.
+
+    Rendered feeds are cached per user (LRU) and served without touching the
+    database until a booking marks them stale or CALENDAR_FEED_RECHECK_SECONDS
+    pass. A recheck reads only the columns the events are rendered from; when
+    none changed the cached body and ETag are kept, otherwise only new or
+    changed events are rendered and the rest are reused.
+    """
+
+    def __init__(self, max_entries: int = CALENDAR_FEED_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._feeds: "OrderedDict[int, CalendarFeed]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ==== Cache ====
+
+    def _cached(self, user_id: int) -> Optional[CalendarFeed]:
+        with self._lock:
+            feed = self._feeds.get(user_id)
+            if feed is not None:
+                self._feeds.move_to_end(user_id)
+            return feed
+
+    def _store(self, user_id: int, feed: CalendarFeed):
+        with self._lock:
+            self._feeds[user_id] = feed
+            self._feeds.move_to_end(user_id)
+            while len(self._feeds) > self.max_entries:
+                self._feeds.popitem(last=False)
+
+    def invalidate(self, *user_ids: int):
+        """Mark feeds for a recheck after an appointment of these users changes"""
+        with self._lock:
+            for user_id in user_ids:
+                feed = self._feeds.get(user_id)
+                if feed is not None:
+                    feed.stale = True
+
+    # ==== Rendering ====
+
+    @staticmethod
+    def _event_rows(db: Session, user_id: int) -> List:
+        since = date.today() - timedelta(days=CALENDAR_PAST_DAYS)
+        return db.query(
+            Appointment.id,
+            Appointment.appointment_id,
+            Appointment.status,
+            Appointment.date,
+            Appointment.start_time,
+            Appointment.end_time,
+            Appointment.video_call_link
+        ).filter(
+            or_(Appointment.patient_id == user_id, Appointment.doctor_id == user_id),
+            Appointment.date >= since
+        ).order_by(Appointment.date, Appointment.start_time, Appointment.id).limit(CALENDAR_MAX_EVENTS).all()
+
+    def get_feed(self, db: Session, user_id: int) -> CalendarFeed:
+        feed = self._cached(user_id)
+        if feed is not None and not feed.stale and time.monotonic() - feed.checked_at < CALENDAR_FEED_RECHECK_SECONDS:
+            return feed
+
+        rows = self._event_rows(db, user_id)
+        previous = feed.events if feed is not None else {}
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+        events = {}
+        changed = 0
+        for row in rows:
+            version = tuple(row[1:])
+            cached = previous.get(row.id)
+            if cached is not None and cached[0] == version:
+                events[row.id] = cached
+            else:
+                events[row.id] = (version, render_event(row, stamp))
+                changed += 1
+
+        if feed is not None and not changed and len(previous) == len(events):
+            feed.checked_at = time.monotonic()
+            feed.stale = False
+            return feed
+
+        body = render_feed((event for _, event in events.values()), name="Oliva Clinic Appointments")
+        feed = CalendarFeed(
+            body,
+            f'"{hashlib.sha1(body).hexdigest()}"',
+            datetime.now(timezone.utc).replace(microsecond=0),
+            events
+        )
+        self._store(user_id, feed)
+        return feed
+
+
+calendar_feed_service = CalendarFeedService()
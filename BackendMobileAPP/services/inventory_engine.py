@@ -0,0 +1,99 @@
+from typing import Dict, List
+from collections import OrderedDict
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from models.order_models import Product, InventoryLog
+
+
+class InsufficientInventoryError(Exception):
+    """Raised when a cart cannot be reserved in full; nothing has been decremented."""
+
+
+class InventoryEngine:
+    """Set-based inventory checks and reservations for a whole cart."""
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    @staticmethod
+    def _requested_quantities(items: List[Dict]) -> Dict[str, int]:
+        """Sum quantities per product so repeated lines are checked together"""
+        requested = OrderedDict()
+        for item in items:
+            product_id = item.get('product_id')
+            requested[product_id] = requested.get(product_id, 0) + item.get('quantity', 1)
+        return requested
+
+    def _load_stock(self, product_ids) -> Dict[str, Row]:
+        # Columns only, so no Product instances go stale in the session after the bulk UPDATE
+        rows = self.db.execute(
+            select(Product.product_id, Product.name, Product.inventory_quantity)
+            .where(Product.product_id.in_(product_ids))
+        ).all()
+        return {row.product_id: row for row in rows}
+
+    def _shortage_error(self, requested: Dict[str, int], products: Dict[str, Row]) -> Dict:
+        for product_id, quantity in requested.items():
+            product = products.get(product_id)
+            if not product:
+                return {'success': False, 'error': f'Product {product_id} not found'}
+            if (product.inventory_quantity or 0) < quantity:
+                return {
+                    'success': False,
+                    'error': f'Insufficient inventory for {product.name}. Available: {product.inventory_quantity}, Requested: {quantity}'
+                }
+        return {'success': True}
+
+    def validate(self, items: List[Dict]) -> Dict:
+        """Check every line against current stock with a single IN query"""
+        requested = self._requested_quantities(items)
+        if not requested:
+            return {'success': True}
+        return self._shortage_error(requested, self._load_stock(list(requested)))
+
+    def reserve(self, items: List[Dict], order_id: str, change_type: str = 'order_placed') -> List[Dict]:
+        """
+        Decrement stock for the whole cart or not at all.
+
+        One conditional UPDATE decrements only rows that still have enough stock and
+        returns the new quantities; if any product is missing or short the caller's
+        transaction must be rolled back, which InsufficientInventoryError signals.
+        InventoryLog rows are written with one bulk insert.
+        """
+        requested = self._requested_quantities(items)
+        if not requested:
+            return []
+
+        product_ids = list(requested)
+        requested_quantity = case(requested, value=Product.product_id, else_=0)
+        rows = self.db.execute(
+            update(Product)
+            .where(Product.product_id.in_(product_ids), Product.inventory_quantity >= requested_quantity)
+            .values(inventory_quantity=Product.inventory_quantity - requested_quantity)
+            .returning(Product.product_id, Product.inventory_quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        if len(rows) != len(product_ids):
+            # Some rows were not decremented; the rest will be undone by the rollback
+            reserved = {row.product_id for row in rows}
+            shortfall = {pid: qty for pid, qty in requested.items() if pid not in reserved}
+            error = self._shortage_error(shortfall, self._load_stock(list(shortfall)))
+            raise InsufficientInventoryError(error.get('error') or 'Insufficient inventory')
+
+        logs = [
+            {
+                'product_id': row.product_id,
+                'change_type': change_type,
+                'quantity_change': -requested[row.product_id],
+                'previous_quantity': row.inventory_quantity + requested[row.product_id],
+                'new_quantity': row.inventory_quantity,
+                'order_id': order_id
+            }
+            for row in rows
+        ]
+        self.db.execute(insert(InventoryLog), logs)
+        return logs
@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.order_models import Order, OrderDailyRollup
+from utils.logger import get_logger
+
+logger = get_logger()
+
+RollupKey = Tuple[date, str]
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+def _order_day(order: Order) -> date:
+    return (order.created_at or datetime.utcnow()).date()
+
+
+def _previous(order: Order, attr: str):
+    """Value of ``attr`` before this flush; raises LookupError when it was never loaded."""
+    history = inspect(order).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if not history.added:
+        return getattr(order, attr)
+    raise LookupError(attr)
+
+
+PREVIOUS_KEY = "order_rollup_previous"
+
+
+def _rollup_changed(order: Order) -> bool:
+    state = inspect(order)
+    return state.attrs.order_status.history.has_changes() or state.attrs.total_amount.history.has_changes()
+
+
+def _remember_previous(session: Session):
+    """
+    Read the stored status/amount of changed orders whose old values are not in
+    their history, while the rows still hold them (before the UPDATE is flushed).
+    active_history on both columns makes this rare; it must never be guessed.
+    """
+    previous = {}
+    for obj in session.dirty:
+        if not isinstance(obj, Order) or obj.id is None or not _rollup_changed(obj):
+            continue
+        try:
+            _previous(obj, "order_status")
+            _previous(obj, "total_amount")
+        except LookupError:
+            with session.no_autoflush:
+                row = session.execute(
+                    select(Order.order_status, Order.total_amount).where(Order.id == obj.id)
+                ).one()
+            previous[obj.id] = (row.order_status, row.total_amount)
+    session.info[PREVIOUS_KEY] = previous
+
+
+def _collect_deltas(session: Session) -> Dict[RollupKey, List]:
+    deltas: Dict[RollupKey, List] = defaultdict(lambda: [0, Decimal("0")])
+
+    def bump(order: Order, status, amount, sign: int):
+        key = (_order_day(order), _status_value(status))
+        deltas[key][0] += sign
+        deltas[key][1] += Decimal(str(amount or 0)) * sign
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            bump(obj, obj.order_status, obj.total_amount, +1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            bump(obj, obj.order_status, obj.total_amount, -1)
+
+    loaded_previous = session.info.pop(PREVIOUS_KEY, {})
+    for obj in session.dirty:
+        if not isinstance(obj, Order) or not session.is_modified(obj) or not _rollup_changed(obj):
+            continue
+        if obj.id in loaded_previous:
+            old_status, old_amount = loaded_previous[obj.id]
+        else:
+            # No fallback here: by now the row already holds the new values
+            old_status = _previous(obj, "order_status")
+            old_amount = _previous(obj, "total_amount")
+        bump(obj, old_status, old_amount, -1)
+        bump(obj, obj.order_status, obj.total_amount, +1)
+
+    return {key: value for key, value in deltas.items() if value[0] or value[1]}
+
+
+def _upsert(connection, rows: List[Dict]):
+    table = OrderDailyRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = pg_insert(table) if dialect == "postgresql" else sqlite_insert(table)
+        connection.execute(
+            insert.on_conflict_do_update(
+                index_elements=[table.c.day, table.c.order_status],
+                set_={
+                    "order_count": table.c.order_count + insert.excluded.order_count,
+                    "revenue": table.c.revenue + insert.excluded.revenue,
+                    "updated_at": insert.excluded.updated_at,
+                },
+            ),
+            rows,
+        )
+        return
+
+    # Generic fallback: update, then insert the buckets that did not exist yet
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(table.c.day == row["day"], table.c.order_status == row["order_status"])
+            .values(
+                order_count=table.c.order_count + row["order_count"],
+                revenue=table.c.revenue + row["revenue"],
+                updated_at=row["updated_at"],
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+@event.listens_for(Session, "before_flush")
+def _load_order_previous(session, flush_context, instances):
+    _remember_previous(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_order_rollups(session, flush_context):
+    # Runs inside the flush transaction, so rollups commit or roll back with the order rows.
+    # The upsert row-locks the (day, status) bucket until commit, so concurrent transactions
+    # writing orders into the same bucket queue behind each other for their remaining duration.
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"day": day, "order_status": status, "order_count": count, "revenue": revenue, "updated_at": now}
+        for (day, status), (count, revenue) in sorted(deltas.items())
+    ]
+    _upsert(session.connection(), rows)
+
+
+def rebuild_order_rollups(db: Session) -> int:
+    """Recompute every rollup bucket from the orders table (backfill / drift repair)."""
+    day = func.date(Order.created_at, type_=Date)
+    buckets = db.execute(
+        select(day, Order.order_status, func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0))
+        .group_by(day, Order.order_status)
+    ).all()
+
+    db.query(OrderDailyRollup).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    db.add_all([
+        OrderDailyRollup(
+            day=bucket_day,
+            order_status=_status_value(status),
+            order_count=count,
+            revenue=revenue,
+            updated_at=now,
+        )
+        for bucket_day, status, count, revenue in buckets
+        if bucket_day is not None and status is not None
+    ])
+    db.commit()
+    return len(buckets)
+
+
+def backfill_order_rollups_if_empty(db: Session) -> bool:
+    """Populate the rollups once when the table is new but orders already exist."""
+    if db.query(OrderDailyRollup.day).first() is not None or db.query(Order.id).first() is None:
+        return False
+    count = rebuild_order_rollups(db)
+    logger.info(f"Backfilled {count} order rollup bucket(s)")
+    return True
+
+
+def query_order_rollups(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                        statuses: Optional[Iterable[str]] = None):
+    """Per-day/per-status rollup rows in the given range (O(days x statuses))."""
+    query = db.query(OrderDailyRollup)
+    if date_from:
+        query = query.filter(OrderDailyRollup.day >= date_from)
+    if date_to:
+        query = query.filter(OrderDailyRollup.day <= date_to)
+    if statuses:
+        query = query.filter(OrderDailyRollup.order_status.in_([_status_value(s) for s in statuses]))
+    return query.order_by(OrderDailyRollup.day).all()
@@ -0,0 +1,428 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Protocol
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database.connection import SessionLocal
+from database.pagination import date_range_filters, keyset_page
+from models.order_models import (
+    Order, PaymentReconciliationMismatch, PaymentReconciliationRun, PaymentStatus, PaymentTransaction
+)
+from service.payment_service import fetch_payment_status_async
+from services.advanced_order_service import invalidate_order_details_on_commit
+from services.razorpay_webhooks import STATUS_RANK
+from services.shopify_outbox import enqueue_paid_order, shopify_outbox_worker
+from utils.logger import get_logger
+
+logger = get_logger()
+
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+MISSING_AT_GATEWAY = "missing_at_gateway"
+STATUS_MISMATCH = "status_mismatch"
+AMOUNT_MISMATCH = "amount_mismatch"
+ORDER_STATUS_MISMATCH = "order_status_mismatch"
+GATEWAY_ERROR = "gateway_error"
+
+# pg_advisory_xact_lock key serialising run starts across processes
+RECONCILIATION_START_LOCK_KEY = 7302114402
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+PAYMENT_RECONCILIATION_CHUNK_SIZE = _int_env("PAYMENT_RECONCILIATION_CHUNK_SIZE", 500)
+PAYMENT_RECONCILIATION_CONCURRENCY = _int_env("PAYMENT_RECONCILIATION_CONCURRENCY", 8)
+# A run still "running" after this long is treated as abandoned (its process died) and no longer blocks new runs
+PAYMENT_RECONCILIATION_STALE_MINUTES = _int_env("PAYMENT_RECONCILIATION_STALE_MINUTES", 360)
+
+# Razorpay payment status -> local status
+GATEWAY_STATUS = {
+    "created": PaymentStatus.PENDING,
+    "authorized": PaymentStatus.PENDING,
+    "captured": PaymentStatus.PAID,
+    "failed": PaymentStatus.FAILED,
+    "refunded": PaymentStatus.REFUNDED,
+}
+
+
+class ReconciliationInProgressError(Exception):
+    """Another reconciliation run is already in progress (in this or another process)"""
+
+
+class PaymentGatewayClient(Protocol):
+    async def fetch_payment(self, gateway_transaction_id: str) -> Optional[Dict]:
+        """Gateway payment entity, or None when the gateway has no such payment"""
+
+
+class RazorpayGatewayClient:
+    """Reads payments through the shared payment gateway pool and cached token"""
+
+    async def fetch_payment(self, gateway_transaction_id: str) -> Optional[Dict]:
+        return await fetch_payment_status_async(gateway_transaction_id)
+
+
+class StubGatewayClient:
+    """In-memory gateway for local runs and tests: payment id -> Razorpay-style entity"""
+
+    def __init__(self, payments: Optional[Dict[str, Dict]] = None):
+        self.payments = payments or {}
+        self.calls = 0
+
+    async def fetch_payment(self, gateway_transaction_id: str) -> Optional[Dict]:
+        self.calls += 1
+        return self.payments.get(gateway_transaction_id)
+
+
+def gateway_status(entity: Dict) -> Optional[PaymentStatus]:
+    status = GATEWAY_STATUS.get((entity.get("status") or "").lower())
+    if status == PaymentStatus.REFUNDED or (status == PaymentStatus.PAID and entity.get("amount_refunded")):
+        refunded, amount = int(entity.get("amount_refunded") or 0), int(entity.get("amount") or 0)
+        if refunded and amount and refunded < amount:
+            return PaymentStatus.PARTIALLY_REFUNDED
+        if refunded and refunded >= amount:
+            return PaymentStatus.REFUNDED
+    return status
+
+
+def gateway_amount(entity: Dict) -> Optional[Decimal]:
+    """Razorpay amounts are in paise"""
+    if entity.get("amount") is None:
+        return None
+    return (Decimal(str(entity["amount"])) / 100).quantize(Decimal("0.01"))
+
+
+class PaymentReconciler:
+    """
+    Compare local PaymentTransaction/Order rows with the gateway in bounded memory.
+
+    Transactions are read in keyset chunks of lightweight columns, one short session
+    per chunk, so a run over hundreds of thousands of rows never holds more than one
+    chunk. Each chunk's gateway lookups run concurrently, capped by a semaphore.
+    Differences are written as mismatch rows on the run. Only forward status moves
+    (see STATUS_RANK) are fixed automatically, in bulk, and each UPDATE is guarded by
+    the status that was read so a webhook landing mid-run is never overwritten;
+    amount differences, regressions and payments unknown to the gateway are only
+    reported, and a transaction whose amount disagrees is not moved at all. A
+    transaction moved to PAID has its Shopify order queued on the outbox in the
+    same transaction, as the Razorpay webhook does.
+
+    Only one run may be in progress across all processes: start_run refuses while
+    another run row is still running.
+    """
+
+    def __init__(self, gateway: Optional[PaymentGatewayClient] = None, session_factory=SessionLocal,
+                 chunk_size: int = PAYMENT_RECONCILIATION_CHUNK_SIZE,
+                 concurrency: int = PAYMENT_RECONCILIATION_CONCURRENCY):
+        self.gateway = gateway or RazorpayGatewayClient()
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self._active_run: Optional[int] = None
+
+    # ==== Runs ====
+
+    def start_run(self, db: Session, apply_fixes: bool = True, date_from: Optional[date] = None,
+                  date_to: Optional[date] = None) -> PaymentReconciliationRun:
+        """Create the run row; raises ReconciliationInProgressError while another run is active"""
+        if db.get_bind().dialect.name == "postgresql":
+            # Held until commit, so two processes cannot both see "no active run" and insert one
+            db.execute(select(func.pg_advisory_xact_lock(RECONCILIATION_START_LOCK_KEY)))
+        stale_before = datetime.utcnow() - timedelta(minutes=PAYMENT_RECONCILIATION_STALE_MINUTES)
+        active = db.query(PaymentReconciliationRun).filter(PaymentReconciliationRun.status == RUNNING).all()
+        for other in active:
+            if other.started_at is not None and other.started_at >= stale_before:
+                db.rollback()
+                raise ReconciliationInProgressError(f"Reconciliation run {other.id} is already in progress")
+            other.status = FAILED
+            other.error = "Abandoned: still running after PAYMENT_RECONCILIATION_STALE_MINUTES"
+            other.finished_at = datetime.utcnow()
+
+        run = PaymentReconciliationRun(
+            status=RUNNING,
+            apply_fixes=int(apply_fixes),
+            filters={
+                "date_from": date_from.isoformat() if date_from else None,
+                "date_to": date_to.isoformat() if date_to else None
+            },
+            scanned=0, mismatches=0, fixed=0, errors=0,
+            started_at=datetime.utcnow()
+        )
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+        return run
+
+    @property
+    def is_running(self) -> bool:
+        return self._active_run is not None
+
+    async def run(self, run_id: int):
+        """Reconcile every transaction matching the run's filters"""
+        self._active_run = run_id
+        cursor = None
+        try:
+            while True:
+                chunk, cursor, apply_fixes = await run_in_threadpool(self._load_chunk, run_id, cursor)
+                if chunk:
+                    entities = await self._fetch_all(chunk)
+                    queued = await run_in_threadpool(self._reconcile_chunk, run_id, chunk, entities, apply_fixes)
+                    if queued:
+                        shopify_outbox_worker.notify()
+                if cursor is None:
+                    break
+            await run_in_threadpool(self._finish, run_id, COMPLETED, None)
+        except Exception as e:
+            logger.error(f"Payment reconciliation run {run_id} failed: {e}")
+            await run_in_threadpool(self._finish, run_id, FAILED, f"{type(e).__name__}: {e}")
+        finally:
+            self._active_run = None
+
+    def _finish(self, run_id: int, status: str, error: Optional[str]):
+        with self.session_factory() as db:
+            run = db.get(PaymentReconciliationRun, run_id)
+            run.status = status
+            run.error = error[:2000] if error else None
+            run.finished_at = datetime.utcnow()
+            db.commit()
+            logger.info(
+                f"Payment reconciliation run {run_id} {status}: scanned={run.scanned} "
+                f"mismatches={run.mismatches} fixed={run.fixed} errors={run.errors}"
+            )
+
+    # ==== Chunks ====
+
+    def _load_chunk(self, run_id: int, cursor: Optional[str]):
+        with self.session_factory() as db:
+            run = db.get(PaymentReconciliationRun, run_id)
+            filters = run.filters or {}
+            date_from = date.fromisoformat(filters["date_from"]) if filters.get("date_from") else None
+            date_to = date.fromisoformat(filters["date_to"]) if filters.get("date_to") else None
+            # Plain column rows, not entities: nothing is left in an identity map between chunks
+            query = (
+                db.query(
+                    PaymentTransaction.id, PaymentTransaction.created_at, PaymentTransaction.status,
+                    PaymentTransaction.amount, PaymentTransaction.gateway_transaction_id,
+                    PaymentTransaction.order_id, Order.payment_status.label("order_payment_status")
+                )
+                .outerjoin(Order, PaymentTransaction.order_id == Order.id)
+                .filter(*date_range_filters(PaymentTransaction.created_at, date_from, date_to))
+            )
+            rows, next_cursor = keyset_page(
+                query, PaymentTransaction.created_at, PaymentTransaction.id, cursor, self.chunk_size
+            )
+            return rows, next_cursor, bool(run.apply_fixes)
+
+    async def _fetch_all(self, chunk: List) -> Dict[int, object]:
+        """Gateway entity (or the exception raised) per transaction id that has a gateway id"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(row):
+            async with semaphore:
+                try:
+                    return row.id, await self.gateway.fetch_payment(row.gateway_transaction_id)
+                except Exception as e:
+                    return row.id, e
+
+        results = await asyncio.gather(*(fetch(row) for row in chunk if row.gateway_transaction_id))
+        return dict(results)
+
+    def _diff(self, row, entity) -> List[Dict]:
+        base = {
+            "payment_transaction_id": row.id,
+            "gateway_transaction_id": row.gateway_transaction_id,
+            "local_status": row.status.value if row.status else None,
+            "local_amount": row.amount,
+        }
+        if isinstance(entity, Exception):
+            return [dict(base, kind=GATEWAY_ERROR, details={"error": f"{type(entity).__name__}: {entity}"[:500]})]
+        if entity is None:
+            return [dict(base, kind=MISSING_AT_GATEWAY)]
+
+        found = []
+        remote_status = gateway_status(entity)
+        remote_amount = gateway_amount(entity)
+        if remote_status is not None and remote_status != row.status:
+            found.append(dict(
+                base, kind=STATUS_MISMATCH, gateway_status=remote_status.value,
+                details={"gateway_raw_status": entity.get("status")}
+            ))
+        elif remote_status is None:
+            found.append(dict(base, kind=STATUS_MISMATCH, details={"gateway_raw_status": entity.get("status")}))
+        if remote_amount is not None and row.amount is not None and Decimal(str(row.amount)) != remote_amount:
+            found.append(dict(base, kind=AMOUNT_MISMATCH, gateway_amount=remote_amount))
+        return found
+
+    def _reconcile_chunk(self, run_id: int, chunk: List, entities: Dict[int, object], apply_fixes: bool):
+        mismatches: List[Dict] = []
+        # (expected current status, new status) -> transaction ids
+        transaction_fixes: Dict[tuple, List[int]] = defaultdict(list)
+        order_fixes: Dict[tuple, List[int]] = defaultdict(list)
+        paid_transactions = set()
+
+        for row in chunk:
+            expected = row.status
+            if row.id in entities:
+                found = self._diff(row, entities[row.id])
+                mismatches.extend(found)
+                remote = next(
+                    (m["gateway_status"] for m in found if m["kind"] == STATUS_MISMATCH and m.get("gateway_status")),
+                    None
+                )
+                # A captured payment for the wrong amount needs a human, not an automatic move to PAID
+                if remote is not None and not any(m["kind"] == AMOUNT_MISMATCH for m in found):
+                    remote = PaymentStatus(remote)
+                    if STATUS_RANK[remote] > STATUS_RANK.get(row.status or PaymentStatus.PENDING, 0):
+                        transaction_fixes[(row.status, remote)].append(row.id)
+                        if remote == PaymentStatus.PAID:
+                            paid_transactions.add(row.id)
+                        expected = remote
+            if row.order_id is not None and expected is not None and row.order_payment_status != expected:
+                mismatches.append({
+                    "payment_transaction_id": row.id,
+                    "gateway_transaction_id": row.gateway_transaction_id,
+                    "kind": ORDER_STATUS_MISMATCH,
+                    "local_status": row.order_payment_status.value if row.order_payment_status else None,
+                    "gateway_status": expected.value,
+                    "details": {"order_id": row.order_id},
+                })
+                current = row.order_payment_status or PaymentStatus.PENDING
+                if STATUS_RANK[expected] > STATUS_RANK.get(current, 0):
+                    order_fixes[(row.order_payment_status, expected)].append(row.order_id)
+
+        with self.session_factory() as db:
+            fixed_transactions, fixed_orders, queued = set(), set(), 0
+            if apply_fixes:
+                fixed_transactions = self._apply_transaction_fixes(db, transaction_fixes)
+                fixed_orders = self._apply_order_fixes(db, order_fixes)
+                paid_orders = {
+                    row.order_id for row in chunk
+                    if row.order_id is not None and row.id in fixed_transactions and row.id in paid_transactions
+                }
+                queued = self._enqueue_paid_orders(db, paid_orders)
+
+            now = datetime.utcnow()
+            for mismatch in mismatches:
+                if mismatch["kind"] == STATUS_MISMATCH:
+                    mismatch["fixed"] = int(mismatch["payment_transaction_id"] in fixed_transactions)
+                elif mismatch["kind"] == ORDER_STATUS_MISMATCH:
+                    mismatch["fixed"] = int(mismatch["details"]["order_id"] in fixed_orders)
+                mismatch.setdefault("fixed", 0)
+                mismatch["run_id"] = run_id
+                mismatch["created_at"] = now
+            if mismatches:
+                db.bulk_insert_mappings(PaymentReconciliationMismatch, mismatches)
+
+            run = db.query(PaymentReconciliationRun).filter(
+                PaymentReconciliationRun.id == run_id
+            ).with_for_update().one()
+            run.scanned += len(chunk)
+            run.mismatches += len(mismatches)
+            run.fixed += sum(m["fixed"] for m in mismatches)
+            run.errors += sum(1 for m in mismatches if m["kind"] == GATEWAY_ERROR)
+            db.commit()
+        return queued
+
+    # ==== Fixes ====
+
+    def _apply_transaction_fixes(self, db: Session, fixes: Dict[tuple, List[int]]) -> set:
+        fixed = set()
+        now = datetime.utcnow()
+        for (current, target), ids in fixes.items():
+            guard = PaymentTransaction.status.is_(None) if current is None else PaymentTransaction.status == current
+            db.execute(
+                update(PaymentTransaction)
+                .where(PaymentTransaction.id.in_(ids), guard)
+                .values(status=target, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            # Re-read which rows actually moved; a concurrent webhook may have won the race
+            fixed.update(
+                row_id for (row_id,) in db.query(PaymentTransaction.id)
+                .filter(PaymentTransaction.id.in_(ids), PaymentTransaction.status == target)
+            )
+        return fixed
+
+    def _apply_order_fixes(self, db: Session, fixes: Dict[tuple, List[int]]) -> set:
+        fixed = set()
+        now = datetime.utcnow()
+        for (current, target), ids in fixes.items():
+            guard = Order.payment_status.is_(None) if current is None else Order.payment_status == current
+            db.execute(
+                update(Order)
+                .where(Order.id.in_(ids), guard)
+                .values(payment_status=target, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            moved = db.query(Order.id, Order.order_id).filter(Order.id.in_(ids), Order.payment_status == target).all()
+            fixed.update(row_id for row_id, _ in moved)
+            invalidate_order_details_on_commit(db, *(order_id for _, order_id in moved))
+        return fixed
+
+    def _enqueue_paid_orders(self, db: Session, order_ids: set) -> int:
+        """Queue the Shopify order for each order whose payment this chunk moved to PAID"""
+        queued = 0
+        if not order_ids:
+            return queued
+        for order in db.query(Order).filter(Order.id.in_(order_ids)):
+            if enqueue_paid_order(db, order) is not None:
+                logger.info(f"Reconciliation: Shopify order queued for {order.order_id}")
+                queued += 1
+        return queued
+
+    # ==== Reports ====
+
+    def run_summary(self, run: PaymentReconciliationRun) -> Dict:
+        return {
+            "id": run.id,
+            "status": run.status,
+            "apply_fixes": bool(run.apply_fixes),
+            "filters": run.filters,
+            "scanned": run.scanned,
+            "mismatches": run.mismatches,
+            "fixed": run.fixed,
+            "errors": run.errors,
+            "error": run.error,
+            "started_at": run.started_at.isoformat() if run.started_at else None,
+            "finished_at": run.finished_at.isoformat() if run.finished_at else None
+        }
+
+    def mismatches(self, db: Session, run_id: int, kind: Optional[str] = None, after_id: int = 0,
+                   limit: int = 100) -> List[Dict]:
+        query = db.query(PaymentReconciliationMismatch).filter(
+            PaymentReconciliationMismatch.run_id == run_id, PaymentReconciliationMismatch.id > after_id
+        )
+        if kind:
+            query = query.filter(PaymentReconciliationMismatch.kind == kind)
+        rows = query.order_by(PaymentReconciliationMismatch.id).limit(limit).all()
+        return [
+            {
+                "id": row.id,
+                "payment_transaction_id": row.payment_transaction_id,
+                "gateway_transaction_id": row.gateway_transaction_id,
+                "kind": row.kind,
+                "local_status": row.local_status,
+                "gateway_status": row.gateway_status,
+                "local_amount": float(row.local_amount) if row.local_amount is not None else None,
+                "gateway_amount": float(row.gateway_amount) if row.gateway_amount is not None else None,
+                "fixed": bool(row.fixed),
+                "details": row.details
+            }
+            for row in rows
+        ]
+
+
+payment_reconciler = PaymentReconciler()
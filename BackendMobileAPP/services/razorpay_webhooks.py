@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database.connection import SessionLocal
+from models.order_models import PaymentStatus, PaymentTransaction, RazorpayWebhookEvent
+from services.advanced_order_service import invalidate_order_details_on_commit
+from services.shopify_outbox import enqueue_paid_order, shopify_outbox_worker
+from utils.logger import get_logger
+from utils.ttl_cache import TTLCache
+
+logger = get_logger()
+
+RECEIVED = "received"
+PROCESSED = "processed"
+IGNORED = "ignored"
+FAILED = "failed"
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+RAZORPAY_WEBHOOK_DEDUP_TTL = _int_env("RAZORPAY_WEBHOOK_DEDUP_TTL", 3600)
+RAZORPAY_WEBHOOK_DEDUP_SIZE = _int_env("RAZORPAY_WEBHOOK_DEDUP_SIZE", 20000)
+RAZORPAY_WEBHOOK_BATCH_SIZE = _int_env("RAZORPAY_WEBHOOK_BATCH_SIZE", 200)
+RAZORPAY_WEBHOOK_CONCURRENCY = _int_env("RAZORPAY_WEBHOOK_CONCURRENCY", 4)
+RAZORPAY_WEBHOOK_MAX_ATTEMPTS = _int_env("RAZORPAY_WEBHOOK_MAX_ATTEMPTS", 5)
+RAZORPAY_WEBHOOK_POLL_INTERVAL = _int_env("RAZORPAY_WEBHOOK_POLL_INTERVAL", 5)
+# Exponential backoff between attempts of a failing event
+RAZORPAY_WEBHOOK_RETRY_BASE_SECONDS = _int_env("RAZORPAY_WEBHOOK_RETRY_BASE_SECONDS", 5)
+RAZORPAY_WEBHOOK_RETRY_MAX_SECONDS = _int_env("RAZORPAY_WEBHOOK_RETRY_MAX_SECONDS", 600)
+
+# Event type -> payment status it moves the transaction to
+EVENT_STATUS = {
+    "payment.captured": PaymentStatus.PAID,
+    "order.paid": PaymentStatus.PAID,
+    "payment.failed": PaymentStatus.FAILED,
+    "refund.processed": PaymentStatus.REFUNDED,
+    "payment.refunded": PaymentStatus.REFUNDED,
+}
+
+# Statuses only move forward, so a late or replayed event can never undo a newer one
+STATUS_RANK = {
+    PaymentStatus.PENDING: 0,
+    PaymentStatus.FAILED: 1,
+    PaymentStatus.PAID: 2,
+    PaymentStatus.PARTIALLY_REFUNDED: 3,
+    PaymentStatus.REFUNDED: 4,
+}
+
+# Event ids seen recently by this process; the unique constraint is the real guard
+recent_event_ids = TTLCache(ttl_seconds=RAZORPAY_WEBHOOK_DEDUP_TTL, max_entries=RAZORPAY_WEBHOOK_DEDUP_SIZE)
+
+
+def event_id_for(body: bytes, header_event_id: Optional[str]) -> str:
+    """Razorpay sends X-Razorpay-Event-Id; fall back to a body hash for deliveries without it"""
+    return header_event_id or f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def _payment_entity(payload: Dict) -> Dict:
+    return (payload.get("payload", {}).get("payment", {}) or {}).get("entity", {}) or {}
+
+
+def ingest_webhook_event(db: Session, event_id: str, body: bytes) -> bool:
+    """
+    Persist a raw webhook delivery; returns False for a duplicate.
+
+    Recent duplicates are dropped from memory without touching the database; the
+    unique event_id constraint catches the rest (other workers, restarts).
+    """
+    if recent_event_ids.get(event_id) is not None:
+        return False
+
+    payload = json.loads(body)
+    event = RazorpayWebhookEvent(
+        event_id=event_id,
+        event_type=payload.get("event"),
+        payment_id=_payment_entity(payload).get("id"),
+        payload=payload,
+        status=RECEIVED,
+        attempts=0,
+        received_at=datetime.utcnow()
+    )
+    db.add(event)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        recent_event_ids.set(event_id, True)
+        return False
+
+    recent_event_ids.set(event_id, True)
+    return True
+
+
+class RazorpayWebhookProcessor:
+    """
+    Apply stored webhook events to PaymentTransaction rows in the background.
+
+    Each batch is grouped by payment id: one payment's events run sequentially in
+    arrival order, different payments run concurrently (bounded). Status changes are
+    forward-only, so redelivered or out-of-order events are harmless.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = RAZORPAY_WEBHOOK_BATCH_SIZE,
+                 concurrency: int = RAZORPAY_WEBHOOK_CONCURRENCY):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ==== Processing ====
+
+    def _pending_by_payment(self) -> "OrderedDict[str, List[int]]":
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            rows = (
+                db.query(RazorpayWebhookEvent.id, RazorpayWebhookEvent.payment_id)
+                .filter(
+                    RazorpayWebhookEvent.status == RECEIVED,
+                    or_(RazorpayWebhookEvent.next_attempt_at.is_(None), RazorpayWebhookEvent.next_attempt_at <= now)
+                )
+                .order_by(RazorpayWebhookEvent.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            # A payment whose earlier event is backing off keeps its later events waiting behind it
+            backing_off = {
+                payment_id for (payment_id,) in
+                db.query(RazorpayWebhookEvent.payment_id)
+                .filter(RazorpayWebhookEvent.status == RECEIVED, RazorpayWebhookEvent.next_attempt_at > now)
+                .distinct()
+                if payment_id
+            }
+        groups: "OrderedDict[str, List[int]]" = OrderedDict()
+        for event_id, payment_id in rows:
+            if payment_id in backing_off:
+                continue
+            groups.setdefault(payment_id or f"event:{event_id}", []).append(event_id)
+        return groups
+
+    @staticmethod
+    def _backoff(attempts: int) -> timedelta:
+        delay = RAZORPAY_WEBHOOK_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+        return timedelta(seconds=min(RAZORPAY_WEBHOOK_RETRY_MAX_SECONDS, delay))
+
+    def _apply(self, db: Session, event: RazorpayWebhookEvent) -> str:
+        target = EVENT_STATUS.get(event.event_type)
+        if target is None or not event.payment_id:
+            return IGNORED
+
+        transaction = db.query(PaymentTransaction).filter(
+            PaymentTransaction.gateway_transaction_id == event.payment_id
+        ).with_for_update().first()
+        if transaction is None:
+            return IGNORED
+
+        entity = _payment_entity(event.payload or {})
+        if target == PaymentStatus.REFUNDED and entity.get("amount_refunded") and entity.get("amount"):
+            if int(entity["amount_refunded"]) < int(entity["amount"]):
+                target = PaymentStatus.PARTIALLY_REFUNDED
+
+        current = transaction.status or PaymentStatus.PENDING
+        if STATUS_RANK[target] <= STATUS_RANK.get(current, 0):
+            return IGNORED
+
+        transaction.status = target
+        transaction.gateway_response = event.payload
+        transaction.updated_at = datetime.utcnow()
+        if transaction.order is not None:
+            transaction.order.payment_status = target
+            invalidate_order_details_on_commit(db, transaction.order.order_id)
+        db.flush()
+
+        if target == PaymentStatus.PAID:
+            # Queued in this transaction and delivered by the outbox worker after commit, so a
+            # failed commit or a crash can neither lose the Shopify order nor create it twice
+            if transaction.order is None:
+                logger.warning(f"Razorpay {event.payment_id}: paid, but no local order to send to Shopify")
+            elif enqueue_paid_order(db, transaction.order) is not None:
+                logger.info(f"Razorpay {event.payment_id}: Shopify order queued for {transaction.order.order_id}")
+        return PROCESSED
+
+    def _process_payment_events(self, event_ids: List[int]):
+        try:
+            self._process_in_order(event_ids)
+        finally:
+            shopify_outbox_worker.notify()
+
+    def _process_in_order(self, event_ids: List[int]):
+        with self.session_factory() as db:
+            for event_id in event_ids:
+                # Row lock so another worker process never applies the same event concurrently
+                event = (
+                    db.query(RazorpayWebhookEvent)
+                    .filter(RazorpayWebhookEvent.id == event_id, RazorpayWebhookEvent.status == RECEIVED)
+                    .with_for_update(skip_locked=True)
+                    .first()
+                )
+                if event is None:
+                    continue
+                try:
+                    event.status = self._apply(db, event)
+                    event.processed_at = datetime.utcnow()
+                    event.attempts = (event.attempts or 0) + 1
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    event = db.get(RazorpayWebhookEvent, event_id)
+                    event.attempts = (event.attempts or 0) + 1
+                    event.error = f"{type(e).__name__}: {e}"[:2000]
+                    if event.attempts >= RAZORPAY_WEBHOOK_MAX_ATTEMPTS:
+                        event.status = FAILED
+                        logger.error(f"Razorpay webhook event {event.event_id} failed permanently: {e}")
+                    else:
+                        event.next_attempt_at = datetime.utcnow() + self._backoff(event.attempts)
+                    db.commit()
+                    # Keep this payment's later events behind the failed one until it succeeds or gives up
+                    if event.status == RECEIVED:
+                        return
+
+    async def process_pending(self) -> int:
+        groups = await run_in_threadpool(self._pending_by_payment)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_group(event_ids: List[int]):
+            async with semaphore:
+                await run_in_threadpool(self._process_payment_events, event_ids)
+
+        await asyncio.gather(*(run_group(event_ids) for event_ids in groups.values()))
+        return sum(len(event_ids) for event_ids in groups.values())
+
+    # ==== Background loop ====
+
+    def notify(self):
+        """Wake the loop after a new event is stored (safe from any thread)"""
+        if self._wakeup is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, poll_interval: float = RAZORPAY_WEBHOOK_POLL_INTERVAL):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await self.process_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Razorpay webhook processing failed: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+razorpay_webhook_processor = RazorpayWebhookProcessor()
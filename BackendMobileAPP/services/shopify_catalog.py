@@ -0,0 +1,383 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
+
+from database.connection import SessionLocal, engine
+from models.order_models import ShopifyCatalogProduct, ShopifyCatalogVariant, ShopifyCatalogSyncState
+from shopify_service import shopify_service
+from utils.logger import get_logger
+
+logger = get_logger()
+
+SYNC_STATE_NAME = "products"
+
+# pg_advisory_lock key held for the length of a sync, so only one process syncs at a time
+SHOPIFY_CATALOG_SYNC_LOCK_KEY = 7302114404
+
+try:
+    SHOPIFY_CATALOG_CACHE_TTL = float(os.getenv("SHOPIFY_CATALOG_CACHE_TTL", "60"))
+except ValueError:
+    logger.warning("Invalid SHOPIFY_CATALOG_CACHE_TTL, falling back to 60")
+    SHOPIFY_CATALOG_CACHE_TTL = 60.0
+
+try:
+    SHOPIFY_CATALOG_SYNC_INTERVAL = float(os.getenv("SHOPIFY_CATALOG_SYNC_INTERVAL", "900"))
+except ValueError:
+    logger.warning("Invalid SHOPIFY_CATALOG_SYNC_INTERVAL, falling back to 900")
+    SHOPIFY_CATALOG_SYNC_INTERVAL = 900.0
+
+
+def _parse_shopify_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Shopify timestamps carry an offset; store them as naive UTC like the rest of the schema."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _normalize_name(name: Optional[str]) -> str:
+    return " ".join((name or "").lower().split())
+
+
+class _CatalogSnapshot:
+    """Immutable in-memory view of the mirror; replaced wholesale on reload."""
+
+    def __init__(self, products: List[Dict]):
+        self.loaded_at = time.monotonic()
+        self.products = products
+        self.variants_by_product: Dict[int, List[Dict]] = {}
+        self.variant_by_name: Dict[str, int] = {}
+        self.variant_by_sku: Dict[str, int] = {}
+
+        for product in products:
+            variants = product.get("variants", [])
+            self.variants_by_product[product["id"]] = variants
+            if variants:
+                # A product name maps to its first variant; "Title - Variant" picks a specific one
+                self.variant_by_name.setdefault(_normalize_name(product.get("title")), variants[0]["id"])
+            for variant in variants:
+                if variant.get("title") and variant["title"] != "Default Title":
+                    name = _normalize_name(f"{product.get('title')} - {variant['title']}")
+                    self.variant_by_name.setdefault(name, variant["id"])
+                if variant.get("sku"):
+                    self.variant_by_sku.setdefault(variant["sku"].strip().lower(), variant["id"])
+
+
+class ShopifyCatalog:
+    """
+    Local product/variant mirror of the Shopify store.
+
+    Full syncs walk every page of /products.json with page_info cursors (variants
+    come inline, so there is no per-product variants call); incremental syncs ask
+    only for products with updated_at >= the stored watermark, and product
+    webhooks apply single changes. A payload older than the stored product
+    (by Shopify's updated_at) is ignored, so out-of-order webhooks and sync pages
+    fetched before a webhook landed never roll a product back. Syncs hold a
+    Postgres advisory lock; a process that finds another one syncing skips its run.
+    Reads are served from an in-memory snapshot of the DB mirror that is reloaded
+    after local changes or every SHOPIFY_CATALOG_CACHE_TTL seconds (for changes
+    made by other workers).
+    """
+
+    def __init__(self, session_factory=SessionLocal, cache_ttl: float = SHOPIFY_CATALOG_CACHE_TTL, bind=engine):
+        self.session_factory = session_factory
+        self.bind = bind
+        self.cache_ttl = cache_ttl
+        self._snapshot: Optional[_CatalogSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._bootstrap_thread: Optional[threading.Thread] = None
+
+    # ==== Reads ====
+
+    def _current(self) -> _CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.cache_ttl:
+            return snapshot
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.loaded_at >= self.cache_ttl:
+                snapshot = self._snapshot = _CatalogSnapshot(self._load_products())
+            return snapshot
+
+    def _load_products(self) -> List[Dict]:
+        with self.session_factory() as db:
+            products = (
+                db.query(ShopifyCatalogProduct)
+                .options(selectinload(ShopifyCatalogProduct.variants))
+                .order_by(ShopifyCatalogProduct.id)
+                .all()
+            )
+            return [self._product_dict(product) for product in products]
+
+    @staticmethod
+    def _product_dict(product: ShopifyCatalogProduct) -> Dict:
+        data = dict(product.data or {})
+        data["variants"] = [
+            dict(variant.data or {})
+            for variant in sorted(product.variants, key=lambda v: (v.position or 0, v.id))
+        ]
+        return data
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def get_products(self) -> List[Dict]:
+        """All mirrored products in Shopify's JSON shape, variants included"""
+        return self._current().products
+
+    def get_product_variants(self, product_id: int) -> Optional[List[Dict]]:
+        """Variants of a mirrored product, or None when the product is not in the mirror"""
+        return self._current().variants_by_product.get(int(product_id))
+
+    def find_variant_id(self, name: Optional[str] = None, sku: Optional[str] = None) -> Optional[int]:
+        """Resolve an app product to a Shopify variant by SKU, then by product/variant title"""
+        snapshot = self._current()
+        if sku:
+            variant_id = snapshot.variant_by_sku.get(sku.strip().lower())
+            if variant_id:
+                return variant_id
+        if name:
+            return snapshot.variant_by_name.get(_normalize_name(name))
+        return None
+
+    def is_empty(self) -> bool:
+        return not self._current().products
+
+    # ==== Writes ====
+
+    def _upsert_products(self, db: Session, payloads: List[Dict], synced_at: datetime) -> Optional[datetime]:
+        """Insert or update a batch of product payloads; returns their highest updated_at"""
+        ids = [int(p["id"]) for p in payloads if p.get("id")]
+        existing = {
+            product.id: product
+            for product in db.query(ShopifyCatalogProduct)
+            .options(selectinload(ShopifyCatalogProduct.variants))
+            .filter(ShopifyCatalogProduct.id.in_(ids))
+        }
+
+        newest = None
+        for payload in payloads:
+            if not payload.get("id"):
+                continue
+            product_id = int(payload["id"])
+            product = existing.get(product_id)
+            updated_at = _parse_shopify_datetime(payload.get("updated_at"))
+            if product is None:
+                product = ShopifyCatalogProduct(id=product_id)
+                db.add(product)
+            elif updated_at and product.shopify_updated_at and updated_at < product.shopify_updated_at:
+                # Older than what is stored; still seen by this sync, so a full sync keeps it
+                product.synced_at = synced_at
+                continue
+
+            product.title = payload.get("title")
+            product.handle = payload.get("handle")
+            product.status = payload.get("status")
+            product.product_type = payload.get("product_type")
+            product.vendor = payload.get("vendor")
+            product.data = {key: value for key, value in payload.items() if key != "variants"}
+            product.shopify_updated_at = updated_at
+            product.synced_at = synced_at
+            self._reconcile_variants(product, payload.get("variants") or [])
+
+            if updated_at and (newest is None or updated_at > newest):
+                newest = updated_at
+        return newest
+
+    @staticmethod
+    def _reconcile_variants(product: ShopifyCatalogProduct, payloads: List[Dict]):
+        current = {variant.id: variant for variant in product.variants}
+        keep = set()
+        for payload in payloads:
+            if not payload.get("id"):
+                continue
+            variant_id = int(payload["id"])
+            keep.add(variant_id)
+            variant = current.get(variant_id)
+            if variant is None:
+                variant = ShopifyCatalogVariant(id=variant_id)
+                product.variants.append(variant)
+            variant.title = payload.get("title")
+            variant.sku = payload.get("sku") or None
+            variant.price = payload.get("price")
+            variant.inventory_quantity = payload.get("inventory_quantity")
+            variant.position = payload.get("position")
+            variant.data = payload
+        for variant_id, variant in current.items():
+            if variant_id not in keep:
+                product.variants.remove(variant)
+
+    def _delete_products(self, db: Session, product_ids: Iterable[int]):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        db.query(ShopifyCatalogVariant).filter(
+            ShopifyCatalogVariant.product_id.in_(product_ids)
+        ).delete(synchronize_session=False)
+        db.query(ShopifyCatalogProduct).filter(
+            ShopifyCatalogProduct.id.in_(product_ids)
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def _sync_state(db: Session) -> ShopifyCatalogSyncState:
+        state = db.get(ShopifyCatalogSyncState, SYNC_STATE_NAME)
+        if state is None:
+            state = ShopifyCatalogSyncState(name=SYNC_STATE_NAME)
+            db.add(state)
+        return state
+
+    def _sync_pages(self, db: Session, params: Dict, synced_at: datetime) -> Dict:
+        count = 0
+        newest = None
+        # Commit per page so a long sync never holds one big transaction open
+        for page in shopify_service.iter_pages("products.json", "products", params):
+            page_newest = self._upsert_products(db, page, synced_at)
+            db.commit()
+            count += len(page)
+            if page_newest and (newest is None or page_newest > newest):
+                newest = page_newest
+        return {"count": count, "newest": newest}
+
+    @contextmanager
+    def _cluster_sync_lock(self):
+        """Yield whether this process may sync; only one process across the deployment does at a time"""
+        if self.bind.dialect.name != "postgresql":
+            yield True
+            return
+        # Session-level lock on its own connection: the sync itself commits once per page
+        connection = self.bind.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(select(func.pg_try_advisory_lock(SHOPIFY_CATALOG_SYNC_LOCK_KEY))).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    connection.execute(select(func.pg_advisory_unlock(SHOPIFY_CATALOG_SYNC_LOCK_KEY)))
+        finally:
+            connection.close()
+
+    def full_sync(self) -> Dict:
+        """Mirror every product, removing ones that no longer exist in Shopify"""
+        with self._sync_lock, self._cluster_sync_lock() as acquired:
+            if not acquired:
+                logger.info("Shopify catalog full sync skipped: another process is syncing")
+                return {"mode": "full", "products": 0, "removed": 0, "skipped": True}
+            return self._full_sync()
+
+    def _full_sync(self) -> Dict:
+        with self.session_factory() as db:
+            started_at = datetime.utcnow()
+            result = self._sync_pages(db, {}, started_at)
+
+            stale_ids = [
+                product_id for (product_id,) in
+                db.query(ShopifyCatalogProduct.id).filter(ShopifyCatalogProduct.synced_at < started_at)
+            ]
+            self._delete_products(db, stale_ids)
+
+            state = self._sync_state(db)
+            state.last_full_sync_at = started_at
+            if result["newest"]:
+                state.updated_at_watermark = result["newest"]
+            db.commit()
+
+        self.invalidate()
+        logger.info(f"Shopify catalog full sync: {result['count']} product(s), {len(stale_ids)} removed")
+        return {"mode": "full", "products": result["count"], "removed": len(stale_ids)}
+
+    def _bootstrap(self):
+        try:
+            self.full_sync()
+        except Exception as e:
+            logger.error(f"Shopify catalog initial sync failed: {e}")
+
+    def start_background_full_sync(self) -> bool:
+        """Populate an empty mirror off the request path; False when a sync is already running"""
+        with self._snapshot_lock:
+            if self._bootstrap_thread is not None and self._bootstrap_thread.is_alive():
+                return False
+            if self._sync_lock.locked():
+                return False
+            self._bootstrap_thread = threading.Thread(target=self._bootstrap, name="shopify-catalog-bootstrap", daemon=True)
+            self._bootstrap_thread.start()
+            return True
+
+    def incremental_sync(self) -> Dict:
+        """Fetch only products updated since the watermark; falls back to a full sync the first time"""
+        with self.session_factory() as db:
+            state = db.get(ShopifyCatalogSyncState, SYNC_STATE_NAME)
+            watermark = state.updated_at_watermark if state else None
+        if watermark is None:
+            return self.full_sync()
+
+        with self._sync_lock, self._cluster_sync_lock() as acquired:
+            if not acquired:
+                logger.info("Shopify catalog incremental sync skipped: another process is syncing")
+                return {"mode": "incremental", "products": 0, "skipped": True}
+            return self._incremental_sync(watermark)
+
+    def _incremental_sync(self, watermark: datetime) -> Dict:
+        with self.session_factory() as db:
+            started_at = datetime.utcnow()
+            # updated_at_min is inclusive, so the newest product is re-read; upserts make that harmless
+            params = {"updated_at_min": f"{watermark.isoformat()}Z"}
+            result = self._sync_pages(db, params, started_at)
+
+            state = self._sync_state(db)
+            state.last_incremental_sync_at = started_at
+            if result["newest"] and result["newest"] > watermark:
+                state.updated_at_watermark = result["newest"]
+            db.commit()
+
+        if result["count"]:
+            self.invalidate()
+        logger.info(f"Shopify catalog incremental sync: {result['count']} product(s) updated")
+        return {"mode": "incremental", "products": result["count"]}
+
+    def apply_webhook(self, topic: str, payload: Dict) -> Dict:
+        """Apply a products/create, products/update or products/delete webhook"""
+        with self.session_factory() as db:
+            if topic == "products/delete":
+                self._delete_products(db, [int(payload["id"])])
+                db.commit()
+            else:
+                try:
+                    self._upsert_products(db, [payload], datetime.utcnow())
+                    db.commit()
+                except IntegrityError:
+                    # A sync in another process inserted the product first; apply as an update
+                    db.rollback()
+                    self._upsert_products(db, [payload], datetime.utcnow())
+                    db.commit()
+        self.invalidate()
+        return {"topic": topic, "product_id": payload.get("id")}
+
+
+shopify_catalog = ShopifyCatalog()
+
+
+async def run_catalog_sync_loop(interval: float = SHOPIFY_CATALOG_SYNC_INTERVAL):
+    """Keep the mirror fresh in the background; webhooks cover changes between runs."""
+    while True:
+        try:
+            await run_in_threadpool(shopify_catalog.incremental_sync)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Shopify catalog sync failed: {e}")
+        await asyncio.sleep(interval)
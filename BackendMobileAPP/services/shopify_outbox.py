@@ -0,0 +1,327 @@
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database.connection import SessionLocal
+from models.order_models import Order, ShopifyOrderOutbox
+from services.advanced_order_service import invalidate_order_details_on_commit
+from shopify_service import shopify_service
+from utils.logger import get_logger
+
+logger = get_logger()
+
+PENDING = "pending"
+PROCESSING = "processing"
+DELIVERED = "delivered"
+DEAD = "dead"
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+SHOPIFY_OUTBOX_MAX_ATTEMPTS = int(_float_env("SHOPIFY_OUTBOX_MAX_ATTEMPTS", 8))
+SHOPIFY_OUTBOX_BATCH_SIZE = int(_float_env("SHOPIFY_OUTBOX_BATCH_SIZE", 20))
+SHOPIFY_OUTBOX_POLL_INTERVAL = _float_env("SHOPIFY_OUTBOX_POLL_INTERVAL", 5.0)
+SHOPIFY_OUTBOX_LEASE_SECONDS = _float_env("SHOPIFY_OUTBOX_LEASE_SECONDS", 300.0)
+SHOPIFY_OUTBOX_BACKOFF_BASE = _float_env("SHOPIFY_OUTBOX_BACKOFF_BASE", 10.0)
+SHOPIFY_OUTBOX_BACKOFF_MAX = _float_env("SHOPIFY_OUTBOX_BACKOFF_MAX", 1800.0)
+
+# Client errors that will fail the same way on every retry
+PERMANENT_STATUS_CODES = {400, 401, 402, 403, 404, 406, 422}
+
+
+def enqueue_shopify_order(db: Session, order: Order, order_data: Dict, financial_status: str = "paid") -> ShopifyOrderOutbox:
+    """
+    Queue Shopify order creation for ``order``.
+
+    Adds the outbox row to the caller's session only; it is committed together with
+    the Order, so either both exist or neither does.
+    """
+    entry = ShopifyOrderOutbox(
+        order=order,
+        idempotency_key=f"{order.order_id}-{uuid.uuid4().hex[:12]}",
+        payload=order_data,
+        financial_status=financial_status,
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(entry)
+    return entry
+
+
+def enqueue_paid_order(db: Session, order: Order) -> Optional[ShopifyOrderOutbox]:
+    """
+    Queue the Shopify order for a local order whose payment was confirmed after checkout
+    (Razorpay webhook, reconciliation), in the caller's transaction. Returns None when the
+    order already has an outbox row, e.g. from /payment-success.
+    """
+    if db.query(ShopifyOrderOutbox.id).filter(ShopifyOrderOutbox.order_id == order.id).first() is not None:
+        return None
+    products = [
+        {"name": item.product_name, "sku": item.product_sku, "quantity": item.quantity, "price": str(item.unit_price)}
+        for item in order.items
+    ]
+    order_data = shopify_service.order_data_from_payment({
+        "products": products,
+        "personal_info": order.billing_address or {},
+        "address_info": order.shipping_address or {}
+    })
+    return enqueue_shopify_order(db, order, order_data)
+
+
+class ShopifyOutboxWorker:
+    """Deliver queued Shopify orders with retries, idempotency checks and dead-lettering."""
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = SHOPIFY_OUTBOX_BATCH_SIZE,
+                 max_attempts: int = SHOPIFY_OUTBOX_MAX_ATTEMPTS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ==== Claiming ====
+
+    def _claim(self, db: Session) -> Optional[Dict]:
+        """
+        Lease the next due row (or one whose lease expired after a crash) to this worker.
+
+        One row per transaction, leased right before its delivery, so a batch never holds
+        leases on rows still waiting behind a slow Shopify call.
+        """
+        now = datetime.utcnow()
+        row = (
+            db.query(ShopifyOrderOutbox)
+            .filter(or_(
+                and_(ShopifyOrderOutbox.status == PENDING, ShopifyOrderOutbox.next_attempt_at <= now),
+                and_(ShopifyOrderOutbox.status == PROCESSING, ShopifyOrderOutbox.locked_until < now),
+            ))
+            .order_by(ShopifyOrderOutbox.next_attempt_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if row is None:
+            db.commit()
+            return None
+        # The previous holder may have created the Shopify order before its lease ran out
+        recovered = row.status == PROCESSING
+        if recovered:
+            row.attempts = (row.attempts or 0) + 1
+        row.status = PROCESSING
+        row.locked_until = now + timedelta(seconds=SHOPIFY_OUTBOX_LEASE_SECONDS)
+        # Plain snapshot; locked_until doubles as the lease token the final UPDATE is guarded by
+        claimed = {
+            "id": row.id,
+            "order_id": row.order_id,
+            "idempotency_key": row.idempotency_key,
+            "payload": row.payload or {},
+            "financial_status": row.financial_status,
+            "attempts": row.attempts or 0,
+            "recovered": recovered,
+            "lease": row.locked_until,
+        }
+        db.commit()
+        return claimed
+
+    # ==== Delivery ====
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(SHOPIFY_OUTBOX_BACKOFF_MAX, SHOPIFY_OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    def _finish(self, db: Session, claimed: Dict, **values) -> bool:
+        """Write the outcome only while this worker still holds the lease it took; False if it lost it"""
+        result = db.execute(
+            update(ShopifyOrderOutbox)
+            .where(
+                ShopifyOrderOutbox.id == claimed["id"],
+                ShopifyOrderOutbox.status == PROCESSING,
+                ShopifyOrderOutbox.locked_until == claimed["lease"],
+            )
+            .values(locked_until=None, updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            logger.warning(
+                f"Shopify outbox {claimed['id']} lease expired during delivery; leaving the row to its new holder"
+            )
+            return False
+        return True
+
+    def _mark_delivered(self, db: Session, claimed: Dict, shopify_order_id):
+        shopify_order_id = str(shopify_order_id)
+        if not self._finish(db, claimed, status=DELIVERED, shopify_order_id=shopify_order_id,
+                            delivered_at=datetime.utcnow(), last_error=None):
+            return
+        if claimed["order_id"] is not None:
+            db.execute(
+                update(Order).where(Order.id == claimed["order_id"])
+                .values(shopify_order_id=shopify_order_id)
+                .execution_options(synchronize_session=False)
+            )
+            order_id = db.query(Order.order_id).filter(Order.id == claimed["order_id"]).scalar()
+            if order_id is not None:
+                invalidate_order_details_on_commit(db, order_id)
+        db.commit()
+
+    def _mark_failed(self, db: Session, claimed: Dict, error: str, permanent: bool = False):
+        attempts = claimed["attempts"] + 1
+        if permanent or attempts >= self.max_attempts:
+            values = {"status": DEAD}
+        else:
+            values = {"status": PENDING, "next_attempt_at": datetime.utcnow() + self._backoff(attempts)}
+        if not self._finish(db, claimed, attempts=attempts, last_error=error[:2000], **values):
+            return
+        db.commit()
+        if values["status"] == DEAD:
+            logger.error(
+                f"Shopify outbox {claimed['id']} (order {claimed['order_id']}) dead-lettered "
+                f"after {attempts} attempt(s): {error}"
+            )
+        else:
+            logger.warning(f"Shopify outbox {claimed['id']} attempt {attempts} failed, will retry: {error}")
+
+    def _deliver(self, db: Session, claimed: Dict):
+        try:
+            if claimed["attempts"] or claimed["recovered"]:
+                # An earlier attempt may have created the order before failing; never create it twice
+                existing = shopify_service.find_order_by_source_identifier(claimed["idempotency_key"])
+                if existing:
+                    self._mark_delivered(db, claimed, existing["id"])
+                    return
+
+            status_code, body = shopify_service.submit_order(
+                claimed["payload"], claimed["financial_status"], claimed["idempotency_key"]
+            )
+            shopify_order_id = (body.get("order") or {}).get("id") if isinstance(body, dict) else None
+            if status_code == 201 and shopify_order_id:
+                self._mark_delivered(db, claimed, shopify_order_id)
+            else:
+                self._mark_failed(
+                    db, claimed, f"HTTP {status_code}: {body}", permanent=status_code in PERMANENT_STATUS_CODES
+                )
+        except Exception as e:
+            db.rollback()
+            self._mark_failed(db, claimed, f"{type(e).__name__}: {e}")
+
+    def process_batch(self) -> int:
+        """Claim and deliver up to batch_size rows, one at a time; returns how many were attempted"""
+        processed = 0
+        with self.session_factory() as db:
+            while processed < self.batch_size:
+                claimed = self._claim(db)
+                if claimed is None:
+                    break
+                self._deliver(db, claimed)
+                processed += 1
+        return processed
+
+    def seconds_until_next_due(self, default: float) -> float:
+        """How long the loop may sleep before the earliest pending retry is due"""
+        with self.session_factory() as db:
+            next_due = (
+                db.query(func.min(ShopifyOrderOutbox.next_attempt_at))
+                .filter(ShopifyOrderOutbox.status == PENDING)
+                .scalar()
+            )
+        if next_due is None:
+            return default
+        return min(default, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+
+    # ==== Background loop ====
+
+    def notify(self):
+        """Wake the loop right after a request commits a new outbox row (safe from any thread)"""
+        if self._wakeup is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, poll_interval: float = SHOPIFY_OUTBOX_POLL_INTERVAL):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await run_in_threadpool(self.process_batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Shopify outbox batch failed: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+            try:
+                timeout = await run_in_threadpool(self.seconds_until_next_due, poll_interval)
+            except Exception:
+                timeout = poll_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    # ==== Admin ====
+
+    def stats(self, db: Session) -> Dict:
+        counts = dict(
+            db.query(ShopifyOrderOutbox.status, func.count(ShopifyOrderOutbox.id))
+            .group_by(ShopifyOrderOutbox.status)
+            .all()
+        )
+        oldest_pending = (
+            db.query(func.min(ShopifyOrderOutbox.created_at))
+            .filter(ShopifyOrderOutbox.status.in_([PENDING, PROCESSING]))
+            .scalar()
+        )
+        return {
+            "counts": {status: counts.get(status, 0) for status in (PENDING, PROCESSING, DELIVERED, DEAD)},
+            "oldest_pending_at": oldest_pending.isoformat() if oldest_pending else None
+        }
+
+    def dead_letters(self, db: Session, limit: int = 100) -> List[Dict]:
+        rows = (
+            db.query(ShopifyOrderOutbox)
+            .filter(ShopifyOrderOutbox.status == DEAD)
+            .order_by(ShopifyOrderOutbox.updated_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "id": row.id,
+                "order_id": row.order_id,
+                "attempts": row.attempts,
+                "last_error": row.last_error,
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None
+            }
+            for row in rows
+        ]
+
+    def requeue(self, db: Session, outbox_id: int) -> bool:
+        """Send a dead-lettered row back to the queue with a fresh retry budget"""
+        row = db.get(ShopifyOrderOutbox, outbox_id)
+        if row is None or row.status != DEAD:
+            return False
+        # attempts stays non-zero so delivery first checks Shopify for an order from an earlier try
+        row.attempts = 1
+        row.status = PENDING
+        row.next_attempt_at = datetime.utcnow()
+        db.commit()
+        self.notify()
+        return True
+
+
+shopify_outbox_worker = ShopifyOutboxWorker()
@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, Optional
+
+from utils.http_client import retry_after_seconds
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+# Standard plan defaults; the bucket size is corrected from X-Shopify-Shop-Api-Call-Limit
+SHOPIFY_BUCKET_SIZE = int(_float_env("SHOPIFY_BUCKET_SIZE", 40))
+SHOPIFY_LEAK_RATE = _float_env("SHOPIFY_LEAK_RATE", 2.0)  # requests per second
+# Slots only ORDER-priority calls may use, so a catalog sync never starves checkout
+SHOPIFY_PRIORITY_RESERVE = int(_float_env("SHOPIFY_PRIORITY_RESERVE", 10))
+SHOPIFY_MAX_WAIT_SECONDS = _float_env("SHOPIFY_MAX_WAIT_SECONDS", 120.0)
+
+CALL_LIMIT_HEADER = "X-Shopify-Shop-Api-Call-Limit"
+
+
+class ShopifyPriority(IntEnum):
+    ORDER = 0
+    DEFAULT = 1
+    CATALOG = 2
+
+
+class ShopifyQueueTimeout(Exception):
+    """Raised when a call waited longer than SHOPIFY_MAX_WAIT_SECONDS for bucket capacity."""
+
+
+class ShopifyCallScheduler:
+    """
+    Client-side model of Shopify's leaky bucket that paces Admin API calls.
+
+    The bucket level is estimated locally (it drains at ``leak_rate`` per second)
+    and corrected from the X-Shopify-Shop-Api-Call-Limit header on every response.
+    Callers wait in a priority queue: the head of the queue is released once the
+    bucket has room, ORDER calls may use the last ``reserve`` slots that lower
+    priorities may not, and a 429 pauses everyone until its Retry-After has passed.
+    Works for both threads (acquire) and coroutines (aacquire).
+    """
+
+    def __init__(self, bucket_size: int = SHOPIFY_BUCKET_SIZE, leak_rate: float = SHOPIFY_LEAK_RATE,
+                 reserve: int = SHOPIFY_PRIORITY_RESERVE, max_wait: float = SHOPIFY_MAX_WAIT_SECONDS):
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.reserve = reserve
+        self.max_wait = max_wait
+
+        self._level = 0.0
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+        self.throttled_total = 0
+        self.calls_total = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    # ==== Bucket model ====
+
+    def _drain(self, now: float):
+        self._level = max(0.0, self._level - (now - self._updated_at) * self.leak_rate)
+        self._updated_at = now
+
+    def _limit_for(self, priority: int) -> float:
+        return self.bucket_size if priority <= ShopifyPriority.ORDER else self.bucket_size - self.reserve
+
+    def _delay_for(self, ticket, now: float) -> float:
+        """Seconds until ``ticket`` may be sent; 0 means go now."""
+        if self._waiting[0] != ticket:
+            return 0.05
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._drain(now)
+        # _level already includes in-flight calls (added on admit), so they are not counted again
+        excess = self._level + 1 - self._limit_for(ticket[0])
+        return 0.0 if excess <= 0 else excess / self.leak_rate
+
+    def _admit(self, ticket, waited: float):
+        heapq.heappop(self._waiting)
+        self._level += 1
+        self._in_flight += 1
+        self.calls_total += 1
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def _enqueue(self, priority: Optional[int]):
+        ticket = (int(ShopifyPriority.DEFAULT if priority is None else priority), next(self._seq))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _abandon(self, ticket, waited: float):
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+        raise ShopifyQueueTimeout(f"Shopify call waited {waited:.1f}s for rate limit capacity")
+
+    # ==== Acquire / release ====
+
+    def acquire(self, priority: Optional[int] = None):
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            while True:
+                now = time.monotonic()
+                delay = self._delay_for(ticket, now)
+                if delay <= 0:
+                    self._admit(ticket, now - started)
+                    self._cond.notify_all()
+                    return
+                if now - started + delay > self.max_wait:
+                    self._abandon(ticket, now - started)
+                self._cond.wait(timeout=delay)
+
+    async def aacquire(self, priority: Optional[int] = None):
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                delay = self._delay_for(ticket, now)
+                if delay <= 0:
+                    self._admit(ticket, now - started)
+                    self._cond.notify_all()
+                    return
+                if now - started + delay > self.max_wait:
+                    self._abandon(ticket, now - started)
+            # Coroutines cannot block on the condition; sleep for the computed delay instead
+            await asyncio.sleep(min(delay, 1.0))
+
+    def release(self, response=None):
+        """Record the outcome of an admitted call and wake the queue."""
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            now = time.monotonic()
+            if response is not None:
+                self._observe(response, now)
+            self._cond.notify_all()
+
+    def _observe(self, response, now: float):
+        header = response.headers.get(CALL_LIMIT_HEADER)
+        if header:
+            try:
+                used, size = (int(part) for part in header.split("/", 1))
+                self.bucket_size = size
+                self._level = float(used)
+                self._updated_at = now
+            except ValueError:
+                pass
+        if response.status_code == 429:
+            self.throttled_total += 1
+            retry_after = retry_after_seconds(response)
+            self._level = float(self.bucket_size)
+            self._updated_at = now
+            self._blocked_until = max(self._blocked_until, now + (retry_after if retry_after is not None else 1.0 / self.leak_rate))
+            logger.warning(f"Shopify throttled (429); pausing calls for {self._blocked_until - now:.1f}s")
+
+    # ==== Metrics ====
+
+    def stats(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            self._drain(now)
+            depth = {priority.name.lower(): 0 for priority in ShopifyPriority}
+            for priority, _ in self._waiting:
+                depth[ShopifyPriority(priority).name.lower()] += 1
+            return {
+                "queue_depth": len(self._waiting),
+                "queue_depth_by_priority": depth,
+                "in_flight": self._in_flight,
+                "bucket_level": round(self._level, 2),
+                "bucket_size": self.bucket_size,
+                "leak_rate": self.leak_rate,
+                "paused_for_seconds": round(max(0.0, self._blocked_until - now), 2),
+                "calls_total": self.calls_total,
+                "throttled_total": self.throttled_total,
+                "avg_wait_ms": round(self.wait_seconds_total / self.calls_total * 1000, 1) if self.calls_total else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            }
+
+
+shopify_scheduler = ShopifyCallScheduler()
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Dict, Optional
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from database.connection import get_db
+from database.routing import replica_reads
+from database.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, csv_lines, date_range_filters,
+    iter_keyset, keyset_page, ndjson_lines
+)
 from models.order_models import Order, OrderItem, PaymentTransaction, OrderStatus, PaymentStatus, PaymentMethod
 from shopify_service import shopify_service
-from datetime import datetime
+from services.advanced_order_service import AdvancedOrderService
+from services.shopify_catalog import shopify_catalog
+from services.shopify_outbox import enqueue_shopify_order, shopify_outbox_worker
+from utils.shopify_utils import validate_shopify_webhook
+from security.jwt import require_permission
+from models.user import User
+from datetime import date, datetime
+import json
+import os
 import uuid
 
 router = APIRouter(prefix="/shopify", tags=["Shopify"])
 
+SHOPIFY_WEBHOOK_SECRET = os.getenv("SHOPIFY_WEBHOOK_SECRET", "")
+
 class OrderItemRequest(BaseModel):
     name: str
     quantity: int
@@ -46,13 +63,51 @@ class CreateOrderDirectlyRequest(BaseModel):
 
 @router.get("/products")
 async def get_shopify_products():
-    """Get all products from Shopify"""
+    """Get all products from the local Shopify catalog mirror"""
     try:
-        products = shopify_service.get_products()
+        # A fresh install fills the mirror in the background; until then read Shopify directly
+        if await run_in_threadpool(shopify_catalog.is_empty):
+            shopify_catalog.start_background_full_sync()
+            products = await run_in_threadpool(shopify_service.get_products)
+            return {"success": True, "products": products, "source": "shopify"}
+        products = await run_in_threadpool(shopify_catalog.get_products)
         return {"success": True, "products": products}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/catalog/sync")
+def sync_shopify_catalog(
+    mode: str = Query("incremental", pattern="^(full|incremental)$"),
+    current_user: User = Depends(require_permission("system", "admin"))
+):
+    """Sync the catalog mirror: full walks every page, incremental uses updated_at_min"""
+    try:
+        result = shopify_catalog.full_sync() if mode == "full" else shopify_catalog.incremental_sync()
+        return {"success": True, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/webhooks/products")
+async def shopify_products_webhook(request: Request):
+    """Apply products/create, products/update and products/delete webhooks to the mirror"""
+    # Fail closed: order line items are mapped to variants through this mirror
+    if not SHOPIFY_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+    body = await request.body()
+    if not validate_shopify_webhook(body, request.headers.get("X-Shopify-Hmac-Sha256", ""), SHOPIFY_WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    topic = request.headers.get("X-Shopify-Topic", "")
+    if topic not in ("products/create", "products/update", "products/delete"):
+        return {"success": True, "ignored": topic}
+    try:
+        result = await run_in_threadpool(shopify_catalog.apply_webhook, topic, json.loads(body))
+        return {"success": True, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/create-order")
 async def create_shopify_order(request: CreateOrderRequest, db: Session = Depends(get_db)):
     """Create a new order in Shopify and save to database"""
@@ -139,7 +194,7 @@ async def create_shopify_order(request: CreateOrderRequest, db: Session = Depend
         }
         
         # Create order in Shopify
-        shopify_result = shopify_service.create_order(order_data)
+        shopify_result = await shopify_service.create_order_async(order_data)
         
         # Update order with Shopify order ID
         if shopify_result.get('order', {}).get('id'):
@@ -209,59 +264,46 @@ async def create_order_directly(request: CreateOrderDirectlyRequest, db: Session
         # For COD orders, we don't create Shopify order immediately
         # It will be created when payment is collected during delivery
         
-        # Create Shopify order immediately for COD (with pending payment status)
-        try:
-            # Use a basic product variant ID that should exist in your Shopify store
-            # You can replace this with actual variant IDs from your Shopify products
-            order_data = {
-                "line_items": [
-                    {
-                        "variant_id": 43910441009306,  # Brightening Moisturizer - real variant ID from your store
-                        "quantity": product.get('quantity', 1)
-                    }
-                    for product in request.products
-                ],
-                "customer": {
-                    "first_name": request.payment_data.get("personal_info", {}).get("first_name", ""),
-                    "last_name": request.payment_data.get("personal_info", {}).get("last_name", ""),
-                    "email": request.payment_data.get("personal_info", {}).get("email", "")
-                },
-                "shipping_address": {
-                    "first_name": request.payment_data.get("personal_info", {}).get("first_name", ""),
-                    "last_name": request.payment_data.get("personal_info", {}).get("last_name", ""),
-                    "address1": request.payment_data.get("address_info", {}).get("address_1", ""),
-                    "city": request.payment_data.get("address_info", {}).get("city", "Mumbai"),
-                    "province": "Maharashtra",
-                    "country": "India",
-                    "zip": request.payment_data.get("address_info", {}).get("zip_code", "400001")
+        # Queue the Shopify order for COD (with pending payment status)
+        # Use a basic product variant ID that should exist in your Shopify store
+        # You can replace this with actual variant IDs from your Shopify products
+        order_data = {
+            "line_items": [
+                {
+                    "variant_id": 43910441009306,  # Brightening Moisturizer - real variant ID from your store
+                    "quantity": product.get('quantity', 1)
                 }
+                for product in request.products
+            ],
+            "customer": {
+                "first_name": request.payment_data.get("personal_info", {}).get("first_name", ""),
+                "last_name": request.payment_data.get("personal_info", {}).get("last_name", ""),
+                "email": request.payment_data.get("personal_info", {}).get("email", "")
+            },
+            "shipping_address": {
+                "first_name": request.payment_data.get("personal_info", {}).get("first_name", ""),
+                "last_name": request.payment_data.get("personal_info", {}).get("last_name", ""),
+                "address1": request.payment_data.get("address_info", {}).get("address_1", ""),
+                "city": request.payment_data.get("address_info", {}).get("city", "Mumbai"),
+                "province": "Maharashtra",
+                "country": "India",
+                "zip": request.payment_data.get("address_info", {}).get("zip_code", "400001")
             }
-            
-            print(f"Creating Shopify order with data: {order_data}")
-            shopify_result = shopify_service.create_order(order_data, financial_status="pending")
-            print(f"Shopify result: {shopify_result}")
-            
-            # Update order with Shopify order ID
-            if shopify_result.get('order', {}).get('id'):
-                order.shopify_order_id = str(shopify_result['order']['id'])
-                db.commit()
-                print(f"Shopify order created with ID: {order.shopify_order_id}")
-            else:
-                print(f"No Shopify order ID in result: {shopify_result}")
-                
-        except Exception as e:
-            print(f"Failed to create Shopify order for COD: {e}")
-            import traceback
-            traceback.print_exc()
-            # Continue with database order even if Shopify fails
+        }
+        
+        # Delivered to Shopify by the outbox worker once this transaction commits. Not guarded:
+        # if queueing fails the request fails and rolls back, so no COD order exists without its outbox row
+        enqueue_shopify_order(db, order, order_data, financial_status="pending")
         
         db.commit()
+        shopify_outbox_worker.notify()
         
         return {
             "success": True,
             "message": "COD order accepted successfully",
             "database_order_id": order_id,
             "shopify_order_id": None,  # Will be created later
+            "shopify_sync_status": "pending",
             "payment_method": "COD",
             "status": "confirmed"
         }
@@ -342,22 +384,20 @@ async def handle_payment_success(request: PaymentSuccessRequest, db: Session = D
             "address_info": request.payment_data.get("address_info", {})
         }
         
-        # Create Shopify order
-        shopify_result = shopify_service.create_order_from_payment(order_data)
-        
-        # Update order with Shopify order ID
-        if shopify_result.get('order', {}).get('id'):
-            order.shopify_order_id = str(shopify_result['order']['id'])
+        # Queue the Shopify order; it commits with the local order and is delivered by the outbox worker
+        outbox_entry = enqueue_shopify_order(db, order, shopify_service.order_data_from_payment(order_data))
         
         db.commit()
+        shopify_outbox_worker.notify()
         
         return {
             "success": True,
-            "message": "Order created successfully in Shopify",
-            "order": shopify_result,
+            "message": "Order created successfully; Shopify order is being created",
+            "order": None,
             "payment_id": request.payment_id,
             "database_order_id": order_id,
-            "shopify_order_id": order.shopify_order_id
+            "shopify_order_id": None,
+            "shopify_sync_status": outbox_entry.status
         }
     except Exception as e:
         db.rollback()
@@ -375,7 +415,7 @@ async def fulfill_order(order_id: int, db: Session = Depends(get_db)):
             db.commit()
         
         # Fulfill in Shopify
-        result = shopify_service.fulfill_order(order_id)
+        result = await shopify_service.fulfill_order_async(order_id)
         return {"success": True, "fulfillment": result}
     except Exception as e:
         db.rollback()
@@ -389,7 +429,7 @@ async def get_order(order_id: int, db: Session = Depends(get_db)):
         db_order = db.query(Order).filter(Order.shopify_order_id == str(order_id)).first()
         
         # Get from Shopify
-        shopify_order = shopify_service.get_order(order_id)
+        shopify_order = await shopify_service.get_order_async(order_id)
         
         return {
             "success": True, 
@@ -405,34 +445,120 @@ async def get_order(order_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+ORDER_EXPORT_FIELDS = [
+    "order_id", "shopify_order_id", "status", "payment_status", "total_amount", "created_at", "customer_id"
+]
+
+def _order_summary(order: Order) -> Dict:
+    return {
+        "order_id": order.order_id,
+        "shopify_order_id": order.shopify_order_id,
+        "status": order.order_status.value if order.order_status else None,
+        "payment_status": order.payment_status.value if order.payment_status else None,
+        "total_amount": float(order.total_amount) if order.total_amount else 0,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "customer_id": order.customer_id
+    }
+
+def _filtered_orders(db: Session, status: Optional[List[OrderStatus]], customer_id: Optional[str],
+                     date_from: Optional[date], date_to: Optional[date]):
+    query = db.query(Order)
+    if status:
+        query = query.filter(Order.order_status.in_(status))
+    if customer_id:
+        query = query.filter(Order.customer_id == customer_id)
+    return query.filter(*date_range_filters(Order.created_at, date_from, date_to))
+
 @router.get("/orders")
-async def get_all_orders(db: Session = Depends(get_db)):
-    """Get all orders from database"""
+async def get_all_orders(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[List[OrderStatus]] = Query(None),
+    customer_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Get orders from database, newest first, one keyset page at a time"""
     try:
-        orders = db.query(Order).order_by(Order.created_at.desc()).all()
+        with replica_reads(db):
+            orders, next_cursor = keyset_page(
+                _filtered_orders(db, status, customer_id, date_from, date_to),
+                Order.created_at, Order.id, cursor, limit
+            )
         return {
             "success": True,
-            "orders": [
-                {
-                    "order_id": order.order_id,
-                    "shopify_order_id": order.shopify_order_id,
-                    "status": order.order_status.value if order.order_status else None,
-                    "payment_status": order.payment_status.value if order.payment_status else None,
-                    "total_amount": float(order.total_amount) if order.total_amount else 0,
-                    "created_at": order.created_at.isoformat() if order.created_at else None,
-                    "customer_id": order.customer_id
-                }
-                for order in orders
-            ]
+            "orders": [_order_summary(order) for order in orders],
+            "next_cursor": next_cursor
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/orders/export")
+def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[List[OrderStatus]] = Query(None),
+    customer_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Stream matching orders as NDJSON or CSV for reconciliation"""
+    rows = iter_keyset(
+        _filtered_orders(db, status, customer_id, date_from, date_to),
+        Order.created_at, Order.id, around_batch=lambda: replica_reads(db)
+    )
+    records = (_order_summary(order) for order in rows)
+    if format == "csv":
+        return StreamingResponse(
+            csv_lines(records, ORDER_EXPORT_FIELDS), media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=orders.csv"}
+        )
+    return StreamingResponse(ndjson_lines(records), media_type="application/x-ndjson")
+
+@router.get("/orders/analytics")
+async def get_order_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[List[OrderStatus]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Order counts and revenue per day and status, read from the daily rollups"""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    with replica_reads(db):
+        result = AdvancedOrderService(db).get_order_analytics(
+            date_from=date_from,
+            date_to=date_to,
+            statuses=[s.value for s in status] if status else None
+        )
+    if not result.get('success'):
+        raise HTTPException(status_code=500, detail=result.get('error'))
+    return result
+
+@router.get("/outbox")
+def get_shopify_outbox(db: Session = Depends(get_db)):
+    """Outbox queue counts and dead-lettered Shopify orders"""
+    return {
+        "success": True,
+        **shopify_outbox_worker.stats(db),
+        "dead_letters": shopify_outbox_worker.dead_letters(db)
+    }
+
+@router.post("/outbox/{outbox_id}/retry")
+def retry_shopify_outbox(outbox_id: int, db: Session = Depends(get_db)):
+    """Requeue a dead-lettered Shopify order"""
+    if not shopify_outbox_worker.requeue(db, outbox_id):
+        raise HTTPException(status_code=404, detail="Dead-lettered outbox entry not found")
+    return {"success": True, "outbox_id": outbox_id, "status": "pending"}
+
 @router.get("/test-connection")
 async def test_shopify_connection():
     """Test Shopify API connection"""
     try:
-        products = shopify_service.get_products()
+        products = await run_in_threadpool(shopify_service.get_products)
         return {
             "success": True,
             "message": "Shopify connection successful",
@@ -1,14 +1,26 @@
 import os
-import requests
 import json
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from utils.http_client import PooledHTTPClient
+from services.shopify_scheduler import ShopifyPriority, shopify_scheduler
+
+try:
+    SHOPIFY_MAX_RETRIES = int(os.getenv("SHOPIFY_MAX_RETRIES", "5"))
+except ValueError:
+    SHOPIFY_MAX_RETRIES = 5
 
 class ShopifyService:
     def __init__(self):
         self.store_name = "oliva-clinic"
         self.access_token = os.getenv("SHOPIFY_ACCESS_TOKEN", "")
         self.base_url = f"https://{self.store_name}.myshopify.com/admin/api/2024-04"
+        # Keep-alive pool shared by every call to the Admin API (sync and async), paced by the
+        # leaky-bucket scheduler; 429s wait out Retry-After and are retried
+        self.http = PooledHTTPClient(
+            "shopify", headers=self._get_headers(), limiter=shopify_scheduler, max_retries=SHOPIFY_MAX_RETRIES
+        )
         
     def _get_headers(self):
         return {
@@ -17,28 +29,41 @@ class ShopifyService:
             "Accept": "application/json"
         }
     
-    def get_products(self) -> List[Dict]:
-        """Fetch all products from Shopify"""
-        try:
-            url = f"{self.base_url}/products.json"
-            response = requests.get(url, headers=self._get_headers())
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('products', [])
-            else:
+    def iter_pages(self, path: str, key: str, params: Optional[Dict] = None, page_size: int = 250,
+                   priority: int = ShopifyPriority.CATALOG) -> Iterator[List[Dict]]:
+        """Yield each page of a REST list endpoint, following page_info cursors from the Link header"""
+        url = f"{self.base_url}/{path}"
+        query = {"limit": page_size, **(params or {})}
+        while url:
+            response = self.http.request("GET", url, params=query, priority=priority)
+            if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code,
-                    detail=f"Failed to fetch products: {response.text}"
+                    detail=f"Failed to fetch {key}: {response.text}"
                 )
+            yield response.json().get(key, [])
+            # The next link already carries limit and page_info; other filters are not allowed with page_info
+            url = response.links.get("next", {}).get("url")
+            query = None
+    
+    def get_products(self) -> List[Dict]:
+        """Fetch all products from Shopify (every page)"""
+        try:
+            return [product for page in self.iter_pages("products.json", "products") for product in page]
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching products: {str(e)}")
     
     def get_product_variants(self, product_id: int) -> List[Dict]:
-        """Fetch variants for a specific product"""
+        """Fetch variants for a specific product, from the catalog mirror when it has the product"""
+        from services.shopify_catalog import shopify_catalog
+        variants = shopify_catalog.get_product_variants(product_id)
+        if variants is not None:
+            return variants
         try:
             url = f"{self.base_url}/products/{product_id}/variants.json"
-            response = requests.get(url, headers=self._get_headers())
+            response = self.http.request("GET", url, priority=ShopifyPriority.CATALOG)
             
             if response.status_code == 200:
                 data = response.json()
@@ -51,74 +76,148 @@ class ShopifyService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching variants: {str(e)}")
     
+    @staticmethod
+    def _order_payload(order_data: Dict, financial_status: str, source_identifier: Optional[str] = None) -> Dict:
+        payload = {
+            "order": {
+                "line_items": order_data.get("line_items", []),
+                "customer": order_data.get("customer", {}),
+                "shipping_address": order_data.get("shipping_address", {}),
+                "financial_status": financial_status,
+                "inventory_behaviour": "bypass",
+                "send_receipt": True,
+                "send_fulfillment_receipt": True
+            }
+        }
+        if source_identifier:
+            payload["order"]["source_identifier"] = source_identifier
+            # Tags are searchable server-side, source_identifier is not
+            payload["order"]["tags"] = source_identifier
+        return payload
+    
+    @staticmethod
+    def _created_order(response) -> Dict:
+        if response.status_code == 201:
+            return response.json()
+        print(f"Shopify API Error: {response.status_code} - {response.text}")
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to create order: {response.text}"
+        )
+    
     def create_order(self, order_data: Dict, financial_status: str = "paid") -> Dict:
         """Create a new order in Shopify"""
         try:
             url = f"{self.base_url}/orders.json"
-            
-            # Prepare the order payload
-            payload = {
-                "order": {
-                    "line_items": order_data.get("line_items", []),
-                    "customer": order_data.get("customer", {}),
-                    "shipping_address": order_data.get("shipping_address", {}),
-                    "financial_status": financial_status,
-                    "inventory_behaviour": "bypass",
-                    "send_receipt": True,
-                    "send_fulfillment_receipt": True
-                }
-            }
-            
-            response = requests.post(url, json=payload, headers=self._get_headers())
-            
-            if response.status_code == 201:
-                return response.json()
-            else:
-                print(f"Shopify API Error: {response.status_code} - {response.text}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to create order: {response.text}"
-                )
+            response = self.http.request(
+                "POST", url, json=self._order_payload(order_data, financial_status), priority=ShopifyPriority.ORDER
+            )
+            return self._created_order(response)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error creating order: {str(e)}")
+    
+    async def create_order_async(self, order_data: Dict, financial_status: str = "paid") -> Dict:
+        """Create a new order in Shopify without blocking the event loop"""
+        try:
+            url = f"{self.base_url}/orders.json"
+            response = await self.http.arequest(
+                "POST", url, json=self._order_payload(order_data, financial_status), priority=ShopifyPriority.ORDER
+            )
+            return self._created_order(response)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error creating order: {str(e)}")
     
+    def submit_order(self, order_data: Dict, financial_status: str, idempotency_key: str):
+        """
+        POST an order tagged with ``idempotency_key`` and return (status_code, body) without raising
+        on HTTP errors, so the outbox worker can tell permanent failures from retryable ones.
+        """
+        url = f"{self.base_url}/orders.json"
+        response = self.http.request(
+            "POST", url,
+            json=self._order_payload(order_data, financial_status, source_identifier=idempotency_key),
+            headers={"Idempotency-Key": idempotency_key},
+            priority=ShopifyPriority.ORDER
+        )
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"raw": response.text}
+        return response.status_code, body
+    
+    def find_order_by_source_identifier(self, source_identifier: str) -> Optional[Dict]:
+        """
+        Find an order created by an earlier attempt that may have succeeded without us seeing the
+        response. Orders are tagged with their source_identifier, so this is one filtered GraphQL
+        query instead of paging through every recent order.
+        """
+        query = """
+            query($search: String!) {
+                orders(first: 5, query: $search) { edges { node { legacyResourceId tags } } }
+            }
+        """
+        response = self.http.request(
+            "POST", f"{self.base_url}/graphql.json",
+            json={"query": query, "variables": {"search": f'tag:"{source_identifier}"'}},
+            priority=ShopifyPriority.ORDER
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=f"Failed to search orders: {response.text}")
+        body = response.json()
+        if body.get("errors"):
+            raise HTTPException(status_code=502, detail=f"Failed to search orders: {body['errors']}")
+        for edge in ((body.get("data") or {}).get("orders") or {}).get("edges", []):
+            node = edge.get("node") or {}
+            if source_identifier in (node.get("tags") or []):
+                return {"id": int(node["legacyResourceId"]), "source_identifier": source_identifier}
+        return None
+    
+    def order_data_from_payment(self, payment_data: Dict) -> Dict:
+        # Extract customer info from payment data
+        customer_info = payment_data.get("personal_info", {})
+        address_info = payment_data.get("address_info", {})
+        
+        # Prepare customer data
+        customer = {
+            "first_name": customer_info.get("first_name", ""),
+            "last_name": customer_info.get("last_name", ""),
+            "email": customer_info.get("email", "")
+        }
+        
+        # Prepare shipping address
+        shipping_address = {
+            "first_name": customer_info.get("first_name", ""),
+            "last_name": customer_info.get("last_name", ""),
+            "address1": address_info.get("address_1", ""),
+            "phone": customer_info.get("mobile_number", ""),
+            "city": address_info.get("city", ""),
+            "province": self._get_province_from_state(address_info.get("state_id", "")),
+            "country": "India",
+            "zip": address_info.get("zip_code", "")
+        }
+        
+        # Prepare line items (you'll need to map your products to Shopify variant IDs)
+        line_items = self._prepare_line_items(payment_data.get("products", []))
+        
+        return {
+            "line_items": line_items,
+            "customer": customer,
+            "shipping_address": shipping_address
+        }
+    
     def create_order_from_payment(self, payment_data: Dict) -> Dict:
         """Create order from payment data"""
         try:
-            # Extract customer info from payment data
-            customer_info = payment_data.get("personal_info", {})
-            address_info = payment_data.get("address_info", {})
-            
-            # Prepare customer data
-            customer = {
-                "first_name": customer_info.get("first_name", ""),
-                "last_name": customer_info.get("last_name", ""),
-                "email": customer_info.get("email", "")
-            }
-            
-            # Prepare shipping address
-            shipping_address = {
-                "first_name": customer_info.get("first_name", ""),
-                "last_name": customer_info.get("last_name", ""),
-                "address1": address_info.get("address_1", ""),
-                "phone": customer_info.get("mobile_number", ""),
-                "city": address_info.get("city", ""),
-                "province": self._get_province_from_state(address_info.get("state_id", "")),
-                "country": "India",
-                "zip": address_info.get("zip_code", "")
-            }
-            
-            # Prepare line items (you'll need to map your products to Shopify variant IDs)
-            line_items = self._prepare_line_items(payment_data.get("products", []))
-            
-            order_data = {
-                "line_items": line_items,
-                "customer": customer,
-                "shipping_address": shipping_address
-            }
-            
-            return self.create_order(order_data)
-            
+            return self.create_order(self.order_data_from_payment(payment_data))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error creating order from payment: {str(e)}")
+    
+    async def create_order_from_payment_async(self, payment_data: Dict) -> Dict:
+        """Create order from payment data without blocking the event loop"""
+        try:
+            # Variant lookup may (re)load the catalog mirror from the database; keep it off the event loop
+            order_data = await run_in_threadpool(self.order_data_from_payment, payment_data)
+            return await self.create_order_async(order_data)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error creating order from payment: {str(e)}")
     
@@ -137,9 +236,16 @@ class ShopifyService:
             "Blemish Control": 123456794,             # Replace with actual variant ID
         }
         
+        from services.shopify_catalog import shopify_catalog
+        
         for product in products:
             product_name = product.get("name", "")
-            variant_id = product_variant_mapping.get(product_name)
+            # Catalog mirror first (by SKU, then title), then the static mapping
+            variant_id = (
+                product.get("variant_id")
+                or shopify_catalog.find_variant_id(name=product_name, sku=product.get("sku"))
+                or product_variant_mapping.get(product_name)
+            )
             
             if variant_id:
                 line_items.append({
@@ -166,42 +272,55 @@ class ShopifyService:
         }
         return state_mapping.get(state_id, "Telangana")
     
+    @staticmethod
+    def _fulfillment_result(response) -> Dict:
+        if response.status_code == 201:
+            return response.json()
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to fulfill order: {response.text}"
+        )
+    
     def fulfill_order(self, order_id: int) -> Dict:
         """Mark an order as fulfilled"""
         try:
             url = f"{self.base_url}/orders/{order_id}/fulfillments.json"
-            
-            payload = {
-                "fulfillment": {
-                    "status": "success"
-                }
-            }
-            
-            response = requests.post(url, json=payload, headers=self._get_headers())
-            
-            if response.status_code == 201:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to fulfill order: {response.text}"
-                )
+            response = self.http.request("POST", url, json={"fulfillment": {"status": "success"}})
+            return self._fulfillment_result(response)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error fulfilling order: {str(e)}")
+    
+    async def fulfill_order_async(self, order_id: int) -> Dict:
+        """Mark an order as fulfilled without blocking the event loop"""
+        try:
+            url = f"{self.base_url}/orders/{order_id}/fulfillments.json"
+            response = await self.http.arequest("POST", url, json={"fulfillment": {"status": "success"}})
+            return self._fulfillment_result(response)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fulfilling order: {str(e)}")
     
+    @staticmethod
+    def _order_result(response) -> Dict:
+        if response.status_code == 200:
+            return response.json()
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to get order: {response.text}"
+        )
+    
     def get_order(self, order_id: int) -> Dict:
         """Get order details"""
         try:
-            url = f"{self.base_url}/orders/{order_id}.json"
-            response = requests.get(url, headers=self._get_headers())
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to get order: {response.text}"
-                )
+            response = self.http.request("GET", f"{self.base_url}/orders/{order_id}.json")
+            return self._order_result(response)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error getting order: {str(e)}")
+    
+    async def get_order_async(self, order_id: int) -> Dict:
+        """Get order details without blocking the event loop"""
+        try:
+            response = await self.http.arequest("GET", f"{self.base_url}/orders/{order_id}.json")
+            return self._order_result(response)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error getting order: {str(e)}")
 
@@ -0,0 +1,51 @@
+"""
+Shared fixtures: every test runs against a throwaway SQLite database.
+
+The database URLs are set before anything under BackendMobileAPP is imported,
+since database.connection builds its engine at import time.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+_DB_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["ZENOTI_DATABASE_URL"] = f"sqlite:///{_DB_DIR}/zenoti.db"
+os.environ["DB_ECHO"] = "false"
+os.environ["CLINIC_TIMEZONE"] = "Asia/Kolkata"
+os.environ["DATABASE_REPLICA_URL"] = ""  # set, so a local .env cannot add one
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402,F401  registers every model and the session event listeners
+from database import base  # noqa: E402
+from database.connection import Base, SessionLocal, engine  # noqa: E402
+
+METADATA = (Base.metadata, base.Base.metadata)
+
+
+@event.listens_for(engine, "connect")
+def _attach_public_schema(dbapi_connection, connection_record):
+    # Appointment tables are declared in the Postgres "public" schema
+    dbapi_connection.execute(f"ATTACH DATABASE '{_DB_DIR}/public.db' AS public")
+
+
+engine.dispose()
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables, dropped again afterwards"""
+    for metadata in METADATA:
+        metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        for metadata in reversed(METADATA):
+            metadata.drop_all(bind=engine)
@@ -0,0 +1,67 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from dto.appointment_schema import AppointmentCreateDTO
+from models.appointment import Appointment, AppointmentReminder
+from models.user import User
+from service import appointment_service
+from service.appointment_service import AppointmentService, SlotUnavailableError
+
+DAY = date.today() + timedelta(days=7)
+
+
+@pytest.fixture
+def people(db):
+    patient = User(username="patient", email="patient@example.com", hashed_password="x")
+    doctor = User(username="doctor", email="doctor@example.com", hashed_password="x")
+    db.add_all([patient, doctor])
+    db.commit()
+    return patient, doctor
+
+
+@pytest.fixture
+def invites(monkeypatch):
+    sent = []
+    monkeypatch.setattr(appointment_service, "send_appointment_details_email",
+                        lambda patient_email, doctor_email, appointment: sent.append(appointment.appointment_id))
+    return sent
+
+
+def _book(db, patient, doctor, start=time(10, 0), end=time(10, 15)):
+    data = AppointmentCreateDTO(doctor_id=doctor.id, date=DAY, start_time=start, end_time=end)
+    return AppointmentService.book_appointment(db, patient.id, data)
+
+
+def test_reminder_is_committed_with_the_booking(db, people, invites):
+    patient, doctor = people
+
+    result = _book(db, patient, doctor)
+
+    reminder = db.query(AppointmentReminder).one()
+    assert reminder.appointment.appointment_id == result["appointmentId"]
+    assert reminder.due_at.date() == DAY
+    assert invites == [result["appointmentId"]]
+
+
+def test_reminder_survives_a_failing_invite_email(db, people, monkeypatch):
+    patient, doctor = people
+
+    def smtp_down(*args):
+        raise ConnectionError("SMTP unavailable")
+    monkeypatch.setattr(appointment_service, "send_appointment_details_email", smtp_down)
+
+    _book(db, patient, doctor)
+
+    assert db.query(AppointmentReminder).count() == 1
+
+
+def test_taken_slot_leaves_no_reminder_behind(db, people, invites):
+    patient, doctor = people
+    _book(db, patient, doctor)
+
+    with pytest.raises(SlotUnavailableError):
+        _book(db, patient, doctor)
+
+    assert db.query(Appointment).count() == 1
+    assert db.query(AppointmentReminder).count() == 1
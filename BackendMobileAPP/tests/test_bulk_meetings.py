@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from dto.meeting_schema import BulkCreateMeetingRequest
+from models.meeting import Meeting
+from repository.meeting_repository import MeetingRepository
+from service.consultation_service import ConsultationService
+
+
+class RecordingMailer:
+    configured = True
+
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, to_email, subject, body):
+        self.sent.append(to_email)
+        return True
+
+
+ROSTER = [
+    {"customer_name": f"Customer {n}", "doctor_name": "Dr X", "slot_time": f"2030-01-01 {n:02d}:00 AM",
+     "customer_email": f"customer{n}@example.com", "doctor_email": "doctor@example.com"}
+    for n in range(1, 5)
+]
+
+
+@pytest.fixture
+def mailer():
+    return RecordingMailer()
+
+
+@pytest.fixture
+def service(db, mailer):
+    return ConsultationService(MeetingRepository(db), mailer=mailer)
+
+
+def _submit(service, meetings, **options):
+    return asyncio.run(service.create_meetings_bulk(BulkCreateMeetingRequest(meetings=meetings, **options)))
+
+
+def test_roster_is_created_and_invited(service, mailer, db):
+    response = _submit(service, ROSTER)
+
+    assert response.created == 4
+    assert len(mailer.sent) == 8
+    assert db.query(Meeting).count() == 4
+
+
+def test_repeated_item_in_one_roster_is_a_duplicate(service, db):
+    repeat = dict(ROSTER[0], customer_name="  customer 1 ", slot_time="2030-01-01 01:00")
+
+    response = _submit(service, ROSTER + [repeat])
+
+    assert response.results[-1].status == "duplicate"
+    assert db.query(Meeting).count() == 4
+
+
+def test_resubmitted_roster_books_and_emails_nothing_twice(service, mailer, db):
+    _submit(service, ROSTER)
+    sent = len(mailer.sent)
+
+    retry = _submit(service, ROSTER)
+
+    assert retry.created == 0
+    assert [result.status for result in retry.results] == ["duplicate"] * 4
+    assert len(mailer.sent) == sent
+    assert db.query(Meeting).count() == 4
+
+
+def test_cancelled_meeting_does_not_block_rebooking(service, db):
+    first = _submit(service, ROSTER[:1])
+    asyncio.run(service.repository.update_meeting_status(first.results[0].meeting.meeting_id, "cancelled"))
+
+    again = _submit(service, ROSTER[:1])
+
+    assert again.created == 1
+
+
+def test_colliding_meeting_id_is_renewed(service, db, monkeypatch):
+    taken = _submit(service, ROSTER[:1]).results[0].meeting.meeting_id
+    generate = ConsultationService.generate_meeting_id
+    ids = iter([taken])
+    monkeypatch.setattr(ConsultationService, "generate_meeting_id",
+                        staticmethod(lambda customer, doctor: next(ids, None) or generate(customer, doctor)))
+
+    response = _submit(service, ROSTER[1:3])
+
+    assert [result.status for result in response.results] == ["created", "created"]
+    assert taken not in {result.meeting.meeting_id for result in response.results}
+    assert db.query(Meeting).count() == 3
+
+
+def test_unreadable_slot_time_is_invalid(service, db):
+    response = _submit(service, [dict(ROSTER[0], slot_time="tomorrow morning")] + ROSTER[1:2])
+
+    assert [result.status for result in response.results] == ["invalid", "created"]
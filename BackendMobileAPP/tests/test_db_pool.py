@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import main
+from database.engine import InstrumentedQueuePool, create_db_engine, get_pool_stats
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # SQLite gets no pool class by default; force the instrumented QueuePool used for Postgres
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path}/pool.db", "test_pool",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_and_utilization_are_counted(engine):
+    first = engine.connect()
+    stats = get_pool_stats()["test_pool"]
+    assert stats["checkouts"] == 1
+    assert (stats["checked_out"], stats["utilization"]) == (1, 1.0)
+
+    first.close()
+    with engine.connect():
+        pass
+
+    stats = get_pool_stats()["test_pool"]
+    assert stats["checkouts"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["max_wait_ms"] >= stats["avg_wait_ms"] >= 0
+
+
+def test_checkout_timeout_is_counted(engine):
+    held = engine.connect()
+    try:
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    finally:
+        held.close()
+
+    stats = get_pool_stats()["test_pool"]
+    assert stats["checkout_timeouts"] == 1
+    assert stats["checkouts"] == 1
+
+
+def test_pool_stats_are_served_at_health_endpoint(engine):
+    with engine.connect():
+        pass
+
+    response = TestClient(main.app).get("/health/db-pool")
+
+    assert response.status_code == 200
+    assert response.json()["pools"]["test_pool"]["checkouts"] == 1
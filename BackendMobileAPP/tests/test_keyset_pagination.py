@@ -0,0 +1,63 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from database.pagination import InvalidCursorError, iter_keyset, keyset_page
+from models.order_models import Order, OrderStatus
+
+
+def _walk(fetch):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch(cursor)
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_order_pages_cover_every_row_once_newest_first(db):
+    same_time = datetime(2026, 3, 1, 12, 0)
+    for number in range(7):
+        # Ties on created_at are broken by id
+        created_at = same_time if number < 4 else datetime(2026, 3, number, 8, 0)
+        db.add(Order(order_id=f"ORD-{number}", customer_id="CUST-1", order_status=OrderStatus.PENDING,
+                     total_amount=Decimal("10.00"), created_at=created_at))
+    db.commit()
+
+    rows, pages = _walk(lambda cursor: keyset_page(db.query(Order), Order.created_at, Order.id, cursor, limit=3))
+
+    assert pages == 3
+    assert len({row.id for row in rows}) == 7
+    keys = [(row.created_at, row.id) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_last_page_has_no_cursor(db):
+    db.add(Order(order_id="ORD-1", customer_id="CUST-1", total_amount=Decimal("10.00")))
+    db.commit()
+
+    rows, cursor = keyset_page(db.query(Order), Order.created_at, Order.id, None, limit=1)
+
+    assert len(rows) == 1 and cursor is None
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "W10", "WyJ4Il0"])
+def test_invalid_cursor_is_rejected(db, cursor):
+    with pytest.raises(InvalidCursorError):
+        keyset_page(db.query(Order), Order.created_at, Order.id, cursor)
+
+
+def test_export_holds_no_transaction_between_batches(db):
+    for number in range(5):
+        db.add(Order(order_id=f"ORD-{number}", customer_id="CUST-1", total_amount=Decimal("10.00")))
+    db.commit()
+
+    exported = []
+    for order in iter_keyset(db.query(Order), Order.created_at, Order.id, batch_size=2):
+        # The client reads at its own pace; meanwhile the connection is back in the pool
+        assert not db.in_transaction()
+        exported.append(order.order_id)
+
+    assert sorted(exported) == [f"ORD-{number}" for number in range(5)]
@@ -0,0 +1,58 @@
+import asyncio
+from datetime import date
+
+from database.pagination import keyset_page_by
+from models.meeting import Meeting
+from repository.meeting_repository import PAGE_ORDER, MeetingRepository, parse_slot_time
+
+
+def _walk(fetch):
+    rows, cursor = [], None
+    while True:
+        page, cursor = fetch(cursor)
+        rows.extend(page)
+        if cursor is None:
+            return rows
+
+
+SLOTS = ["2030-01-01 01:00 PM", "2030-01-01 10:00 AM", "2030-01-01 09:30 am", "2030-01-02 12:00 AM",
+         "2030-01-01 14:00", "2030-01-01T23:00:00+00:00"]
+
+
+def _meetings(db):
+    repository = MeetingRepository(db)
+    for number, slot_time in enumerate(SLOTS):
+        repository._create({
+            "meeting_id": f"m-{number}", "meeting_link": f"https://meet.example/m-{number}",
+            "customer_name": f"Customer {number}", "doctor_name": "Dr X", "slot_time": slot_time, "status": "active"
+        })
+    return repository
+
+
+def test_meeting_pages_follow_slot_start_not_slot_text(db):
+    repository = _meetings(db)
+
+    rows = _walk(lambda cursor: asyncio.run(repository.get_meetings_by_doctor("Dr X", cursor=cursor, limit=2)))
+
+    assert [row.slot_time for row in rows] == sorted(SLOTS, key=parse_slot_time)
+    assert [row.slot_time for row in rows][:3] == ["2030-01-01 09:30 am", "2030-01-01 10:00 AM", "2030-01-01 01:00 PM"]
+
+
+def test_meeting_cursor_round_trips_datetime_keys(db):
+    _meetings(db)
+
+    first, cursor = keyset_page_by(db.query(Meeting), PAGE_ORDER, None, 3)
+    second, _ = keyset_page_by(db.query(Meeting), PAGE_ORDER, cursor, 3)
+
+    assert len(first) == len(second) == 3
+    assert not {row.id for row in first} & {row.id for row in second}
+    assert first[-1].slot_starts_at <= second[0].slot_starts_at
+
+
+def test_meeting_date_filter_uses_slot_start(db):
+    repository = _meetings(db)
+
+    rows, _ = asyncio.run(repository.get_all_meetings(date_from=date(2030, 1, 2), date_to=date(2030, 1, 2)))
+
+    # 23:00 UTC on the 1st is the 2nd in clinic time
+    assert {row.slot_time for row in rows} == {"2030-01-02 12:00 AM", "2030-01-01T23:00:00+00:00"}
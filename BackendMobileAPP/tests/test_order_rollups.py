@@ -0,0 +1,86 @@
+from datetime import datetime
+from decimal import Decimal
+
+from models.order_models import Order, OrderDailyRollup, OrderStatus
+from services.order_rollups import rebuild_order_rollups
+
+DAY = datetime(2026, 3, 1, 9, 30)
+
+
+def _buckets(db):
+    db.expire_all()
+    return {
+        row.order_status: (row.order_count, row.revenue)
+        for row in db.query(OrderDailyRollup).filter(OrderDailyRollup.day == DAY.date())
+        if row.order_count or row.revenue
+    }
+
+
+def _order(db, order_id="ORD-1", amount="100.00", status=OrderStatus.PENDING):
+    order = Order(order_id=order_id, customer_id="CUST-1", order_status=status,
+                  total_amount=Decimal(amount), created_at=DAY)
+    db.add(order)
+    db.commit()
+    return order
+
+
+def test_insert_counts_into_day_and_status_bucket(db):
+    _order(db, "ORD-1", "100.00")
+    _order(db, "ORD-2", "50.00")
+
+    assert _buckets(db) == {"pending": (2, Decimal("150.00"))}
+
+
+def test_status_change_moves_order_between_buckets(db):
+    order = _order(db)
+
+    order.order_status = OrderStatus.CONFIRMED
+    db.commit()
+
+    assert _buckets(db) == {"confirmed": (1, Decimal("100.00"))}
+
+
+def test_change_on_expired_instance_still_decrements_old_bucket(db):
+    order = _order(db)
+    db.expire(order)  # old values are not in memory when the change is made
+
+    order.order_status = OrderStatus.CANCELLED
+    order.total_amount = Decimal("80.00")
+    db.commit()
+
+    assert _buckets(db) == {"cancelled": (1, Decimal("80.00"))}
+
+
+def test_change_on_order_loaded_in_another_session(db):
+    order_id = _order(db).id
+    other = type(db)(bind=db.get_bind())
+    try:
+        order = other.get(Order, order_id)
+        other.expire(order, ["total_amount"])
+        order.total_amount = Decimal("120.00")
+        other.commit()
+    finally:
+        other.close()
+
+    assert _buckets(db) == {"pending": (1, Decimal("120.00"))}
+
+
+def test_delete_removes_order_from_bucket(db):
+    order = _order(db)
+
+    db.delete(order)
+    db.commit()
+
+    assert _buckets(db) == {}
+
+
+def test_rebuild_matches_incremental_rollups(db):
+    _order(db, "ORD-1", "100.00")
+    order = _order(db, "ORD-2", "40.00")
+    order.order_status = OrderStatus.SHIPPED
+    db.commit()
+    incremental = _buckets(db)
+
+    rebuild_order_rollups(db)
+
+    assert _buckets(db) == incremental
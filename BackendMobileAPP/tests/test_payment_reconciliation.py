@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from database.connection import SessionLocal
+from models.order_models import (
+    Order, OrderStatus, PaymentMethod, PaymentReconciliationMismatch, PaymentReconciliationRun, PaymentStatus,
+    PaymentTransaction, ShopifyOrderOutbox
+)
+from services.payment_reconciliation import (
+    AMOUNT_MISMATCH, COMPLETED, FAILED, RUNNING, STATUS_MISMATCH, PaymentReconciler, ReconciliationInProgressError,
+    StubGatewayClient
+)
+
+
+def _payment(db, number: int, amount: str = "100.00", status: PaymentStatus = PaymentStatus.PENDING):
+    order = Order(order_id=f"ORD-{number}", customer_id="CUST-1", order_status=OrderStatus.PENDING,
+                  payment_status=status, total_amount=Decimal(amount), billing_address={}, shipping_address={})
+    db.add(order)
+    db.flush()
+    db.add(PaymentTransaction(
+        transaction_id=f"TXN-{number}", order_id=order.id, payment_method=PaymentMethod.UPI,
+        payment_gateway="razorpay", amount=Decimal(amount), status=status, gateway_transaction_id=f"pay_{number}",
+        created_at=datetime.utcnow() - timedelta(minutes=number)
+    ))
+    db.commit()
+    return order
+
+
+def _reconcile(db, payments, chunk_size: int = 2):
+    reconciler = PaymentReconciler(StubGatewayClient(payments), session_factory=SessionLocal, chunk_size=chunk_size)
+    run = reconciler.start_run(db)
+    asyncio.run(reconciler.run(run.id))
+    db.expire_all()
+    return db.get(PaymentReconciliationRun, run.id)
+
+
+def _transaction(db, number: int) -> PaymentTransaction:
+    return db.query(PaymentTransaction).filter(PaymentTransaction.transaction_id == f"TXN-{number}").one()
+
+
+def test_captured_payment_is_marked_paid_and_queued_for_shopify(db):
+    order = _payment(db, 1)
+
+    run = _reconcile(db, {"pay_1": {"status": "captured", "amount": 10000}})
+
+    assert run.status == COMPLETED
+    assert (run.scanned, run.fixed) == (1, 2)  # the transaction and its order
+    assert _transaction(db, 1).status == PaymentStatus.PAID
+    assert db.get(Order, order.id).payment_status == PaymentStatus.PAID
+    assert db.query(ShopifyOrderOutbox).filter(ShopifyOrderOutbox.order_id == order.id).count() == 1
+
+
+def test_captured_payment_for_wrong_amount_is_reported_not_fixed(db):
+    order = _payment(db, 1, amount="100.00")
+
+    run = _reconcile(db, {"pay_1": {"status": "captured", "amount": 5000}})
+
+    kinds = {m.kind for m in db.query(PaymentReconciliationMismatch).filter_by(run_id=run.id)}
+    assert {STATUS_MISMATCH, AMOUNT_MISMATCH} <= kinds
+    assert run.fixed == 0
+    assert _transaction(db, 1).status == PaymentStatus.PENDING
+    assert db.query(ShopifyOrderOutbox).filter(ShopifyOrderOutbox.order_id == order.id).count() == 0
+
+
+def test_status_never_moves_backwards(db):
+    _payment(db, 1, status=PaymentStatus.PAID)
+
+    run = _reconcile(db, {"pay_1": {"status": "failed", "amount": 10000}})
+
+    assert run.mismatches == 1 and run.fixed == 0
+    assert _transaction(db, 1).status == PaymentStatus.PAID
+
+
+def test_every_chunk_is_scanned(db):
+    for number in range(1, 6):
+        _payment(db, number)
+
+    run = _reconcile(db, {f"pay_{n}": {"status": "captured", "amount": 10000} for n in range(1, 6)}, chunk_size=2)
+
+    assert run.scanned == 5
+    assert db.query(PaymentTransaction).filter(PaymentTransaction.status == PaymentStatus.PAID).count() == 5
+
+
+def test_second_run_is_refused_while_one_is_running(db):
+    reconciler = PaymentReconciler(StubGatewayClient(), session_factory=SessionLocal)
+    first = reconciler.start_run(db)
+
+    with pytest.raises(ReconciliationInProgressError):
+        reconciler.start_run(db)
+
+    assert db.get(PaymentReconciliationRun, first.id).status == RUNNING
+
+
+def test_abandoned_run_is_failed_and_no_longer_blocks(db):
+    reconciler = PaymentReconciler(StubGatewayClient(), session_factory=SessionLocal)
+    stale = reconciler.start_run(db)
+    stale.started_at = datetime.utcnow() - timedelta(days=2)
+    db.commit()
+
+    fresh = reconciler.start_run(db)
+
+    assert fresh.status == RUNNING
+    assert db.get(PaymentReconciliationRun, stale.id).status == FAILED
@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from controller import payment_controller
+from database.connection import SessionLocal, get_db
+from models.order_models import Order, PaymentMethod, PaymentStatus, PaymentTransaction, RazorpayWebhookEvent
+from services.advanced_order_service import AdvancedOrderService, order_details_cache
+from services.razorpay_webhooks import RazorpayWebhookProcessor
+
+SECRET = "test-webhook-secret"
+
+
+def _razorpay_signature(body: bytes, secret: str = SECRET) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(payment_controller, "RAZORPAY_WEBHOOK_SECRET", SECRET)
+    app = FastAPI()
+    app.include_router(payment_controller.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def _razorpay_body() -> bytes:
+    return json.dumps({
+        "event": "payment.captured",
+        "payload": {"payment": {"entity": {"id": f"pay_{uuid.uuid4().hex[:12]}", "status": "captured"}}}
+    }).encode()
+
+
+def test_razorpay_webhook_with_bad_signature_is_rejected_and_not_stored(client, db):
+    body = _razorpay_body()
+
+    response = client.post("/webhook", content=body, headers={
+        "X-Razorpay-Signature": _razorpay_signature(body, "wrong-secret"),
+        "X-Razorpay-Event-Id": f"evt_{uuid.uuid4().hex}"
+    })
+
+    assert response.status_code == 403
+    assert db.query(RazorpayWebhookEvent).count() == 0
+
+
+def test_razorpay_webhook_is_stored_once(client, db):
+    body = _razorpay_body()
+    headers = {"X-Razorpay-Signature": _razorpay_signature(body), "X-Razorpay-Event-Id": f"evt_{uuid.uuid4().hex}"}
+
+    first = client.post("/webhook", content=body, headers=headers)
+    second = client.post("/webhook", content=body, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert (first.json()["duplicate"], second.json()["duplicate"]) == (False, True)
+    assert db.query(RazorpayWebhookEvent).count() == 1
+
+
+def test_processed_event_drops_cached_order_details(db):
+    order = Order(order_id="ORD-1", customer_id="CUST-1", payment_status=PaymentStatus.PENDING,
+                  total_amount=Decimal("10.00"), subtotal_amount=Decimal("10.00"), tax_amount=0,
+                  shipping_amount=0, discount_amount=0)
+    db.add(order)
+    db.flush()
+    db.add(PaymentTransaction(transaction_id="TXN-1", order_id=order.id, gateway_transaction_id="pay_1",
+                              payment_method=PaymentMethod.UPI, amount=Decimal("10.00"), status=PaymentStatus.PENDING))
+    event = RazorpayWebhookEvent(event_id="evt_1", event_type="payment.failed", payment_id="pay_1", payload={})
+    db.add(event)
+    db.commit()
+    assert AdvancedOrderService(db).get_order_details("ORD-1")["order"]["payment_status"] == "pending"
+
+    RazorpayWebhookProcessor(session_factory=SessionLocal)._process_in_order([event.id])
+
+    db.expire_all()
+    assert AdvancedOrderService(db).get_order_details("ORD-1")["order"]["payment_status"] == "failed"
+    order_details_cache.clear()
@@ -0,0 +1,121 @@
+"""
+Leader election for the reminder worker, against a stand-in for Postgres session
+advisory locks: the lock belongs to a connection and is freed when it closes.
+"""
+
+from types import SimpleNamespace
+
+from services.appointment_reminders import REMINDER_LEADER_LOCK_KEY, AppointmentReminderWorker
+
+
+class FakeLockServer:
+    def __init__(self):
+        self.holder = None
+        self.connections = []
+
+
+class FakeConnection:
+    def __init__(self, server: FakeLockServer):
+        self.server = server
+        self.options = {}
+        self.alive = True
+        self.closed = False
+        self.heartbeats = 0
+        self.commits = 0
+
+    def execution_options(self, **options):
+        self.options.update(options)
+        return self
+
+    def execute(self, statement):
+        compiled = statement.compile()
+        assert "pg_try_advisory_lock" in str(compiled)
+        assert REMINDER_LEADER_LOCK_KEY in compiled.params.values()
+        if self.server.holder is None:
+            self.server.holder = self
+        return SimpleNamespace(scalar=lambda: self.server.holder is self)
+
+    def exec_driver_sql(self, sql):
+        if not self.alive:
+            raise ConnectionError("server closed the connection unexpectedly")
+        self.heartbeats += 1
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.closed = True
+        if self.server.holder is self:
+            self.server.holder = None
+
+
+class FakePostgresBind:
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, server: FakeLockServer):
+        self.server = server
+
+    def connect(self):
+        connection = FakeConnection(self.server)
+        self.server.connections.append(connection)
+        return connection
+
+
+def _workers(count: int):
+    server = FakeLockServer()
+    return server, [AppointmentReminderWorker(bind=FakePostgresBind(server)) for _ in range(count)]
+
+
+def test_only_one_process_leads():
+    server, (first, second) = _workers(2)
+
+    assert first._try_become_leader() is True
+    assert second._try_become_leader() is False
+    assert (first.is_leader, second.is_leader) == (True, False)
+    # The losing attempt does not keep a connection open
+    assert server.connections[1].closed
+
+
+def test_leader_keeps_lock_on_autocommit_connection_and_ends_each_heartbeat():
+    server, (leader,) = _workers(1)
+
+    leader._try_become_leader()
+    leader._try_become_leader()
+    leader._try_become_leader()
+
+    connection = server.holder
+    assert len(server.connections) == 1
+    assert connection.options.get("isolation_level") == "AUTOCOMMIT"
+    assert connection.heartbeats == 2
+    # No heartbeat leaves the connection idle in transaction
+    assert connection.commits == 3
+
+
+def test_another_process_takes_over_when_the_leader_connection_dies():
+    server, (first, second) = _workers(2)
+    first._try_become_leader()
+    assert second._try_become_leader() is False
+
+    dead = server.holder
+    dead.alive = False
+    dead.close()  # the server drops the session and its lock with it
+
+    assert second._try_become_leader() is True
+    assert first._try_become_leader() is False
+    assert not first.is_leader and second.is_leader
+
+
+def test_released_leadership_is_free_for_others():
+    _, (first, second) = _workers(2)
+    first._try_become_leader()
+
+    first._release_leadership()
+
+    assert second._try_become_leader() is True
+
+
+def test_without_advisory_locks_every_process_leads():
+    worker = AppointmentReminderWorker(bind=SimpleNamespace(dialect=SimpleNamespace(name="sqlite")))
+
+    assert worker._try_become_leader() is True
+    assert worker.is_leader
@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import hmac
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import shopify_controller
+from database.connection import SessionLocal
+from models.order_models import ShopifyCatalogProduct
+from services import shopify_catalog as catalog_module
+from services.shopify_catalog import SHOPIFY_CATALOG_SYNC_LOCK_KEY, ShopifyCatalog
+
+SECRET = "test-webhook-secret"
+PRODUCT = {"id": 4242, "title": "Test serum", "handle": "test-serum", "variants": []}
+
+
+def _shopify_hmac(body: bytes, secret: str = SECRET) -> str:
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(shopify_controller, "SHOPIFY_WEBHOOK_SECRET", SECRET)
+    app = FastAPI()
+    app.include_router(shopify_controller.router)
+    return TestClient(app)
+
+
+def test_product_webhook_without_secret_is_refused(client, monkeypatch):
+    monkeypatch.setattr(shopify_controller, "SHOPIFY_WEBHOOK_SECRET", "")
+    body = json.dumps(PRODUCT).encode()
+
+    response = client.post("/shopify/webhooks/products", content=body, headers={
+        "X-Shopify-Topic": "products/update", "X-Shopify-Hmac-Sha256": _shopify_hmac(body, "")
+    })
+
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize("signature", ["", "bm90LWEtc2lnbmF0dXJl", _shopify_hmac(b"{}")])
+def test_product_webhook_with_bad_signature_is_rejected(client, signature):
+    response = client.post("/shopify/webhooks/products", content=json.dumps(PRODUCT).encode(), headers={
+        "X-Shopify-Topic": "products/update", "X-Shopify-Hmac-Sha256": signature
+    })
+
+    assert response.status_code == 401
+
+
+def test_product_webhook_with_valid_signature_is_applied(client, monkeypatch):
+    applied = []
+    monkeypatch.setattr(shopify_controller.shopify_catalog, "apply_webhook",
+                        lambda topic, payload: applied.append((topic, payload["id"])) or {"topic": topic})
+    body = json.dumps(PRODUCT).encode()
+
+    response = client.post("/shopify/webhooks/products", content=body, headers={
+        "X-Shopify-Topic": "products/update", "X-Shopify-Hmac-Sha256": _shopify_hmac(body)
+    })
+
+    assert response.status_code == 200
+    assert applied == [("products/update", 4242)]
+
+
+def _product(updated_at: str, title: str) -> dict:
+    return dict(PRODUCT, title=title, updated_at=updated_at)
+
+
+@pytest.fixture
+def catalog():
+    return ShopifyCatalog(session_factory=SessionLocal)
+
+
+def _stored_title(db) -> str:
+    db.expire_all()
+    return db.get(ShopifyCatalogProduct, PRODUCT["id"]).title
+
+
+def test_late_webhook_does_not_overwrite_newer_product(db, catalog):
+    catalog.apply_webhook("products/update", _product("2026-05-02T10:00:00+05:30", "Renamed serum"))
+
+    catalog.apply_webhook("products/update", _product("2026-05-02T09:00:00+05:30", "Test serum"))
+
+    assert _stored_title(db) == "Renamed serum"
+
+
+def test_sync_page_older_than_webhook_is_ignored_but_product_kept(db, catalog, monkeypatch):
+    catalog.apply_webhook("products/update", _product("2026-05-02T10:00:00Z", "Renamed serum"))
+    monkeypatch.setattr(catalog_module.shopify_service, "iter_pages",
+                        lambda path, key, params: iter([[_product("2026-05-01T10:00:00Z", "Test serum")]]))
+
+    result = catalog.full_sync()
+
+    assert result["removed"] == 0
+    assert _stored_title(db) == "Renamed serum"
+
+
+class FakeLockConnection:
+    def __init__(self, held: set):
+        self.held = held
+        self.options = {}
+        self.closed = False
+
+    def execution_options(self, **options):
+        self.options.update(options)
+        return self
+
+    def execute(self, statement):
+        compiled = statement.compile()
+        assert SHOPIFY_CATALOG_SYNC_LOCK_KEY in compiled.params.values()
+        if "pg_try_advisory_lock" in str(compiled):
+            acquired = not self.held
+            self.held.add(SHOPIFY_CATALOG_SYNC_LOCK_KEY)
+            return SimpleNamespace(scalar=lambda: acquired)
+        self.held.discard(SHOPIFY_CATALOG_SYNC_LOCK_KEY)
+        return SimpleNamespace(scalar=lambda: True)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePostgresBind:
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, held: set):
+        self.held = held
+        self.connections = []
+
+    def connect(self):
+        connection = FakeLockConnection(self.held)
+        self.connections.append(connection)
+        return connection
+
+
+def test_sync_is_skipped_while_another_process_holds_the_lock(db, monkeypatch):
+    fetched = []
+    monkeypatch.setattr(catalog_module.shopify_service, "iter_pages",
+                        lambda path, key, params: fetched.append(params) or iter([]))
+    held = {SHOPIFY_CATALOG_SYNC_LOCK_KEY}
+    bind = FakePostgresBind(held)
+
+    result = ShopifyCatalog(session_factory=SessionLocal, bind=bind).full_sync()
+
+    assert result["skipped"] is True
+    assert fetched == []
+    assert bind.connections[0].closed
+
+
+def test_sync_releases_the_lock_when_done(db, monkeypatch):
+    monkeypatch.setattr(catalog_module.shopify_service, "iter_pages", lambda path, key, params: iter([]))
+    bind = FakePostgresBind(set())
+
+    ShopifyCatalog(session_factory=SessionLocal, bind=bind).full_sync()
+
+    assert bind.held == set()
+    assert bind.connections[0].options.get("isolation_level") == "AUTOCOMMIT"
+    assert bind.connections[0].closed
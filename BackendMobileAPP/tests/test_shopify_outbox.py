@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from database.connection import SessionLocal
+from models.order_models import Order, OrderStatus, ShopifyOrderOutbox
+from services import shopify_outbox
+from services.advanced_order_service import AdvancedOrderService, order_details_cache
+from services.shopify_outbox import DEAD, DELIVERED, PENDING, PROCESSING, ShopifyOutboxWorker, enqueue_shopify_order
+
+
+class FakeShopify:
+    def __init__(self):
+        self.submitted = []
+        self.lookups = []
+        self.existing = {}
+        self.response = None
+        self.during_submit = None
+
+    def submit_order(self, order_data, financial_status, idempotency_key):
+        self.submitted.append(idempotency_key)
+        if self.during_submit:
+            self.during_submit(idempotency_key)
+        if self.response:
+            return self.response
+        return 201, {"order": {"id": 9000 + len(self.submitted)}}
+
+    def find_order_by_source_identifier(self, idempotency_key):
+        self.lookups.append(idempotency_key)
+        return self.existing.get(idempotency_key)
+
+
+@pytest.fixture
+def shopify(monkeypatch):
+    fake = FakeShopify()
+    monkeypatch.setattr(shopify_outbox, "shopify_service", fake)
+    return fake
+
+
+@pytest.fixture
+def worker():
+    return ShopifyOutboxWorker(session_factory=SessionLocal, batch_size=10)
+
+
+def _queue(db, number: int) -> ShopifyOrderOutbox:
+    order = Order(order_id=f"ORD-{number}", customer_id="CUST-1", order_status=OrderStatus.PENDING,
+                  total_amount=Decimal("10.00"), subtotal_amount=Decimal("10.00"), tax_amount=0,
+                  shipping_amount=0, discount_amount=0)
+    db.add(order)
+    db.flush()
+    row = enqueue_shopify_order(db, order, {"line_items": []})
+    db.commit()
+    return row
+
+
+def _reload(db, row) -> ShopifyOrderOutbox:
+    db.expire_all()
+    return db.get(ShopifyOrderOutbox, row.id)
+
+
+def test_queued_order_is_delivered(db, worker, shopify):
+    row = _queue(db, 1)
+
+    assert worker.process_batch() == 1
+
+    row = _reload(db, row)
+    assert (row.status, row.shopify_order_id, row.locked_until) == (DELIVERED, "9001", None)
+    assert db.get(Order, row.order_id).shopify_order_id == "9001"
+    assert shopify.lookups == []
+
+
+def test_delivery_drops_cached_order_details(db, worker, shopify):
+    _queue(db, 1)
+    assert AdvancedOrderService(db).get_order_details("ORD-1")["order"]["shopify_order_id"] is None
+
+    worker.process_batch()
+
+    db.expire_all()
+    assert AdvancedOrderService(db).get_order_details("ORD-1")["order"]["shopify_order_id"] == "9001"
+    order_details_cache.clear()
+
+
+def test_rows_are_leased_one_at_a_time(db, worker, shopify):
+    rows = [_queue(db, n) for n in range(3)]
+    seen = []
+
+    def statuses(_key):
+        with SessionLocal() as other:
+            seen.append(sorted(r.status for r in other.query(ShopifyOrderOutbox)))
+    shopify.during_submit = statuses
+
+    assert worker.process_batch() == 3
+
+    # While one row is being delivered, the rows behind it are not leased yet
+    assert seen[0] == [PENDING, PENDING, PROCESSING]
+    assert {_reload(db, row).status for row in rows} == {DELIVERED}
+
+
+def test_expired_lease_is_checked_against_shopify_before_resubmitting(db, worker, shopify):
+    row = _queue(db, 1)
+    row.status = PROCESSING
+    row.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    shopify.existing[row.idempotency_key] = {"id": 777}
+
+    worker.process_batch()
+
+    assert shopify.lookups == [row.idempotency_key]
+    assert shopify.submitted == []
+    assert _reload(db, row).shopify_order_id == "777"
+
+
+def test_outcome_is_not_written_after_the_lease_was_lost(db, worker, shopify):
+    row = _queue(db, 1)
+    new_lease = datetime.utcnow() + timedelta(minutes=5)
+
+    def reclaimed_by_another_worker(_key):
+        with SessionLocal() as other:
+            other.query(ShopifyOrderOutbox).update({"locked_until": new_lease})
+            other.commit()
+    shopify.during_submit = reclaimed_by_another_worker
+
+    worker.process_batch()
+
+    row = _reload(db, row)
+    assert (row.status, row.locked_until, row.shopify_order_id) == (PROCESSING, new_lease, None)
+    assert db.get(Order, row.order_id).shopify_order_id is None
+
+
+def test_failed_delivery_is_retried_later(db, worker, shopify):
+    row = _queue(db, 1)
+    shopify.response = (502, {"errors": "bad gateway"})
+
+    worker.process_batch()
+
+    row = _reload(db, row)
+    assert (row.status, row.attempts, row.locked_until) == (PENDING, 1, None)
+    assert row.next_attempt_at > datetime.utcnow()
+
+
+def test_permanent_failure_is_dead_lettered(db, worker, shopify):
+    row = _queue(db, 1)
+    shopify.response = (422, {"errors": "invalid line items"})
+
+    worker.process_batch()
+
+    assert _reload(db, row).status == DEAD
@@ -0,0 +1,34 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from services.calendar_feeds import CalendarFeed
+
+
+def not_modified(request: Request, feed: CalendarFeed) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or feed.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return feed.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def calendar_response(request: Request, feed: CalendarFeed, extra_headers: Optional[Dict[str, str]] = None) -> Response:
+    """Feed body with validators, or an empty 304 when the client's copy is current"""
+    headers = {
+        "ETag": feed.etag,
+        "Last-Modified": format_datetime(feed.last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache"
+    }
+    if not_modified(request, feed):
+        return Response(status_code=304, headers=headers)
+    headers.update(extra_headers or {})
+    return Response(content=feed.body, media_type="text/calendar; charset=utf-8", headers=headers)
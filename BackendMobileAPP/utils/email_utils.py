@@ -51,17 +51,18 @@ def send_password_reset_email(to_email: str, reset_link: str):
     if email_response.status_code != 202:
         raise HTTPException(status_code=500, detail=f"Failed to send email: {email_response.text}")
 
-def send_email_sendgrid(to_emails, subject, body, attachment_path=None):
+def send_email_sendgrid(to_emails, subject, body, attachment_path=None, attachment_bytes=None):
     message = Mail(
         from_email='akash.manda@olivaclinic.com',
         to_emails=to_emails,  # Can be a string or a list of emails
         subject=subject,
         plain_text_content=body
     )
-    if attachment_path:
+    if attachment_path and attachment_bytes is None:
         with open(attachment_path, "rb") as f:
-            data = f.read()
-            encoded = base64.b64encode(data).decode()
+            attachment_bytes = f.read()
+    if attachment_bytes:
+        encoded = base64.b64encode(attachment_bytes).decode()
         attachedFile = Attachment(
             FileContent(encoded),
             FileName("appointment.ics"),
@@ -90,10 +91,8 @@ def send_appointment_details_email(patient_email, doctor_email, appointment):
         f"\U0001F517 Video Call: {appointment.video_call_link}\n\n"
         f"Regards,\nClinic Team"
     )
-    from utils.ics_utils import generate_ics_file
-    ics_path = generate_ics_file(appointment)
-    send_email_sendgrid([patient_email, doctor_email], subject, body, attachment_path=ics_path)
-    os.remove(ics_path)
+    from utils.ics_utils import generate_ics_bytes
+    send_email_sendgrid([patient_email, doctor_email], subject, body, attachment_bytes=generate_ics_bytes(appointment))
 
 def send_reminder_email(patient_email, doctor_email, appointment):
     subject = "Appointment Reminder"
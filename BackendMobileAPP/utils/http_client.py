@@ -0,0 +1,197 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning(f"Invalid {name}, falling back to {default}")
+        return default
+
+
+HTTP_CONNECT_TIMEOUT = _float_env("HTTP_CONNECT_TIMEOUT", 5.0)
+HTTP_READ_TIMEOUT = _float_env("HTTP_READ_TIMEOUT", 30.0)
+HTTP_MAX_CONNECTIONS = int(_float_env("HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE = int(_float_env("HTTP_MAX_KEEPALIVE", 10))
+HTTP_MAX_RETRIES = int(_float_env("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE = _float_env("HTTP_BACKOFF_BASE", 0.5)
+HTTP_BACKOFF_MAX = _float_env("HTTP_BACKOFF_MAX", 8.0)
+
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class PooledHTTPClient:
+    """
+    Keep-alive connection pools (one sync, one async) for a single upstream service.
+
+    Both share the same timeouts and retry policy: exponential backoff with full
+    jitter, honouring Retry-After. Connection failures are always retried because
+    the request never reached the server, and so are 429s; timeouts and 502/503/504
+    responses are retried only for idempotent methods unless the caller passes
+    ``retry_unsafe=True``.
+    """
+
+    def __init__(self, name: str, base_url: str = "", headers: Optional[Dict] = None,
+                 max_retries: int = HTTP_MAX_RETRIES, timeout: Optional[httpx.Timeout] = None,
+                 limits: Optional[httpx.Limits] = None, limiter=None):
+        self.name = name
+        self.base_url = base_url
+        self.headers = headers or {}
+        self.max_retries = max_retries
+        # Optional rate limiter with acquire/aacquire(priority) and release(response), called per attempt
+        self.limiter = limiter
+        self.timeout = timeout or httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        self.limits = limits or httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE
+        )
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        _clients.append(self)
+
+    # ==== Clients ====
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(
+                        base_url=self.base_url, headers=self.headers, timeout=self.timeout, limits=self.limits
+                    )
+        return self._sync_client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url, headers=self.headers, timeout=self.timeout, limits=self.limits
+            )
+        return self._async_client
+
+    # ==== Retry policy ====
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                return min(retry_after, HTTP_BACKOFF_MAX * 4)
+        return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+    def _should_retry(self, method: str, attempt: int, retry_unsafe: bool,
+                      response: Optional[httpx.Response] = None, error: Optional[Exception] = None) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if isinstance(error, httpx.ConnectError) or isinstance(error, httpx.ConnectTimeout):
+            return True
+        safe = method.upper() in IDEMPOTENT_METHODS or retry_unsafe
+        if error is not None:
+            return safe and isinstance(error, httpx.TransportError)
+        # A 429 is rejected before any processing, so it is safe to retry for every method
+        return response.status_code == 429 or (safe and response.status_code in RETRYABLE_STATUS_CODES)
+
+    def _log_retry(self, method: str, url: str, attempt: int, delay: float, reason: str):
+        logger.warning(
+            f"[{self.name}] {method} {url} failed ({reason}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+        )
+
+    # ==== Requests ====
+
+    def request(self, method: str, url: str, retry_unsafe: bool = False, priority: Optional[int] = None,
+                **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire(priority)
+            response = None
+            try:
+                response = self.sync_client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not self._should_retry(method, attempt, retry_unsafe, error=e):
+                    raise
+                delay = self._backoff(attempt)
+                self._log_retry(method, url, attempt, delay, type(e).__name__)
+            else:
+                if not self._should_retry(method, attempt, retry_unsafe, response=response):
+                    return response
+                delay = self._backoff(attempt, response)
+                self._log_retry(method, url, attempt, delay, f"HTTP {response.status_code}")
+                response.close()
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(response)
+            time.sleep(delay)
+            attempt += 1
+
+    async def arequest(self, method: str, url: str, retry_unsafe: bool = False, priority: Optional[int] = None,
+                       **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.aacquire(priority)
+            response = None
+            try:
+                response = await self.async_client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not self._should_retry(method, attempt, retry_unsafe, error=e):
+                    raise
+                delay = self._backoff(attempt)
+                self._log_retry(method, url, attempt, delay, type(e).__name__)
+            else:
+                if not self._should_retry(method, attempt, retry_unsafe, response=response):
+                    return response
+                delay = self._backoff(attempt, response)
+                self._log_retry(method, url, attempt, delay, f"HTTP {response.status_code}")
+                await response.aclose()
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+_clients: List[PooledHTTPClient] = []
+
+
+async def close_http_clients():
+    """Close every pooled client; called on application shutdown."""
+    for client in _clients:
+        await client.aclose()
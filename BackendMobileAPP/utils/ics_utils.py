@@ -1,22 +1,107 @@
-from ics import Calendar, Event
-from datetime import datetime
-import tempfile
-import pytz
-
-def generate_ics_file(appointment):
-    print("DEBUG ICS: date=", appointment.date, "start_time=", appointment.start_time, "end_time=", appointment.end_time)
-    c = Calendar()
-    e = Event()
-    e.name = "Oliva Clinic Appointment"
-    tz = pytz.timezone("Asia/Kolkata")  # Set your desired timezone
-    e.begin = tz.localize(datetime.combine(appointment.date, appointment.start_time))
-    e.end = tz.localize(datetime.combine(appointment.date, appointment.end_time))
-    e.location = "Online (Video Call)"
-    e.description = f"Join your consultation: {appointment.video_call_link}"
-    e.status = "confirmed"
-
-    c.events.add(e)
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".ics", mode='w') as f:
-        f.write(str(c))
-        return f.name  # full path of the created .ics file
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable
+from zoneinfo import ZoneInfo
+
+from constants.status_codes import STATUS_MAP
+
+# Resolved once; appointment date/start_time are stored in clinic-local time
+CLINIC_TIMEZONE = ZoneInfo(os.getenv("CLINIC_TIMEZONE", "Asia/Kolkata"))
+
+CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//Oliva Clinic//Appointments//EN\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+    "METHOD:PUBLISH\r\n"
+    "X-WR-CALNAME:{name}\r\n"
+)
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+EVENT_TEMPLATE = (
+    "BEGIN:VEVENT\r\n"
+    "UID:{uid}\r\n"
+    "DTSTAMP:{stamp}\r\n"
+    "DTSTART:{start}\r\n"
+    "DTEND:{end}\r\n"
+    "SUMMARY:Oliva Clinic Appointment\r\n"
+    "DESCRIPTION:{description}\r\n"
+    "LOCATION:Online (Video Call)\r\n"
+    "STATUS:{status}\r\n"
+    "SEQUENCE:{sequence}\r\n"
+    "END:VEVENT\r\n"
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(text: str) -> str:
+    """Fold content lines longer than 75 octets (RFC 5545 3.1)"""
+    lines = []
+    for line in text.split("\r\n"):
+        raw = line.encode("utf-8")
+        if len(raw) <= 75:
+            lines.append(line)
+            continue
+        chunks, chunk = [], b""
+        for char in line:
+            encoded = char.encode("utf-8")
+            if len(chunk) + len(encoded) > (75 if not chunks else 74):
+                chunks.append(chunk.decode("utf-8"))
+                chunk = b""
+            chunk += encoded
+        chunks.append(chunk.decode("utf-8"))
+        lines.append("\r\n ".join(chunks))
+    return "\r\n".join(lines)
+
+
+def _utc(appointment_date, local_time) -> str:
+    local = datetime.combine(appointment_date, local_time).replace(tzinfo=CLINIC_TIMEZONE)
+    return local.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_event(appointment, stamp: str = None) -> str:
+    """One folded VEVENT for an appointment"""
+    cancelled = appointment.status == STATUS_MAP["Cancelled"]
+    return _fold(EVENT_TEMPLATE.format(
+        uid=f"{appointment.appointment_id}@olivaclinic.com",
+        stamp=stamp or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        start=_utc(appointment.date, appointment.start_time),
+        end=_utc(appointment.date, appointment.end_time),
+        description=_escape(f"Join your consultation: {appointment.video_call_link or ''}"),
+        status="CANCELLED" if cancelled else "CONFIRMED",
+        # Bumped on cancellation so calendar clients replace the earlier copy
+        sequence=1 if cancelled else 0
+    ))
+
+
+def render_calendar(appointments: Iterable, name: str = "Oliva Clinic") -> bytes:
+    """One VCALENDAR holding every appointment, rendered straight to bytes"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    parts = [CALENDAR_HEADER.format(name=_escape(name))]
+    parts.extend(render_event(appointment, stamp) for appointment in appointments)
+    parts.append(CALENDAR_FOOTER)
+    return _fold("".join(parts)).encode("utf-8")
+
+
+def render_feed(events: Iterable[str], name: str = "Oliva Clinic") -> bytes:
+    """Assemble already folded VEVENT blocks (see render_event) into a subscribable calendar"""
+    header = _fold(CALENDAR_HEADER.format(name=_escape(name)))
+    return (header + "".join(events) + CALENDAR_FOOTER).encode("utf-8")
+
+
+def generate_ics_bytes(appointment) -> bytes:
+    """Calendar invite for a single appointment, ready to attach to an email"""
+    return render_calendar([appointment])
+
+
+def generate_ics_batch(appointments: Iterable) -> Dict[str, bytes]:
+    """Invites for many appointments at once, keyed by appointment_id"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    header = CALENDAR_HEADER.format(name="Oliva Clinic")
+    return {
+        appointment.appointment_id: _fold(header + render_event(appointment, stamp) + CALENDAR_FOOTER).encode("utf-8")
+        for appointment in appointments
+    }
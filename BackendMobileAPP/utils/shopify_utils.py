@@ -0,0 +1,9 @@
+import base64
+import hmac
+import hashlib
+
+def validate_shopify_webhook(data: bytes, received_hmac: str, secret: str) -> bool:
+    generated_hmac = base64.b64encode(
+        hmac.new(bytes(secret, 'utf-8'), msg=data, digestmod=hashlib.sha256).digest()
+    ).decode()
+    return hmac.compare_digest(received_hmac or "", generated_hmac)
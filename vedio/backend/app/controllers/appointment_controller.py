@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database.connection import get_db
 from app.services.appointment_service import AppointmentService
-from app.dto.appointment_dto import AppointmentCreateDTO, AppointmentResponseDTO, DoctorAvailabilityDTO
+from app.repositories.appointment_repository import SlotUnavailableError
+from app.services.calendar_feed_service import calendar_feeds_enabled
+from app.dto.appointment_dto import (
+    AppointmentCreateDTO, AppointmentResponseDTO, DoctorAvailabilityDTO, AvailabilityRangeDTO, FirstFreeSlotDTO
+)
 
 router = APIRouter(prefix="/api/v1/appointments", tags=["appointments"])
 
@@ -17,6 +21,8 @@ async def create_appointment(
         appointment_service = AppointmentService(db)
         result = appointment_service.create_appointment(appointment)
         return result
+    except SlotUnavailableError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "next_free_slot": e.next_free_slot})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -34,12 +40,73 @@ async def get_doctor_availability(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/availability", response_model=AvailabilityRangeDTO)
+async def get_availability_range(
+    start_date: str,
+    end_date: str,
+    doctor_ids: Optional[List[int]] = Query(None),
+    specialty: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Free slots for several doctors (or a specialty) over a date range"""
+    try:
+        appointment_service = AppointmentService(db)
+        return appointment_service.get_availability_range(start_date, end_date, doctor_ids, specialty)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/availability/first-free", response_model=FirstFreeSlotDTO)
+async def get_first_free_slot(
+    start_date: str,
+    end_date: str,
+    doctor_ids: Optional[List[int]] = Query(None),
+    specialty: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Earliest free slot for any of the given doctors (or any doctor of a specialty)"""
+    try:
+        appointment_service = AppointmentService(db)
+        slot = appointment_service.find_first_free_slot(start_date, end_date, doctor_ids, specialty)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if slot is None:
+        raise HTTPException(status_code=404, detail="No free slot in the requested range")
+    return slot
+
+@router.post("/{appointment_id}/calendar-feeds")
+async def send_calendar_feeds(appointment_id: int, request: Request, db: Session = Depends(get_db)):
+    """Email the appointment's doctor and patient their own subscribable calendar URL"""
+    if not calendar_feeds_enabled():
+        raise HTTPException(status_code=503, detail="Calendar feeds are not configured")
+    appointment_service = AppointmentService(db)
+    sent = appointment_service.send_calendar_feed_links(
+        appointment_id, lambda token: str(request.url_for("calendar_feed", token=token))
+    )
+    if sent is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return {"message": "Calendar links sent to the appointment's doctor and patient", "sent": sent}
+
 @router.get("/booked-slots")
-async def get_booked_slots(db: Session = Depends(get_db)):
-    """Get all booked slots for frontend"""
+async def get_booked_slots(
+    request: Request,
+    response: Response,
+    doctor_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    since: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Booked slots for a doctor/date window; supports If-None-Match and ?since= polling"""
     try:
         appointment_service = AppointmentService(db)
-        booked_slots = appointment_service.get_all_booked_slots()
-        return {"booked_slots": booked_slots}
+        feed = appointment_service.get_booked_slots_feed(doctor_id, start_date, end_date, since)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = feed.pop("etag", None)
+    if etag:
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return feed
@@ -0,0 +1,43 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from app.database.connection import get_db
+from app.repositories.calendar_feed_repository import CalendarFeed
+from app.services.calendar_feed_service import CalendarFeedService, calendar_feeds_enabled, parse_feed_token
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+
+def _not_modified(request: Request, feed: CalendarFeed) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or feed.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return feed.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.get("/{token}.ics", name="calendar_feed")
+async def calendar_feed(token: str, request: Request, db: Session = Depends(get_db)):
+    """Subscribable calendar of a doctor's or patient's appointments; answers 304 when unchanged"""
+    if not calendar_feeds_enabled():
+        raise HTTPException(status_code=503, detail="Calendar feeds are not configured")
+    owner = parse_feed_token(token)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Calendar not found")
+
+    feed = CalendarFeedService(db).get_feed(*owner)
+    headers = {
+        "ETag": feed.etag,
+        "Last-Modified": format_datetime(feed.last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache"
+    }
+    if _not_modified(request, feed):
+        return Response(status_code=304, headers=headers)
+    return Response(content=feed.body, media_type="text/calendar; charset=utf-8", headers=headers)
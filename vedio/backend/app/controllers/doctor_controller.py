@@ -6,7 +6,9 @@ from app.dto.doctor_dto import (
     DoctorCreateDTO,
     DoctorUpdateDTO,
     DoctorResponseDTO,
-    DoctorListResponseDTO
+    DoctorListResponseDTO,
+    DoctorSearchResponseDTO,
+    DoctorTypeaheadResponseDTO
 )
 from app.services.doctor_service import DoctorService
 from app.dto.meeting_dto import ErrorResponseDTO
@@ -45,6 +47,50 @@ async def create_doctor(
             detail=f"Internal server error: {str(e)}"
         )
 
+@router.get(
+    "/search",
+    response_model=DoctorSearchResponseDTO,
+    responses={
+        500: {"model": ErrorResponseDTO, "description": "Internal Server Error"}
+    }
+)
+async def search_doctors(
+    q: str = Query(..., description="Search query for doctor name or specialty"),
+    specialty: Optional[str] = Query(None, description="Only return doctors of this specialty"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    doctor_service: DoctorService = Depends(get_doctor_service)
+):
+    """Search doctors by name or specialty, best match first, with specialty facets"""
+    try:
+        return doctor_service.search_doctors(q, skip, limit, specialty)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@router.get(
+    "/typeahead",
+    response_model=DoctorTypeaheadResponseDTO,
+    responses={
+        500: {"model": ErrorResponseDTO, "description": "Internal Server Error"}
+    }
+)
+async def doctor_typeahead(
+    q: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions to return"),
+    doctor_service: DoctorService = Depends(get_doctor_service)
+):
+    """Doctor and specialty suggestions for a search box"""
+    try:
+        return doctor_service.typeahead(q, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+
 @router.get(
     "/{doctor_id}",
     response_model=DoctorResponseDTO,
@@ -161,28 +207,6 @@ async def delete_doctor(
             detail=f"Internal server error: {str(e)}"
         )
 
-@router.get(
-    "/search",
-    response_model=DoctorListResponseDTO,
-    responses={
-        500: {"model": ErrorResponseDTO, "description": "Internal Server Error"}
-    }
-)
-async def search_doctors(
-    q: str = Query(..., description="Search query for doctor name or specialty"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
-    doctor_service: DoctorService = Depends(get_doctor_service)
-):
-    """Search doctors by name or specialty"""
-    try:
-        return doctor_service.search_doctors(q, skip, limit)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {str(e)}"
-        )
-
 @router.get(
     "/specialty/{specialty}",
     response_model=DoctorListResponseDTO,
@@ -8,15 +8,14 @@ from app.dto.meeting_dto import (
 from app.dto.mappers import MeetingMapper
 from app.services.meeting_service import MeetingService
 from app.utils.email_utils import send_email_with_fallback
-from app.repositories.meeting_repository import InMemoryMeetingRepository
+from app.repositories.meeting_repository import meeting_store
 
 router = APIRouter(prefix="/api/v1", tags=["meetings"])
 
 # Dependency injection
 def get_meeting_service() -> MeetingService:
-    """Dependency to get meeting service instance"""
-    repository = InMemoryMeetingRepository()
-    return MeetingService(repository)
+    """Dependency to get meeting service instance (backed by the process-wide meeting store)"""
+    return MeetingService(meeting_store)
 
 @router.get("/", response_model=dict)
 async def root():
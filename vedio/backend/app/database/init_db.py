@@ -22,10 +22,22 @@ def init_database():
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created")
     
+    # create_all skips existing tables, so add indexes declared since they were created
+    create_missing_indexes()
+    
     # Insert sample data
     insert_sample_data()
     print("✅ Sample data inserted")
 
+def create_missing_indexes():
+    """Create declared indexes that are missing on already existing tables"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"⚠️ Could not create index {index.name}: {e}")
+
 def insert_sample_data():
     """Insert sample doctors and other data"""
     db = SessionLocal()
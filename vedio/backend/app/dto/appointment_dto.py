@@ -9,6 +9,8 @@ class AppointmentCreateDTO(BaseModel):
     concern: str
     appointment_date: str
     time_slot: str
+    # Book the next free slot that day if this one is taken
+    book_next_free: bool = False
 
 class AppointmentUpdateDTO(BaseModel):
     doctor_id: Optional[int] = None
@@ -42,3 +44,20 @@ class DoctorAvailabilityDTO(BaseModel):
 class TimeSlotDTO(BaseModel):
     time: str
     available: bool
+
+class DoctorDayAvailabilityDTO(BaseModel):
+    doctor_id: int
+    appointment_date: str
+    available_slots: List[str]
+
+class AvailabilityRangeDTO(BaseModel):
+    start_date: str
+    end_date: str
+    days: List[DoctorDayAvailabilityDTO]
+
+class FirstFreeSlotDTO(BaseModel):
+    doctor_id: int
+    doctor_name: str
+    appointment_date: str
+    time_slot: str
+
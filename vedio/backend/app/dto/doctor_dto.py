@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 class DoctorCreateDTO(BaseModel):
@@ -46,3 +46,19 @@ class DoctorListResponseDTO(BaseModel):
     total: int = Field(..., description="Total number of doctors")
     page: int = Field(..., description="Current page number")
     size: int = Field(..., description="Page size")
+
+class DoctorSearchResponseDTO(DoctorListResponseDTO):
+    """DTO for ranked doctor search results"""
+    facets: Dict[str, int] = Field(default_factory=dict, description="Matching doctors per specialty (before the specialty filter)")
+
+class DoctorSuggestionDTO(BaseModel):
+    """DTO for a typeahead doctor suggestion"""
+    id: int = Field(..., description="Doctor's ID")
+    name: str = Field(..., description="Doctor's full name")
+    specialty: str = Field(..., description="Doctor's specialty")
+    photo_url: Optional[str] = Field(None, description="URL to doctor's photo")
+
+class DoctorTypeaheadResponseDTO(BaseModel):
+    """DTO for typeahead suggestions"""
+    doctors: List[DoctorSuggestionDTO] = Field(..., description="Best matching doctors")
+    specialties: List[str] = Field(..., description="Matching specialties")
@@ -1,22 +1,38 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index, text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from app.database.connection import Base, DB_SCHEMA
 
+# One active booking per doctor slot; cancelled/completed rows do not hold the slot
+SLOT_UNIQUE_INDEX = "uq_appointments_doctor_slot_active"
+ACTIVE_SLOT_WHERE = "status IN ('scheduled', 'confirmed')"
+
 class Appointment(Base):
     """Appointment model for database"""
     __tablename__ = "appointments"
-    __table_args__ = {"schema": DB_SCHEMA}
+    __table_args__ = (
+        # Covers booked-slot lookups (doctor, day range, active status) without touching the table
+        Index("ix_appointments_doctor_date_slot_status", "doctor_id", "date", "time_slot", "status"),
+        Index(
+            SLOT_UNIQUE_INDEX, "doctor_id", "date", "time_slot", unique=True,
+            postgresql_where=text(ACTIVE_SLOT_WHERE), sqlite_where=text(ACTIVE_SLOT_WHERE)
+        ),
+        {"schema": DB_SCHEMA},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    doctor_id = Column(Integer, ForeignKey(f"{DB_SCHEMA}.doctors.id"), nullable=False, index=True)
+    # active_history: the slot change log needs the previous slot even when it was not loaded
+    doctor_id = column_property(
+        Column(Integer, ForeignKey(f"{DB_SCHEMA}.doctors.id"), nullable=False, index=True), active_history=True
+    )
     patient_id = Column(Integer, ForeignKey(f"{DB_SCHEMA}.patients.id"), nullable=False, index=True)
-    date = Column(DateTime, nullable=False, index=True)
-    time_slot = Column(String(10), nullable=False)  # Format: "HH:MM"
+    date = column_property(Column(DateTime, nullable=False, index=True), active_history=True)
+    time_slot = column_property(Column(String(10), nullable=False), active_history=True)  # Format: "HH:MM"
     meeting_link = Column(String(500), nullable=False)
     passcode = Column(String(20), nullable=False)
     concern = Column(String(200), nullable=True)
-    status = Column(String(20), default="scheduled")  # scheduled, completed, cancelled, rescheduled
+    # scheduled, completed, cancelled, rescheduled
+    status = column_property(Column(String(20), default="scheduled"), active_history=True)
     doctor_email_sent = Column(Boolean, default=False)
     patient_email_sent = Column(Boolean, default=False)
     notes = Column(Text, nullable=True)
@@ -29,3 +45,24 @@ class Appointment(Base):
     
     def __repr__(self):
         return f"<Appointment(id={self.id}, doctor_id={self.doctor_id}, patient_id={self.patient_id}, date='{self.date}', time_slot='{self.time_slot}')>"
+
+
+class AppointmentSlotChange(Base):
+    """
+    Append-only log of slots taken and freed, written with each appointment change.
+
+    Backs the ?since= booked-slots feed: a moved appointment logs its old slot as
+    freed and its new one as booked, a deleted one leaves a freed row behind.
+    """
+    __tablename__ = "appointment_slot_changes"
+    __table_args__ = (
+        Index("ix_appointment_slot_changes_changed_at_doctor", "changed_at", "doctor_id"),
+        {"schema": DB_SCHEMA},
+    )
+    
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, nullable=False)
+    date = Column(DateTime, nullable=False)
+    time_slot = Column(String(10), nullable=False)
+    booked = Column(Boolean, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,17 +1,82 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, event, inspect, insert
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from datetime import date, datetime
-from app.models.appointment import Appointment
+from datetime import date, datetime, timedelta
+from app.models.appointment import Appointment, AppointmentSlotChange, SLOT_UNIQUE_INDEX
 from app.models.doctor import Doctor
 from app.models.patient import Patient
-from app.dto.appointment_dto import AppointmentCreateDTO
+from app.dto.appointment_dto import AppointmentCreateDTO, AppointmentUpdateDTO
+from app.repositories.availability_repository import (
+    ACTIVE_STATUSES, AvailabilityRepository, availability_cache, slots_from_mask
+)
+from app.repositories.calendar_feed_repository import calendar_feed_cache
+
+class SlotUnavailableError(ValueError):
+    """The doctor already has an active appointment in this slot"""
+    
+    def __init__(self, time_slot: str, next_free_slot: Optional[str] = None):
+        super().__init__(f"Time slot {time_slot} is not available for the selected date")
+        self.time_slot = time_slot
+        self.next_free_slot = next_free_slot
+
+
+def _is_slot_conflict(error: IntegrityError) -> bool:
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None and getattr(diag, "constraint_name", None):
+        return diag.constraint_name == SLOT_UNIQUE_INDEX
+    message = str(error.orig)
+    return SLOT_UNIQUE_INDEX in message or "appointments.doctor_id, appointments.date, appointments.time_slot" in message
+
+
+def _previous(target: Appointment, key: str):
+    history = inspect(target).attrs[key].history
+    return history.deleted[0] if history.deleted else getattr(target, key)
+
+
+def _log_slot_changes(connection, entries: List[tuple]):
+    """Append (doctor_id, date, time_slot, booked) rows in the flushing transaction"""
+    if entries:
+        connection.execute(insert(AppointmentSlotChange), [
+            {"doctor_id": doctor_id, "date": day, "time_slot": time_slot, "booked": booked}
+            for doctor_id, day, time_slot, booked in entries
+        ])
+
+
+@event.listens_for(Appointment, "after_insert")
+def _slot_booked(mapper, connection, target):
+    if target.status in ACTIVE_STATUSES:
+        _log_slot_changes(connection, [(target.doctor_id, target.date, target.time_slot, True)])
+
+
+@event.listens_for(Appointment, "after_update")
+def _slot_moved(mapper, connection, target):
+    old = (_previous(target, "doctor_id"), _previous(target, "date"), _previous(target, "time_slot"))
+    new = (target.doctor_id, target.date, target.time_slot)
+    was_active = _previous(target, "status") in ACTIVE_STATUSES
+    is_active = target.status in ACTIVE_STATUSES
+    if old == new and was_active == is_active:
+        return
+    entries = []
+    if was_active:
+        entries.append(old + (False,))
+    if is_active:
+        entries.append(new + (True,))
+    _log_slot_changes(connection, entries)
+
+
+@event.listens_for(Appointment, "after_delete")
+def _slot_deleted(mapper, connection, target):
+    if _previous(target, "status") in ACTIVE_STATUSES:
+        _log_slot_changes(connection, [(target.doctor_id, target.date, target.time_slot, False)])
+
 
 class AppointmentRepository:
     """Repository for appointment database operations"""
     
     def __init__(self, db: Session):
         self.db = db
+        self.availability = AvailabilityRepository(db)
     
     def create(self, appointment_data: AppointmentCreateDTO, meeting_link: str, passcode: str) -> Appointment:
         """Create a new appointment"""
@@ -37,10 +102,22 @@ class AppointmentRepository:
             status="scheduled"
         )
         self.db.add(appointment)
-        self.db.commit()
+        # The partial unique index is the availability check: a taken slot fails this INSERT
+        self._commit_slot(appointment_data.time_slot)
         self.db.refresh(appointment)
+        availability_cache.invalidate(appointment.doctor_id, appointment.date)
+        calendar_feed_cache.invalidate(appointment.doctor_id, appointment.patient_id)
         return appointment
     
+    def _commit_slot(self, time_slot: str):
+        try:
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if _is_slot_conflict(e):
+                raise SlotUnavailableError(time_slot)
+            raise
+    
     def get_by_id(self, appointment_id: int) -> Optional[Appointment]:
         """Get appointment by ID"""
         return self.db.query(Appointment).filter(Appointment.id == appointment_id).first()
@@ -89,6 +166,31 @@ class AppointmentRepository:
         appointment.status = status
         self.db.commit()
         self.db.refresh(appointment)
+        availability_cache.invalidate(appointment.doctor_id, appointment.date)
+        calendar_feed_cache.invalidate(appointment.doctor_id, appointment.patient_id)
+        return appointment
+    
+    def update(self, appointment_id: int, appointment_data: AppointmentUpdateDTO) -> Optional[Appointment]:
+        """Update appointment date, time, concern or status"""
+        appointment = self.get_by_id(appointment_id)
+        if not appointment:
+            return None
+        
+        previous = (appointment.doctor_id, appointment.date)
+        if appointment_data.appointment_date:
+            appointment.date = datetime.strptime(appointment_data.appointment_date, "%Y-%m-%d")
+        if appointment_data.time_slot:
+            appointment.time_slot = appointment_data.time_slot
+        if appointment_data.concern is not None:
+            appointment.concern = appointment_data.concern
+        if appointment_data.status:
+            appointment.status = appointment_data.status
+        
+        self._commit_slot(appointment.time_slot)
+        self.db.refresh(appointment)
+        availability_cache.invalidate(*previous)
+        availability_cache.invalidate(appointment.doctor_id, appointment.date)
+        calendar_feed_cache.invalidate(appointment.doctor_id, appointment.patient_id)
         return appointment
     
     def delete(self, appointment_id: int) -> bool:
@@ -99,79 +201,66 @@ class AppointmentRepository:
         
         self.db.delete(appointment)
         self.db.commit()
+        availability_cache.invalidate(appointment.doctor_id, appointment.date)
+        calendar_feed_cache.invalidate(appointment.doctor_id, appointment.patient_id)
         return True
     
     def check_availability(self, doctor_id: int, appointment_date: str, time_slot: str) -> bool:
         """Check if a time slot is available for a doctor on a specific date"""
-        # Parse the date string to datetime
-        date_obj = datetime.strptime(appointment_date, "%Y-%m-%d")
-        
-        existing_appointment = self.db.query(Appointment).filter(
-            and_(
-                Appointment.doctor_id == doctor_id,
-                Appointment.date == date_obj,
-                Appointment.time_slot == time_slot,
-                Appointment.status.in_(["scheduled", "confirmed"])
-            )
-        ).first()
-        return existing_appointment is None
+        # Bypass the cache: this guards a booking, so it must see other workers' writes
+        return self.availability.is_free(doctor_id, appointment_date, time_slot, use_cache=False)
     
     def get_available_slots(self, doctor_id: int, appointment_date: str) -> List[str]:
         """Get available time slots for a doctor on a specific date"""
-        # Parse the date string to datetime
-        date_obj = datetime.strptime(appointment_date, "%Y-%m-%d")
-        
-        # Define all possible time slots (15-minute intervals from 8 AM to 6 PM)
-        all_slots = []
-        for hour in range(8, 18):  # 8 AM to 6 PM
-            for minute in [0, 15, 30, 45]:
-                time_str = f"{hour:02d}:{minute:02d}"
-                all_slots.append(time_str)
-        
-        # Get booked slots for this doctor and date
-        booked_slots = self.db.query(Appointment.time_slot).filter(
-            and_(
-                Appointment.doctor_id == doctor_id,
-                Appointment.date == date_obj,
-                Appointment.status.in_(["scheduled", "confirmed"])
-            )
-        ).all()
-        
-        booked_times = [slot[0] for slot in booked_slots]
-        available_slots = [slot for slot in all_slots if slot not in booked_times]
-        
-        return available_slots
+        masks = self.availability.free_masks([doctor_id], appointment_date)
+        return slots_from_mask(next(iter(masks.values())))
     
     def get_booked_slots(self, doctor_id: int, appointment_date: str) -> List[str]:
         """Get booked time slots for a doctor on a specific date"""
-        # Parse the date string to datetime
-        date_obj = datetime.strptime(appointment_date, "%Y-%m-%d")
+        masks = self.availability.booked_masks([doctor_id], appointment_date)
+        return slots_from_mask(next(iter(masks.values())))
+    
+    def get_booked_slots_feed(self, doctor_ids: List[int], start_date: date, end_date: date) -> List[dict]:
+        """Booked (doctor_id, date, time_slot) for a calendar window, from the cached doctor-day masks"""
+        masks = self.availability.booked_masks(doctor_ids, start_date, end_date)
+        booked_slots = []
+        for (doctor_id, day), mask in sorted(masks.items(), key=lambda item: (item[0][1], item[0][0])):
+            day_str = day.strftime("%Y-%m-%d")
+            for time_slot in slots_from_mask(mask):
+                booked_slots.append({"doctor_id": doctor_id, "date": day_str, "time_slot": time_slot})
+        return booked_slots
+    
+    def get_booked_slot_changes(self, doctor_ids: List[int], start_date: date, end_date: date,
+                                since: datetime) -> List[dict]:
+        """
+        Slots in the window taken or freed after ``since``, oldest first, from the slot change log.
         
-        booked_slots = self.db.query(Appointment.time_slot).filter(
+        A moved appointment yields a freed entry (``booked: false``) for its old slot and
+        a booked one for the new slot; a cancelled or deleted one frees its slot. Apply
+        entries in order: the last one for a slot is its current state.
+        """
+        rows = self.db.query(
+            AppointmentSlotChange.doctor_id, AppointmentSlotChange.date, AppointmentSlotChange.time_slot,
+            AppointmentSlotChange.booked, AppointmentSlotChange.changed_at
+        ).filter(
             and_(
-                Appointment.doctor_id == doctor_id,
-                Appointment.date == date_obj,
-                Appointment.status.in_(["scheduled", "confirmed"])
+                AppointmentSlotChange.changed_at > since,
+                AppointmentSlotChange.doctor_id.in_(doctor_ids),
+                AppointmentSlotChange.date >= datetime.combine(start_date, datetime.min.time()),
+                AppointmentSlotChange.date < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
             )
-        ).all()
+        ).order_by(AppointmentSlotChange.changed_at, AppointmentSlotChange.id).all()
         
-        return [slot[0] for slot in booked_slots]
-    
-    def get_all_booked_slots(self) -> List[dict]:
-        """Get all booked slots for frontend"""
-        appointments = self.db.query(Appointment).filter(
-            Appointment.status.in_(["scheduled", "confirmed"])
-        ).all()
-        
-        booked_slots = []
-        for appointment in appointments:
-            booked_slots.append({
-                "doctor_id": appointment.doctor_id,
-                "date": appointment.date.strftime("%Y-%m-%d"),
-                "time_slot": appointment.time_slot
-            })
-        
-        return booked_slots
+        return [
+            {
+                "doctor_id": doctor_id,
+                "date": slot_date.strftime("%Y-%m-%d"),
+                "time_slot": time_slot,
+                "booked": booked,
+                "changed_at": changed.isoformat() if changed else None
+            }
+            for doctor_id, slot_date, time_slot, booked, changed in rows
+        ]
     
     def count(self, status: str = None) -> int:
         """Count total appointments"""
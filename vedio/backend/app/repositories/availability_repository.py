@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from app.models.appointment import Appointment
+
+# Statuses that occupy a slot
+ACTIVE_STATUSES = ["scheduled", "confirmed"]
+
+# 15-minute slots from 8 AM to 6 PM; bit i of a day mask is SLOT_TIMES[i]
+SLOT_TIMES = [f"{hour:02d}:{minute:02d}" for hour in range(8, 18) for minute in (0, 15, 30, 45)]
+SLOT_INDEX = {slot: i for i, slot in enumerate(SLOT_TIMES)}
+FULL_DAY_MASK = (1 << len(SLOT_TIMES)) - 1
+
+AVAILABILITY_CACHE_TTL = float(os.getenv("AVAILABILITY_CACHE_TTL", "30"))
+AVAILABILITY_CACHE_MAX_ENTRIES = int(os.getenv("AVAILABILITY_CACHE_MAX_ENTRIES", "50000"))
+
+DoctorDay = Tuple[int, date]
+
+
+def slots_from_mask(mask: int) -> List[str]:
+    """Slot times whose bit is set, in day order"""
+    return [SLOT_TIMES[i] for i in range(len(SLOT_TIMES)) if mask >> i & 1]
+
+
+def mask_from_slots(slots: Iterable[str]) -> int:
+    mask = 0
+    for slot in slots:
+        i = SLOT_INDEX.get(slot)
+        if i is not None:
+            mask |= 1 << i
+    return mask
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class AvailabilityCache:
+    """Booked-slot bitmask per doctor-day, shared by all sessions in this process"""
+
+    def __init__(self, ttl_seconds: float = AVAILABILITY_CACHE_TTL, max_entries: int = AVAILABILITY_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[DoctorDay, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[DoctorDay]) -> Dict[DoctorDay, int]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry and entry[1] > now:
+                    found[key] = entry[0]
+        return found
+
+    def set_many(self, masks: Dict[DoctorDay, int]):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if len(self._entries) + len(masks) > self.max_entries:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                if len(self._entries) + len(masks) > self.max_entries:
+                    self._entries.clear()
+            for key, mask in masks.items():
+                self._entries[key] = (mask, expires_at)
+
+    def invalidate(self, doctor_id: int, day) -> None:
+        """Drop a doctor-day after an appointment on it is created, moved or cancelled"""
+        with self._lock:
+            self._entries.pop((doctor_id, _to_date(day)), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+availability_cache = AvailabilityCache()
+
+
+class AvailabilityRepository:
+    """
+    Doctor availability as bitmasks of 15-minute slots.
+
+    Booked masks for any set of doctors and days come from one query over
+    (doctor_id, date, time_slot) and are cached per doctor-day; free slots are
+    ``FULL_DAY_MASK & ~booked``. Other workers' bookings become visible within
+    AVAILABILITY_CACHE_TTL; writes through AppointmentRepository invalidate at once.
+    """
+
+    def __init__(self, db: Session, cache: AvailabilityCache = availability_cache):
+        self.db = db
+        self.cache = cache
+
+    def booked_masks(self, doctor_ids: List[int], start_date, end_date=None, use_cache: bool = True) -> Dict[DoctorDay, int]:
+        """Booked-slot mask for every (doctor_id, day) in the inclusive range"""
+        start = _to_date(start_date)
+        end = _to_date(end_date) if end_date else start
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        keys = [(doctor_id, day) for doctor_id in doctor_ids for day in days]
+
+        masks = self.cache.get_many(keys) if use_cache else {}
+        missing = [key for key in keys if key not in masks]
+        if not missing:
+            return masks
+
+        missing_doctors = sorted({doctor_id for doctor_id, _ in missing})
+        rows = self.db.query(Appointment.doctor_id, Appointment.date, Appointment.time_slot).filter(
+            and_(
+                Appointment.doctor_id.in_(missing_doctors),
+                Appointment.date >= datetime.combine(min(day for _, day in missing), datetime.min.time()),
+                Appointment.date < datetime.combine(max(day for _, day in missing) + timedelta(days=1), datetime.min.time()),
+                Appointment.status.in_(ACTIVE_STATUSES)
+            )
+        ).all()
+
+        loaded = {key: 0 for key in missing}
+        for doctor_id, appointment_date, time_slot in rows:
+            key = (doctor_id, _to_date(appointment_date))
+            i = SLOT_INDEX.get(time_slot)
+            if key in loaded and i is not None:
+                loaded[key] |= 1 << i
+        self.cache.set_many(loaded)
+        masks.update(loaded)
+        return masks
+
+    def free_masks(self, doctor_ids: List[int], start_date, end_date=None, not_before: Optional[datetime] = None,
+                   use_cache: bool = True) -> Dict[DoctorDay, int]:
+        """Free-slot mask per doctor-day; slots earlier than ``not_before`` are treated as taken"""
+        free = {}
+        for (doctor_id, day), booked in self.booked_masks(doctor_ids, start_date, end_date, use_cache).items():
+            free[(doctor_id, day)] = FULL_DAY_MASK & ~booked & self._open_after(day, not_before)
+        return free
+
+    def first_free_slot(self, doctor_ids: List[int], start_date, end_date=None,
+                        not_before: Optional[datetime] = None) -> Optional[Tuple[int, date, str]]:
+        """Earliest (doctor_id, day, time_slot) free for any of the doctors; ties go to the earlier doctor id"""
+        free = self.free_masks(doctor_ids, start_date, end_date, not_before)
+        best = None
+        for (doctor_id, day), mask in free.items():
+            if not mask:
+                continue
+            # Lowest set bit is the earliest free slot of that day
+            slot = (mask & -mask).bit_length() - 1
+            candidate = (day, slot, doctor_id)
+            if best is None or candidate < best:
+                best = candidate
+        if best is None:
+            return None
+        day, slot, doctor_id = best
+        return doctor_id, day, SLOT_TIMES[slot]
+
+    def is_free(self, doctor_id: int, appointment_date, time_slot: str, use_cache: bool = True) -> bool:
+        i = SLOT_INDEX.get(time_slot)
+        masks = self.booked_masks([doctor_id], appointment_date, use_cache=use_cache)
+        booked = masks[(doctor_id, _to_date(appointment_date))]
+        if i is None:
+            # Off-grid slot: only an exact booking of the same time blocks it
+            return not self._has_off_grid_booking(doctor_id, appointment_date, time_slot)
+        return not booked >> i & 1
+
+    def _has_off_grid_booking(self, doctor_id: int, appointment_date, time_slot: str) -> bool:
+        return self.db.query(Appointment.id).filter(
+            and_(
+                Appointment.doctor_id == doctor_id,
+                Appointment.date == datetime.combine(_to_date(appointment_date), datetime.min.time()),
+                Appointment.time_slot == time_slot,
+                Appointment.status.in_(ACTIVE_STATUSES)
+            )
+        ).first() is not None
+
+    @staticmethod
+    def _open_after(day: date, not_before: Optional[datetime]) -> int:
+        if not_before is None or day > not_before.date():
+            return FULL_DAY_MASK
+        if day < not_before.date():
+            return 0
+        cutoff = not_before.strftime("%H:%M")
+        mask = 0
+        for i, slot in enumerate(SLOT_TIMES):
+            if slot >= cutoff:
+                mask |= 1 << i
+        return mask
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+
+DOCTOR = "doctor"
+PATIENT = "patient"
+OWNER_COLUMNS = {DOCTOR: Appointment.doctor_id, PATIENT: Appointment.patient_id}
+
+CALENDAR_FEED_CACHE_MAX_ENTRIES = int(os.getenv("CALENDAR_FEED_CACHE_MAX_ENTRIES", "10000"))
+
+Owner = Tuple[str, int]
+
+
+class CalendarFeed:
+    """Rendered feed for one owner plus the per-event pieces it was built from"""
+
+    def __init__(self, body: bytes, etag: str, last_modified: datetime, events: Dict[int, Tuple[tuple, str]]):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        # appointment id -> (version, folded VEVENT); unchanged events are reused on rebuild
+        self.events = events
+        self.checked_at = time.monotonic()
+        self.stale = False
+
+
+class CalendarFeedCache:
+    """Rendered calendar feed per (owner kind, owner id), shared by all sessions in this process"""
+
+    def __init__(self, max_entries: int = CALENDAR_FEED_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Owner, CalendarFeed]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, owner: Owner) -> Optional[CalendarFeed]:
+        with self._lock:
+            feed = self._entries.get(owner)
+            if feed is not None:
+                self._entries.move_to_end(owner)
+            return feed
+
+    def set(self, owner: Owner, feed: CalendarFeed):
+        with self._lock:
+            self._entries[owner] = feed
+            self._entries.move_to_end(owner)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, doctor_id: int, patient_id: int) -> None:
+        """Mark both owners' feeds for a recheck after one of their appointments changes"""
+        with self._lock:
+            for owner in ((DOCTOR, doctor_id), (PATIENT, patient_id)):
+                feed = self._entries.get(owner)
+                if feed is not None:
+                    feed.stale = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+calendar_feed_cache = CalendarFeedCache()
+
+
+class CalendarFeedRepository:
+    """Queries behind the per-doctor and per-patient calendar feeds"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def event_versions(self, owner: str, owner_id: int, since: datetime, limit: int) -> List[Tuple[int, tuple]]:
+        """(appointment id, version) for the owner's feed window, in calendar order; no row bodies"""
+        rows = self.db.query(
+            Appointment.id, func.coalesce(Appointment.updated_at, Appointment.created_at), Appointment.status
+        ).filter(
+            OWNER_COLUMNS[owner] == owner_id,
+            Appointment.date >= since
+        ).order_by(Appointment.date, Appointment.time_slot, Appointment.id).limit(limit).all()
+        return [(appointment_id, (str(changed_at), status)) for appointment_id, changed_at, status in rows]
+
+    def get_events(self, appointment_ids: List[int]) -> List[Tuple[Appointment, str, str]]:
+        """Appointments with doctor and patient names, for the ids whose events need rendering"""
+        if not appointment_ids:
+            return []
+        return self.db.query(Appointment, Doctor.name, Patient.name).join(
+            Doctor, Doctor.id == Appointment.doctor_id
+        ).join(
+            Patient, Patient.id == Appointment.patient_id
+        ).filter(Appointment.id.in_(appointment_ids)).all()
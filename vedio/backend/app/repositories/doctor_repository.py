@@ -1,8 +1,9 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy import and_
+from typing import Dict, List, Optional, Tuple
 from app.models.doctor import Doctor
 from app.dto.doctor_dto import DoctorCreateDTO, DoctorUpdateDTO
+from app.repositories.doctor_search_index import doctor_search_index
 
 class DoctorRepository:
     """Repository for doctor database operations"""
@@ -24,6 +25,7 @@ class DoctorRepository:
         self.db.add(doctor)
         self.db.commit()
         self.db.refresh(doctor)
+        doctor_search_index.invalidate()
         return doctor
     
     def get_by_id(self, doctor_id: int) -> Optional[Doctor]:
@@ -53,6 +55,7 @@ class DoctorRepository:
         
         self.db.commit()
         self.db.refresh(doctor)
+        doctor_search_index.invalidate()
         return doctor
     
     def delete(self, doctor_id: int) -> bool:
@@ -63,20 +66,24 @@ class DoctorRepository:
         
         doctor.is_active = 0
         self.db.commit()
+        doctor_search_index.invalidate()
         return True
     
     def search(self, query: str, skip: int = 0, limit: int = 100) -> List[Doctor]:
-        """Search doctors by name or specialty"""
-        search_term = f"%{query}%"
-        return self.db.query(Doctor).filter(
-            and_(
-                Doctor.is_active == 1,
-                or_(
-                    Doctor.name.ilike(search_term),
-                    Doctor.specialty.ilike(search_term)
-                )
-            )
-        ).offset(skip).limit(limit).all()
+        """Search active doctors by name or specialty, best match first"""
+        doctors, _, _ = self.search_ranked(query, skip, limit)
+        return doctors
+    
+    def search_ranked(self, query: str, skip: int = 0, limit: int = 100,
+                      specialty: Optional[str] = None) -> Tuple[List[Doctor], int, Dict[str, int]]:
+        """Ranked page, total matches and specialty facets from the in-process search index"""
+        doctor_search_index.ensure_fresh(self.db)
+        return doctor_search_index.search(query, skip, limit, specialty)
+    
+    def typeahead(self, prefix: str, limit: int = 10) -> Tuple[List[Doctor], List[str]]:
+        """Doctor and specialty suggestions for a partially typed query"""
+        doctor_search_index.ensure_fresh(self.db)
+        return doctor_search_index.typeahead(prefix, limit)
     
     def get_by_specialty(self, specialty: str, skip: int = 0, limit: int = 100) -> List[Doctor]:
         """Get doctors by specialty"""
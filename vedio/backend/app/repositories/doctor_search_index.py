@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.doctor import Doctor
+
+# How long the index is trusted before checking whether another worker changed the doctors table
+DOCTOR_SEARCH_REFRESH_SECONDS = float(os.getenv("DOCTOR_SEARCH_REFRESH_SECONDS", "60"))
+# pg_trgm's default similarity threshold
+DOCTOR_SEARCH_MIN_SIMILARITY = float(os.getenv("DOCTOR_SEARCH_MIN_SIMILARITY", "0.3"))
+
+# Match weights; a name hit outranks the same hit on the specialty
+EXACT, PREFIX, INFIX = 3.0, 2.0, 1.0
+FIELD_WEIGHTS = {"name": 1.0, "specialty": 0.8}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free words"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return WORD_PATTERN.findall(text.lower())
+
+
+def trigrams(word: str) -> Set[str]:
+    """pg_trgm-style trigrams: two leading spaces and one trailing"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class _Snapshot:
+    """Immutable view of the index; queries read one snapshot, rebuilds swap in a new one"""
+
+    def __init__(self, doctors: Dict[int, SimpleNamespace]):
+        self.doctors = doctors
+        self.words: Dict[str, Set[Tuple[int, str]]] = {}
+        for doctor in doctors.values():
+            for field in FIELD_WEIGHTS:
+                for word in normalize(getattr(doctor, field)):
+                    self.words.setdefault(word, set()).add((doctor.id, field))
+        self.sorted_words = sorted(self.words)
+        self.word_trigrams = {word: trigrams(word) for word in self.words}
+        self.trigrams: Dict[str, Set[str]] = {}
+        for word, grams in self.word_trigrams.items():
+            for gram in grams:
+                self.trigrams.setdefault(gram, set()).add(word)
+
+    def prefixed(self, prefix: str) -> List[str]:
+        start = bisect_left(self.sorted_words, prefix)
+        matches = []
+        for word in self.sorted_words[start:]:
+            if not word.startswith(prefix):
+                break
+            matches.append(word)
+        return matches
+
+    def rank_key(self, doctor_id: int, score: float):
+        doctor = self.doctors[doctor_id]
+        return -score, -(doctor.rating or 0), -(doctor.experience_years or 0), doctor.name, doctor_id
+
+
+class DoctorSearchIndex:
+    """
+    In-process search index over active doctors.
+
+    The doctors table is small, so the whole table is held as plain snapshots
+    with a sorted word list (prefix lookups by bisect) and a trigram -> words map
+    (infix and typo-tolerant matches). Queries never touch the database; the
+    index reloads after doctor CRUD through DoctorRepository and, for other
+    workers' writes, when a cheap count/max(updated_at) check every
+    DOCTOR_SEARCH_REFRESH_SECONDS shows a change.
+    """
+
+    def __init__(self, refresh_seconds: float = DOCTOR_SEARCH_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot({})
+        self._version = None
+        self._checked_at = 0.0
+        self._stale = True
+
+    # ==== Loading ====
+
+    def invalidate(self):
+        """Reload on next use (called after doctor create/update/delete)"""
+        self._stale = True
+
+    def ensure_fresh(self, db: Session):
+        if not self._stale and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not self._stale and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return
+            count, changed_at = db.query(
+                func.count(Doctor.id), func.max(func.coalesce(Doctor.updated_at, Doctor.created_at))
+            ).one()
+            version = (count, str(changed_at))
+            if self._stale or version != self._version:
+                # Cleared first so a write landing during the load marks the index stale again
+                self._stale = False
+                rows = db.query(*Doctor.__table__.columns).filter(Doctor.is_active == 1).all()
+                self._snapshot = _Snapshot({row.id: SimpleNamespace(**row._asdict()) for row in rows})
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    # ==== Queries ====
+
+    def _match_term(self, snapshot: _Snapshot, term: str, fuzzy: bool) -> Dict[int, float]:
+        """Best score per doctor for one query word"""
+        scores: Dict[str, float] = {word: (EXACT if word == term else PREFIX) for word in snapshot.prefixed(term)}
+        if len(term) >= 3:
+            term_grams = trigrams(term)
+            candidates = set()
+            for gram in term_grams:
+                candidates |= snapshot.trigrams.get(gram, set())
+            for word in candidates - scores.keys():
+                if term in word:
+                    scores[word] = INFIX
+                elif fuzzy:
+                    score = similarity(term_grams, snapshot.word_trigrams[word])
+                    if score >= DOCTOR_SEARCH_MIN_SIMILARITY:
+                        scores[word] = score
+
+        best: Dict[int, float] = {}
+        for word, score in scores.items():
+            for doctor_id, field in snapshot.words[word]:
+                weighted = score * FIELD_WEIGHTS[field]
+                if weighted > best.get(doctor_id, 0.0):
+                    best[doctor_id] = weighted
+        return best
+
+    def search(self, query: str, skip: int = 0, limit: int = 100, specialty: Optional[str] = None,
+               fuzzy: bool = True) -> Tuple[List[SimpleNamespace], int, Dict[str, int]]:
+        """
+        Ranked page of doctors matching every word of ``query`` (prefix, infix or
+        trigram-similar), the total number of matches and specialty facet counts.
+        Facets ignore the ``specialty`` filter so clients can switch between them.
+        """
+        snapshot = self._snapshot
+        scores: Optional[Dict[int, float]] = None
+        for term in normalize(query):
+            matched = self._match_term(snapshot, term, fuzzy)
+            scores = matched if scores is None else {
+                doctor_id: scores[doctor_id] + score for doctor_id, score in matched.items() if doctor_id in scores
+            }
+            if not scores:
+                return [], 0, {}
+        if scores is None:
+            return [], 0, {}
+
+        doctors = snapshot.doctors
+        facets = dict(Counter(doctors[doctor_id].specialty for doctor_id in scores).most_common())
+        if specialty:
+            wanted = specialty.lower()
+            scores = {doctor_id: score for doctor_id, score in scores.items() if doctors[doctor_id].specialty.lower() == wanted}
+        ranked = sorted(scores, key=lambda doctor_id: snapshot.rank_key(doctor_id, scores[doctor_id]))
+        return [doctors[doctor_id] for doctor_id in ranked[skip:skip + limit]], len(ranked), facets
+
+    def typeahead(self, prefix: str, limit: int = 10) -> Tuple[List[SimpleNamespace], List[str]]:
+        """Doctors, and specialties, whose words start with what was typed; only the last word may be partial"""
+        snapshot = self._snapshot
+        terms = normalize(prefix)
+        matches: Optional[Dict[int, float]] = None
+        specialties: Counter = Counter()
+        for i, term in enumerate(terms):
+            last = i == len(terms) - 1
+            found: Dict[int, float] = {}
+            for word in (snapshot.prefixed(term) if last else [term]):
+                for doctor_id, field in snapshot.words.get(word, ()):
+                    score = (EXACT if word == term else PREFIX) * FIELD_WEIGHTS[field]
+                    if score > found.get(doctor_id, 0.0):
+                        found[doctor_id] = score
+                    if last and field == "specialty":
+                        specialties[snapshot.doctors[doctor_id].specialty] += 1
+            matches = found if matches is None else {
+                doctor_id: matches[doctor_id] + score for doctor_id, score in found.items() if doctor_id in matches
+            }
+        if not matches:
+            return [], []
+        ranked = sorted(matches, key=lambda doctor_id: snapshot.rank_key(doctor_id, matches[doctor_id]))[:limit]
+        return [snapshot.doctors[doctor_id] for doctor_id in ranked], [name for name, _ in specialties.most_common(limit)]
+
+
+doctor_search_index = DoctorSearchIndex()
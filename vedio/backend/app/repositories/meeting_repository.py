@@ -1,8 +1,31 @@
+import heapq
+import json
+import logging
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
 from app.models.meeting import MeetingResponse
 
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, a single worker process is assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Append-only JSON-lines log for meetings; empty keeps them in memory only
+MEETING_STORE_PATH = os.getenv("MEETING_STORE_PATH", "")
+# Meetings are dropped this long after their slot day ends
+MEETING_STORE_TTL_HOURS = float(os.getenv("MEETING_STORE_TTL_HOURS", "48"))
+MEETING_STORE_MAX_ENTRIES = int(os.getenv("MEETING_STORE_MAX_ENTRIES", "100000"))
+MEETING_STORE_COMPACT_RATIO = float(os.getenv("MEETING_STORE_COMPACT_RATIO", "2"))
+MEETING_STORE_COMPACT_MIN_RECORDS = 1000
+
 class MeetingRepository(ABC):
     """Abstract repository interface for meeting operations"""
     
@@ -36,43 +59,296 @@ class MeetingRepository(ABC):
         """Delete a meeting by ID"""
         pass
 
-class InMemoryMeetingRepository(MeetingRepository):
-    """In-memory implementation of meeting repository (for development/testing)"""
+class IndexedMeetingRepository(MeetingRepository):
+    """
+    Meeting store with hash indexes by meeting_id, customer and doctor and a
+    created_at-sorted index for range queries.
+
+    Memory is bounded: a meeting is evicted MEETING_STORE_TTL_HOURS after its
+    slot day ends, and the oldest meetings go first once MEETING_STORE_MAX_ENTRIES
+    is reached. With a ``path`` every change is appended to a JSON-lines log that
+    is replayed on start-up and compacted into a snapshot once it holds more than
+    MEETING_STORE_COMPACT_RATIO times as many records as there are live meetings.
+
+    Several worker processes may share one log. Every operation holds a flock on
+    ``<path>.lock`` and first replays what other workers appended since this one
+    last read (or reloads the whole file when another worker compacted it), so no
+    worker serves a stale view or compacts away lines it has not seen. Writes take
+    the lock exclusively; reads share it and skip expired meetings, unless eviction
+    is due, which appends to the log. The async methods run all of this (flock
+    waits, log reads, compaction fsyncs) in the threadpool, off the event loop.
+    """
     
-    def __init__(self):
-        self.meetings: List[MeetingResponse] = []
+    def __init__(self, path: Optional[str] = None, ttl_hours: float = MEETING_STORE_TTL_HOURS,
+                 max_entries: int = MEETING_STORE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours)
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, MeetingResponse] = {}
+        # Insertion-ordered id sets (dict keys), so per-person lists come back oldest first
+        self._by_customer: Dict[str, Dict[str, None]] = {}
+        self._by_doctor: Dict[str, Dict[str, None]] = {}
+        self._by_created: List[Tuple[datetime, str]] = []
+        self._expiry: List[Tuple[datetime, str]] = []
+        self._log = None
+        self._log_records = 0
+        self._lock_file = None
+        # (inode, byte offset) of the log up to which this process has replayed
+        self._log_inode: Optional[int] = None
+        self._log_offset = 0
+        if path:
+            self._load()
     
-    async def create_meeting(self, meeting: MeetingResponse) -> MeetingResponse:
-        """Create a new meeting record in memory"""
-        self.meetings.append(meeting)
+    # ==== Indexes ====
+    
+    def _expires_at(self, meeting: MeetingResponse) -> datetime:
+        try:
+            finished = datetime.strptime(meeting.slot_time, "%Y:%m:%d") + timedelta(days=1)
+        except ValueError:
+            finished = meeting.created_at
+        return max(finished, meeting.created_at) + self.ttl
+    
+    def _index(self, meeting: MeetingResponse):
+        if meeting.meeting_id in self._by_id:
+            self._unindex(meeting.meeting_id)
+        self._by_id[meeting.meeting_id] = meeting
+        self._by_customer.setdefault(meeting.customer_name, {})[meeting.meeting_id] = None
+        self._by_doctor.setdefault(meeting.doctor_name, {})[meeting.meeting_id] = None
+        insort(self._by_created, (meeting.created_at, meeting.meeting_id))
+        heapq.heappush(self._expiry, (self._expires_at(meeting), meeting.meeting_id))
+    
+    def _unindex(self, meeting_id: str) -> Optional[MeetingResponse]:
+        meeting = self._by_id.pop(meeting_id, None)
+        if meeting is None:
+            return None
+        for index, key in ((self._by_customer, meeting.customer_name), (self._by_doctor, meeting.doctor_name)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(meeting_id, None)
+                if not ids:
+                    del index[key]
+        entry = (meeting.created_at, meeting_id)
+        i = bisect_left(self._by_created, entry)
+        if i < len(self._by_created) and self._by_created[i] == entry:
+            del self._by_created[i]
+        # Its expiry heap entry is dropped lazily in _evict
+        return meeting
+    
+    def _eviction_due(self, now: datetime) -> bool:
+        return bool(self._expiry and self._expiry[0][0] <= now) or len(self._by_id) > self.max_entries
+    
+    def _live(self, meetings, now: datetime) -> List[MeetingResponse]:
+        """Drop meetings that expired but have not been evicted yet"""
+        return [meeting for meeting in meetings if self._expires_at(meeting) > now]
+    
+    def _evict(self, now: Optional[datetime] = None):
+        now = now or datetime.now()
+        evicted = []
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, meeting_id = heapq.heappop(self._expiry)
+            meeting = self._by_id.get(meeting_id)
+            # Skip heap entries left behind by deletes and re-inserts
+            if meeting is not None and self._expires_at(meeting) == expires_at:
+                self._unindex(meeting_id)
+                evicted.append(meeting_id)
+        while len(self._by_id) > self.max_entries:
+            _, meeting_id = self._by_created[0]
+            self._unindex(meeting_id)
+            evicted.append(meeting_id)
+        for meeting_id in evicted:
+            self._append({"op": "delete", "meeting_id": meeting_id})
+    
+    # ==== Persistence ====
+    
+    def _load(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock_file = open(f"{self.path}.lock", "a")
+        with self._locked():
+            self._evict()
+            self._compact()
+    
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """Thread lock plus, with a log, the cross-process file lock and a catch-up replay"""
+        with self._lock:
+            if self._lock_file is None:
+                yield
+                return
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._sync(repair=exclusive)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _reading(self, now: datetime):
+        """Shared lock for a read, or an exclusive one when expired meetings are due to be evicted"""
+        with self._lock:
+            evict = self._eviction_due(now)
+            with self._locked(exclusive=evict):
+                if evict:
+                    self._evict(now)
+                yield
+    
+    def _sync(self, repair: bool = True):
+        """Apply records other workers appended; reload from scratch if the log was replaced"""
+        if self._log is not None and os.path.exists(self.path) and os.stat(self.path).st_ino != self._log_inode:
+            self._log.close()
+            self._log = None
+        if self._log is None:
+            # Opening in append mode also recreates a log that was removed
+            self._log = open(self.path, "a", encoding="utf-8")
+            inode = os.fstat(self._log.fileno()).st_ino
+            if inode != self._log_inode:
+                self._reset()
+                self._log_inode = inode
+        with open(self.path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._replay(line)
+        self._log_offset += end
+        if end < len(data) and repair:
+            # A crash left a torn last line; end it so the next record starts on a line of its own.
+            # Only under the exclusive lock: readers sharing it leave the tail for the next writer
+            self._log.write("\n")
+            self._log.flush()
+            self._log_offset += len(data) - end + 1
+    
+    def _replay(self, line: bytes):
+        try:
+            record = json.loads(line)
+            if record["op"] == "put":
+                self._index(MeetingResponse.model_validate(record["meeting"]))
+            else:
+                self._unindex(record["meeting_id"])
+            self._log_records += 1
+        except (ValueError, KeyError) as e:
+            # A torn line from a crash mid-write; everything around it is intact
+            logger.warning(f"Skipping unreadable meeting log record: {e}")
+    
+    def _reset(self):
+        self._by_id.clear()
+        self._by_customer.clear()
+        self._by_doctor.clear()
+        self._by_created.clear()
+        self._expiry.clear()
+        self._log_records = 0
+        self._log_offset = 0
+    
+    def _append(self, record: dict):
+        if self._log is None:
+            return
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._log.write(line)
+        self._log.flush()
+        self._log_offset += len(line.encode("utf-8"))
+        self._log_records += 1
+        if self._log_records > MEETING_STORE_COMPACT_RATIO * max(len(self._by_id), MEETING_STORE_COMPACT_MIN_RECORDS):
+            self._compact()
+    
+    def _compact(self):
+        """Rewrite the log as a snapshot of the live meetings (atomic rename; caller holds the file lock)"""
+        if self._log is not None:
+            self._log.close()
+        tmp_path = f"{self.path}.tmp"
+        size = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for _, meeting_id in self._by_created:
+                meeting = self._by_id[meeting_id]
+                line = json.dumps({"op": "put", "meeting": meeting.model_dump(mode="json")}, separators=(",", ":")) + "\n"
+                f.write(line)
+                size += len(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._log_records = len(self._by_id)
+        self._log = open(self.path, "a", encoding="utf-8")
+        self._log_inode = os.fstat(self._log.fileno()).st_ino
+        self._log_offset = size
+    
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+    
+    # ==== Repository interface ====
+    
+    def _create(self, meeting: MeetingResponse) -> MeetingResponse:
+        with self._locked():
+            self._index(meeting)
+            self._append({"op": "put", "meeting": meeting.model_dump(mode="json")})
+            self._evict()
         return meeting
     
+    def _get(self, meeting_id: str) -> Optional[MeetingResponse]:
+        now = datetime.now()
+        with self._reading(now):
+            meeting = self._by_id.get(meeting_id)
+            return meeting if meeting is not None and self._expires_at(meeting) > now else None
+    
+    def _get_many(self, index: Dict[str, Dict[str, None]], key: str) -> List[MeetingResponse]:
+        now = datetime.now()
+        with self._reading(now):
+            return self._live((self._by_id[meeting_id] for meeting_id in index.get(key, ())), now)
+    
+    def _get_range(self, start_date: datetime, end_date: datetime) -> List[MeetingResponse]:
+        now = datetime.now()
+        with self._reading(now):
+            lo = bisect_left(self._by_created, (start_date, ""))
+            hi = bisect_right(self._by_created, (end_date, "\uffff"))
+            return self._live((self._by_id[meeting_id] for _, meeting_id in self._by_created[lo:hi]), now)
+    
+    def _delete(self, meeting_id: str) -> bool:
+        with self._locked():
+            if self._unindex(meeting_id) is None:
+                return False
+            self._append({"op": "delete", "meeting_id": meeting_id})
+            return True
+    
+    async def create_meeting(self, meeting: MeetingResponse) -> MeetingResponse:
+        """Store a meeting (replacing one with the same meeting_id)"""
+        return await run_in_threadpool(self._create, meeting)
+    
     async def get_meeting_by_id(self, meeting_id: str) -> Optional[MeetingResponse]:
-        """Get meeting by ID from memory"""
-        for meeting in self.meetings:
-            if meeting.meeting_id == meeting_id:
-                return meeting
-        return None
+        """Get meeting by ID"""
+        return await run_in_threadpool(self._get, meeting_id)
     
     async def get_meetings_by_customer(self, customer_name: str) -> List[MeetingResponse]:
-        """Get all meetings for a customer from memory"""
-        return [meeting for meeting in self.meetings if meeting.customer_name == customer_name]
+        """Get all meetings for a customer, oldest first"""
+        return await run_in_threadpool(self._get_many, self._by_customer, customer_name)
     
     async def get_meetings_by_doctor(self, doctor_name: str) -> List[MeetingResponse]:
-        """Get all meetings for a doctor from memory"""
-        return [meeting for meeting in self.meetings if meeting.doctor_name == doctor_name]
+        """Get all meetings for a doctor, oldest first"""
+        return await run_in_threadpool(self._get_many, self._by_doctor, doctor_name)
     
     async def get_meetings_by_date_range(self, start_date: datetime, end_date: datetime) -> List[MeetingResponse]:
-        """Get meetings within a date range from memory"""
-        return [
-            meeting for meeting in self.meetings 
-            if start_date <= meeting.created_at <= end_date
-        ]
+        """Get meetings created within [start_date, end_date], oldest first"""
+        return await run_in_threadpool(self._get_range, start_date, end_date)
     
     async def delete_meeting(self, meeting_id: str) -> bool:
-        """Delete a meeting by ID from memory"""
-        for i, meeting in enumerate(self.meetings):
-            if meeting.meeting_id == meeting_id:
-                del self.meetings[i]
-                return True
-        return False 
\ No newline at end of file
+        """Delete a meeting by ID"""
+        return await run_in_threadpool(self._delete, meeting_id)
+    
+    def stats(self) -> dict:
+        with self._locked(exclusive=False):
+            return {
+                "meetings": len(self._by_id),
+                "customers": len(self._by_customer),
+                "doctors": len(self._by_doctor),
+                "persistent": self.path is not None,
+                "log_records": self._log_records
+            }
+
+
+# Shared by every request in this process
+meeting_store = IndexedMeetingRepository(MEETING_STORE_PATH or None)
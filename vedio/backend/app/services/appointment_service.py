@@ -1,9 +1,12 @@
+import hashlib
+import json
+import os
 import secrets
 import string
-from datetime import date, datetime
-from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional
 from sqlalchemy.orm import Session
-from app.repositories.appointment_repository import AppointmentRepository
+from app.repositories.appointment_repository import AppointmentRepository, SlotUnavailableError
 from app.repositories.doctor_repository import DoctorRepository
 from app.repositories.patient_repository import PatientRepository
 from app.dto.appointment_dto import (
@@ -11,14 +14,26 @@ from app.dto.appointment_dto import (
     AppointmentUpdateDTO, 
     AppointmentResponseDTO,
     DoctorAvailabilityDTO,
+    DoctorDayAvailabilityDTO,
+    AvailabilityRangeDTO,
+    FirstFreeSlotDTO,
     TimeSlotDTO
 )
-from app.utils.email_utils import send_appointment_details_email, send_alert_to_admin
+from app.repositories.availability_repository import FULL_DAY_MASK, slots_from_mask
+from app.repositories.calendar_feed_repository import DOCTOR, PATIENT
+from app.services.calendar_feed_service import make_feed_token
+from app.utils.email_utils import send_appointment_details_email, send_alert_to_admin, send_calendar_feed_email
 from app.models.appointment import Appointment
 import logging
 
 logger = logging.getLogger(__name__)
 
+BOOKED_SLOTS_DEFAULT_DAYS = int(os.getenv("BOOKED_SLOTS_DEFAULT_DAYS", "30"))
+BOOKED_SLOTS_MAX_DAYS = int(os.getenv("BOOKED_SLOTS_MAX_DAYS", "92"))
+BOOKED_SLOTS_CHANGES_OVERLAP = int(os.getenv("BOOKED_SLOTS_CHANGES_OVERLAP", "5"))
+# Extra slots tried when the requested one is taken and the caller asked for the next free one
+BOOKING_MAX_SLOT_RETRIES = int(os.getenv("BOOKING_MAX_SLOT_RETRIES", "3"))
+
 class AppointmentService:
     """Service for appointment business logic"""
     
@@ -36,20 +51,12 @@ class AppointmentService:
             if not doctor:
                 raise ValueError(f"Doctor with ID {appointment_data.doctor_id} not found")
             
-            # Check availability
-            if not self.appointment_repo.check_availability(
-                appointment_data.doctor_id, 
-                appointment_data.appointment_date, 
-                appointment_data.time_slot
-            ):
-                raise ValueError(f"Time slot {appointment_data.time_slot} is not available for the selected date")
-            
             # Generate unique meeting link and passcode
             meeting_link = self._generate_meeting_link(doctor.name, appointment_data.patient_name)
             passcode = self._generate_passcode()
             
-            # Create appointment
-            appointment = self.appointment_repo.create(appointment_data, meeting_link, passcode)
+            # Create appointment; the insert itself fails if the slot is taken
+            appointment = self._book_slot(appointment_data, meeting_link, passcode)
             
             # Send emails with proper error handling
             self._send_appointment_emails(appointment, doctor)
@@ -75,16 +82,7 @@ class AppointmentService:
         if not appointment:
             return None
         
-        # If date or time is being changed, check availability
-        if appointment_data.appointment_date or appointment_data.time_slot:
-            new_date = appointment_data.appointment_date or appointment.date.strftime("%Y-%m-%d")
-            new_time = appointment_data.time_slot or appointment.time_slot
-            
-            if not self.appointment_repo.check_availability(
-                appointment.doctor_id, new_date, new_time
-            ):
-                raise ValueError(f"Time slot {new_time} is not available for the selected date")
-        
+        # A move onto a taken slot is rejected by the unique index (SlotUnavailableError)
         updated_appointment = self.appointment_repo.update(appointment_id, appointment_data)
         if not updated_appointment:
             return None
@@ -101,28 +99,127 @@ class AppointmentService:
         doctor = self.doctor_repo.get_by_id(appointment.doctor_id)
         return self._appointment_to_response_dto(appointment, doctor)
     
+    def send_calendar_feed_links(self, appointment_id: int, feed_url: Callable[[str], str]) -> Optional[dict]:
+        """
+        Email the appointment's doctor and patient each their own feed URL (see /calendar/{token}.ics).
+
+        Links are never returned to the caller: a feed token is a permanent credential,
+        so it only goes to the mailbox of the person it belongs to.
+        """
+        appointment = self.appointment_repo.get_by_id(appointment_id)
+        if not appointment:
+            return None
+        doctor = self.doctor_repo.get_by_id(appointment.doctor_id)
+        patient = self.patient_repo.get_by_id(appointment.patient_id)
+        sent = {}
+        for owner, person in ((DOCTOR, doctor), (PATIENT, patient)):
+            if person is None or not person.email:
+                sent[owner] = False
+                continue
+            url = feed_url(make_feed_token(owner, person.id))
+            sent[owner] = send_calendar_feed_email(person.email, person.name, url)
+        return sent
+    
     def get_doctor_availability(self, doctor_id: int, appointment_date: str) -> DoctorAvailabilityDTO:
         """Get available time slots for a doctor on a specific date"""
         try:
-            # Get available and booked slots
-            available_slots = self.appointment_repo.get_available_slots(doctor_id, appointment_date)
-            booked_slots = self.appointment_repo.get_booked_slots(doctor_id, appointment_date)
+            # One booked mask gives both lists
+            masks = self.appointment_repo.availability.booked_masks([doctor_id], appointment_date)
+            booked = next(iter(masks.values()))
             
             return DoctorAvailabilityDTO(
                 doctor_id=doctor_id,
                 appointment_date=appointment_date,
-                available_slots=available_slots,
-                booked_slots=booked_slots
+                available_slots=slots_from_mask(FULL_DAY_MASK & ~booked),
+                booked_slots=slots_from_mask(booked)
             )
             
         except Exception as e:
             logger.error(f"❌ Error getting doctor availability: {str(e)}")
             raise Exception(f"Error getting doctor availability: {str(e)}")
 
-    def get_all_booked_slots(self) -> List[dict]:
-        """Get all booked slots for frontend"""
+    def _resolve_doctor_ids(self, doctor_ids: Optional[List[int]], specialty: Optional[str]) -> List[int]:
+        if doctor_ids:
+            return doctor_ids
+        if specialty:
+            return [doctor.id for doctor in self.doctor_repo.get_by_specialty(specialty, limit=1000)]
+        raise ValueError("Provide doctor_ids or specialty")
+    
+    def get_availability_range(self, start_date: str, end_date: str, doctor_ids: Optional[List[int]] = None,
+                               specialty: Optional[str] = None) -> AvailabilityRangeDTO:
+        """Free slots for several doctors over several days in one lookup"""
+        start, end = self._parse_range(start_date, end_date)
+        ids = self._resolve_doctor_ids(doctor_ids, specialty)
+        free = self.appointment_repo.availability.free_masks(ids, start, end, not_before=datetime.now())
+        days = [
+            DoctorDayAvailabilityDTO(
+                doctor_id=doctor_id,
+                appointment_date=day.strftime("%Y-%m-%d"),
+                available_slots=slots_from_mask(mask)
+            )
+            for (doctor_id, day), mask in sorted(free.items(), key=lambda item: (item[0][1], item[0][0]))
+        ]
+        return AvailabilityRangeDTO(start_date=start_date, end_date=end_date, days=days)
+    
+    def find_first_free_slot(self, start_date: str, end_date: str, doctor_ids: Optional[List[int]] = None,
+                             specialty: Optional[str] = None) -> Optional[FirstFreeSlotDTO]:
+        """Earliest free slot for any of the doctors (e.g. any dermatologist this week)"""
+        start, end = self._parse_range(start_date, end_date)
+        ids = self._resolve_doctor_ids(doctor_ids, specialty)
+        found = self.appointment_repo.availability.first_free_slot(ids, start, end, not_before=datetime.now())
+        if not found:
+            return None
+        doctor_id, day, time_slot = found
+        doctor = self.doctor_repo.get_by_id(doctor_id)
+        return FirstFreeSlotDTO(
+            doctor_id=doctor_id,
+            doctor_name=doctor.name if doctor else "",
+            appointment_date=day.strftime("%Y-%m-%d"),
+            time_slot=time_slot
+        )
+    
+    def _parse_range(self, start_date: str, end_date: str, max_days: int = 31):
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        if end < start:
+            raise ValueError("end_date must not be before start_date")
+        if (end - start).days > max_days:
+            raise ValueError(f"Date range is limited to {max_days} days")
+        return start, end
+
+    def get_booked_slots_feed(self, doctor_id: Optional[int] = None, start_date: Optional[str] = None,
+                              end_date: Optional[str] = None, since: Optional[str] = None) -> dict:
+        """
+        Booked slots for the visible calendar window (default: the next BOOKED_SLOTS_DEFAULT_DAYS days).
+        
+        With ``since`` only the slots changed after that time are returned, each with
+        a ``booked`` flag; poll again with the returned ``as_of``.
+        """
         try:
-            return self.appointment_repo.get_all_booked_slots()
+            today = date.today()
+            start_date = start_date or today.strftime("%Y-%m-%d")
+            end_date = end_date or (today + timedelta(days=BOOKED_SLOTS_DEFAULT_DAYS)).strftime("%Y-%m-%d")
+            start, end = self._parse_range(start_date, end_date, max_days=BOOKED_SLOTS_MAX_DAYS)
+            doctor_ids = [doctor_id] if doctor_id else [doctor.id for doctor in self.doctor_repo.get_all(limit=1000)]
+            as_of = datetime.now(timezone.utc)
+            
+            if since:
+                # Overlap the previous poll a little so a commit that raced it is not missed; re-applying is harmless
+                since_dt = datetime.fromisoformat(since) - timedelta(seconds=BOOKED_SLOTS_CHANGES_OVERLAP)
+                changes = self.appointment_repo.get_booked_slot_changes(doctor_ids, start, end, since_dt)
+                return {"changes": changes, "as_of": as_of.isoformat()}
+            
+            booked_slots = self.appointment_repo.get_booked_slots_feed(doctor_ids, start, end)
+            etag = hashlib.sha1(json.dumps(booked_slots, separators=(",", ":")).encode()).hexdigest()
+            return {
+                "booked_slots": booked_slots,
+                "start_date": start_date,
+                "end_date": end_date,
+                "as_of": as_of.isoformat(),
+                "etag": f'"{etag}"'
+            }
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error getting booked slots: {str(e)}")
             raise Exception(f"Error getting booked slots: {str(e)}")
@@ -149,6 +246,36 @@ class AppointmentService:
         
         return result
     
+    def _book_slot(self, appointment_data: AppointmentCreateDTO, meeting_link: str, passcode: str) -> Appointment:
+        """Insert the appointment, falling back to the next free slots that day when asked to"""
+        try:
+            return self.appointment_repo.create(appointment_data, meeting_link, passcode)
+        except SlotUnavailableError:
+            next_slots = self._next_free_slots(appointment_data)
+            if not appointment_data.book_next_free:
+                raise SlotUnavailableError(appointment_data.time_slot, next_slots[0] if next_slots else None)
+        
+        # Looked up only after a conflict, so the common path stays a single INSERT
+        for time_slot in next_slots[:BOOKING_MAX_SLOT_RETRIES]:
+            try:
+                return self.appointment_repo.create(
+                    appointment_data.model_copy(update={"time_slot": time_slot}), meeting_link, passcode
+                )
+            except SlotUnavailableError:
+                continue
+        remaining = self._next_free_slots(appointment_data)
+        raise SlotUnavailableError(appointment_data.time_slot, remaining[0] if remaining else None)
+    
+    def _next_free_slots(self, appointment_data: AppointmentCreateDTO) -> List[str]:
+        masks = self.appointment_repo.availability.free_masks(
+            [appointment_data.doctor_id], appointment_data.appointment_date,
+            not_before=datetime.now(), use_cache=False
+        )
+        return [
+            slot for slot in slots_from_mask(next(iter(masks.values())))
+            if slot > appointment_data.time_slot
+        ]
+    
     def _generate_meeting_link(self, doctor_name: str, patient_name: str) -> str:
         """Generate unique meeting link"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,132 @@
+import hashlib
+import hmac
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.repositories.calendar_feed_repository import (
+    DOCTOR, PATIENT, CalendarFeed, CalendarFeedCache, CalendarFeedRepository, calendar_feed_cache
+)
+from app.utils.ics_utils import render_event, render_feed
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Feed tokens are signed with this; it must be the same on every worker and survive restarts,
+# so feeds are disabled rather than signed with a per-process random key when it is unset
+CALENDAR_FEED_SECRET = os.getenv("CALENDAR_FEED_SECRET", "")
+if not CALENDAR_FEED_SECRET:
+    logger.warning("CALENDAR_FEED_SECRET not set; calendar feeds are disabled")
+
+# How long a cached feed is served without asking the database whether anything changed.
+# Writes through AppointmentRepository mark the feed stale at once; this only bounds how
+# long other workers' writes take to show up.
+CALENDAR_FEED_RECHECK_SECONDS = float(os.getenv("CALENDAR_FEED_RECHECK_SECONDS", "300"))
+CALENDAR_FEED_PAST_DAYS = int(os.getenv("CALENDAR_FEED_PAST_DAYS", "30"))
+CALENDAR_FEED_MAX_EVENTS = int(os.getenv("CALENDAR_FEED_MAX_EVENTS", "500"))
+
+OWNER_PREFIXES = {DOCTOR: "d", PATIENT: "p"}
+TOKEN_PATTERN = re.compile(r"^([dp])(\d+)-([0-9a-f]{32})$")
+
+
+class CalendarFeedsDisabledError(Exception):
+    """Calendar feeds are unavailable because CALENDAR_FEED_SECRET is not configured"""
+
+
+def calendar_feeds_enabled() -> bool:
+    return bool(CALENDAR_FEED_SECRET)
+
+
+def _signature(owner: str, owner_id: int) -> str:
+    message = f"calendar-feed:{owner}:{owner_id}".encode()
+    return hmac.new(CALENDAR_FEED_SECRET.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def make_feed_token(owner: str, owner_id: int) -> str:
+    """Unguessable, stateless feed token for a doctor or patient"""
+    if not calendar_feeds_enabled():
+        raise CalendarFeedsDisabledError("CALENDAR_FEED_SECRET is not set")
+    return f"{OWNER_PREFIXES[owner]}{owner_id}-{_signature(owner, owner_id)}"
+
+
+def parse_feed_token(token: str) -> Optional[Tuple[str, int]]:
+    """(owner kind, owner id) for a valid token, else None; needs no database lookup"""
+    if not calendar_feeds_enabled():
+        return None
+    match = TOKEN_PATTERN.match(token)
+    if not match:
+        return None
+    owner = DOCTOR if match.group(1) == "d" else PATIENT
+    owner_id = int(match.group(2))
+    if not hmac.compare_digest(match.group(3), _signature(owner, owner_id)):
+        return None
+    return owner, owner_id
+
+
+class CalendarFeedService:
+    """
+    Per-doctor and per-patient iCalendar feeds.
+
+    A rendered feed is cached per owner and served without touching the database
+    until it is marked stale by a write or CALENDAR_FEED_RECHECK_SECONDS pass. A
+    recheck reads only (id, version) for the owner's window; when that matches,
+    the cached body and ETag are kept, otherwise only new or changed events are
+    rendered and the rest are reused.
+    """
+
+    def __init__(self, db: Session, cache: CalendarFeedCache = calendar_feed_cache):
+        self.db = db
+        self.cache = cache
+        self.feed_repo = CalendarFeedRepository(db)
+
+    def get_feed(self, owner: str, owner_id: int) -> CalendarFeed:
+        feed = self.cache.get((owner, owner_id))
+        if feed is not None and not feed.stale and time.monotonic() - feed.checked_at < CALENDAR_FEED_RECHECK_SECONDS:
+            return feed
+
+        since = datetime.combine(date.today() - timedelta(days=CALENDAR_FEED_PAST_DAYS), datetime.min.time())
+        versions = self.feed_repo.event_versions(owner, owner_id, since, CALENDAR_FEED_MAX_EVENTS)
+        previous = feed.events if feed is not None else {}
+
+        changed = {appointment_id for appointment_id, version in versions
+                   if previous.get(appointment_id, (None,))[0] != version}
+        if feed is not None and not changed and len(previous) == len(versions):
+            feed.checked_at = time.monotonic()
+            feed.stale = False
+            return feed
+
+        events = {appointment_id: previous[appointment_id] for appointment_id, _ in versions
+                  if appointment_id not in changed}
+        version_of = dict(versions)
+        for appointment, doctor_name, patient_name in self.feed_repo.get_events(sorted(changed)):
+            changed_at = appointment.updated_at or appointment.created_at
+            description = (
+                f"Virtual consultation with {patient_name}" if owner == DOCTOR
+                else f"Virtual consultation with {doctor_name}"
+            )
+            events[appointment.id] = (
+                version_of[appointment.id],
+                render_event(appointment, stamp=self._stamp(changed_at), description=description)
+            )
+
+        ordered = [events[appointment_id][1] for appointment_id, _ in versions if appointment_id in events]
+        body = render_feed(ordered, name="Oliva Clinic Appointments")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if feed is not None and feed.etag == etag:
+            last_modified = feed.last_modified
+        else:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        feed = CalendarFeed(body, etag, last_modified, events)
+        self.cache.set((owner, owner_id), feed)
+        return feed
+
+    @staticmethod
+    def _stamp(changed_at: Optional[datetime]) -> Optional[str]:
+        # DTSTAMP is the event's last change, so a re-rendered but unchanged event keeps its bytes
+        if changed_at is None:
+            return None
+        if changed_at.tzinfo is None:
+            changed_at = changed_at.replace(tzinfo=timezone.utc)
+        return changed_at.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
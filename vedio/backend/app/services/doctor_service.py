@@ -5,7 +5,10 @@ from app.dto.doctor_dto import (
     DoctorCreateDTO, 
     DoctorUpdateDTO, 
     DoctorResponseDTO,
-    DoctorListResponseDTO
+    DoctorListResponseDTO,
+    DoctorSearchResponseDTO,
+    DoctorSuggestionDTO,
+    DoctorTypeaheadResponseDTO
 )
 
 class DoctorService:
@@ -65,18 +68,30 @@ class DoctorService:
         """Soft delete doctor (set as inactive)"""
         return self.doctor_repo.delete(doctor_id)
     
-    def search_doctors(self, query: str, skip: int = 0, limit: int = 100) -> DoctorListResponseDTO:
-        """Search doctors by name or specialty"""
-        doctors = self.doctor_repo.search(query, skip, limit)
-        total = len(doctors)  # For search, we get all results and count
+    def search_doctors(self, query: str, skip: int = 0, limit: int = 100,
+                       specialty: Optional[str] = None) -> DoctorSearchResponseDTO:
+        """Ranked search over doctor name and specialty, with specialty facets"""
+        doctors, total, facets = self.doctor_repo.search_ranked(query, skip, limit, specialty)
         
         doctor_dtos = [self._doctor_to_response_dto(doctor) for doctor in doctors]
         
-        return DoctorListResponseDTO(
+        return DoctorSearchResponseDTO(
             doctors=doctor_dtos,
             total=total,
             page=skip // limit + 1,
-            size=limit
+            size=limit,
+            facets=facets
+        )
+    
+    def typeahead(self, prefix: str, limit: int = 10) -> DoctorTypeaheadResponseDTO:
+        """Suggestions while the user is typing a search"""
+        doctors, specialties = self.doctor_repo.typeahead(prefix, limit)
+        return DoctorTypeaheadResponseDTO(
+            doctors=[
+                DoctorSuggestionDTO(id=doctor.id, name=doctor.name, specialty=doctor.specialty, photo_url=doctor.photo_url)
+                for doctor in doctors
+            ],
+            specialties=specialties
         )
     
     def get_doctors_by_specialty(self, specialty: str, skip: int = 0, limit: int = 100) -> DoctorListResponseDTO:
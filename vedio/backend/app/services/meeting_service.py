@@ -5,14 +5,14 @@ from typing import Optional, List
 from app.config.settings import settings
 from app.utils.validators import sanitize_name, validate_meeting_request
 from app.models.meeting import MeetingRequest, MeetingResponse
-from app.repositories.meeting_repository import MeetingRepository, InMemoryMeetingRepository
+from app.repositories.meeting_repository import MeetingRepository, meeting_store
 
 class MeetingService:
     """Service for handling meeting-related operations"""
     
     def __init__(self, repository: MeetingRepository = None):
         """Initialize service with repository dependency injection"""
-        self.repository = repository or InMemoryMeetingRepository()
+        self.repository = repository or meeting_store
     
     @staticmethod
     def generate_meeting_id(customer_name: str, doctor_name: str) -> str:
@@ -8,7 +8,7 @@ import logging
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -16,6 +16,8 @@ from email.mime.base import MIMEBase
 from email import encoders
 import base64
 
+from app.utils.ics_utils import generate_ics_bytes
+
 logger = logging.getLogger(__name__)
 
 # SendGrid Configuration (Primary)
@@ -54,7 +56,20 @@ class EmailConfig:
 # Global email config
 email_config = EmailConfig()
 
-def send_email_sendgrid(to_email: str, subject: str, body: str, attachment_path: Optional[str] = None) -> bool:
+# In-memory attachment: (filename, content)
+Attachment = Tuple[str, bytes]
+
+
+def _read_attachment(attachment_path: Optional[str], attachment: Optional[Attachment]) -> Optional[Attachment]:
+    if attachment:
+        return attachment
+    if attachment_path and os.path.exists(attachment_path):
+        with open(attachment_path, "rb") as f:
+            return os.path.basename(attachment_path), f.read()
+    return None
+
+def send_email_sendgrid(to_email: str, subject: str, body: str, attachment_path: Optional[str] = None,
+                        attachment: Optional[Attachment] = None) -> bool:
     """Send email using SendGrid API with template"""
     try:
         if not SENDGRID_API_KEY:
@@ -82,20 +97,18 @@ def send_email_sendgrid(to_email: str, subject: str, body: str, attachment_path:
             "template_id": SENDGRID_TEMPLATE_ID
         }
         
-        # Add attachment if provided (ICS file)
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, "rb") as f:
-                attachment_content = f.read()
-                attachment_encoded = base64.b64encode(attachment_content).decode()
-                
-                email_data["attachments"] = [
-                    {
-                        "content": attachment_encoded,
-                        "filename": os.path.basename(attachment_path),
-                        "type": "text/calendar",
-                        "disposition": "attachment"
-                    }
-                ]
+        # Add attachment if provided (ICS invite)
+        attachment = _read_attachment(attachment_path, attachment)
+        if attachment:
+            filename, content = attachment
+            email_data["attachments"] = [
+                {
+                    "content": base64.b64encode(content).decode(),
+                    "filename": filename,
+                    "type": "text/calendar",
+                    "disposition": "attachment"
+                }
+            ]
         
         # Send via SendGrid API
         headers = {
@@ -117,7 +130,8 @@ def send_email_sendgrid(to_email: str, subject: str, body: str, attachment_path:
         logger.error(f"❌ SendGrid email failed to {to_email}: {str(e)}")
         return False
 
-def send_email_gmail(to_email: str, subject: str, body: str, attachment_path: Optional[str] = None) -> bool:
+def send_email_gmail(to_email: str, subject: str, body: str, attachment_path: Optional[str] = None,
+                     attachment: Optional[Attachment] = None) -> bool:
     """Send email using Gmail SMTP (fallback)"""
     try:
         if not GMAIL_PASSWORD:
@@ -131,17 +145,18 @@ def send_email_gmail(to_email: str, subject: str, body: str, attachment_path: Op
         
         msg.attach(MIMEText(body, 'html'))
         
-        # Add attachment if provided (ICS file)
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, "rb") as attachment:
-                part = MIMEBase('text', 'calendar')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {os.path.basename(attachment_path)}'
-                )
-                msg.attach(part)
+        # Add attachment if provided (ICS invite)
+        attachment = _read_attachment(attachment_path, attachment)
+        if attachment:
+            filename, content = attachment
+            part = MIMEBase('text', 'calendar')
+            part.set_payload(content)
+            encoders.encode_base64(part)
+            part.add_header(
+                'Content-Disposition',
+                f'attachment; filename= {filename}'
+            )
+            msg.attach(part)
         
         server = smtplib.SMTP("smtp.gmail.com", 587)
         server.starttls()
@@ -157,14 +172,15 @@ def send_email_gmail(to_email: str, subject: str, body: str, attachment_path: Op
         logger.error(f"❌ Failed to send Gmail email to {to_email}: {str(e)}")
         return False
 
-def send_email_with_fallback(to_email: str, subject: str, body, attachment_path: Optional[str] = None) -> bool:
+def send_email_with_fallback(to_email: str, subject: str, body, attachment_path: Optional[str] = None,
+                             attachment: Optional[Attachment] = None) -> bool:
     """Send email with automatic fallback between providers"""
     providers = [email_config.primary_provider, email_config.fallback_provider]
     
     for provider in providers:
         try:
             if provider == "sendgrid":
-                if send_email_sendgrid(to_email, subject, body, attachment_path):
+                if send_email_sendgrid(to_email, subject, body, attachment_path, attachment):
                     return True
             elif provider == "gmail":
                 # For Gmail fallback, convert template data to HTML if needed
@@ -183,7 +199,7 @@ def send_email_with_fallback(to_email: str, subject: str, body, attachment_path:
                 else:
                     html_body = body
                 
-                if send_email_gmail(to_email, subject, html_body, attachment_path):
+                if send_email_gmail(to_email, subject, html_body, attachment_path, attachment):
                     return True
         except Exception as e:
             logger.warning(f"⚠️ {provider} email failed, trying next provider: {str(e)}")
@@ -192,61 +208,6 @@ def send_email_with_fallback(to_email: str, subject: str, body, attachment_path:
     logger.error(f"❌ All email providers failed for {to_email}")
     return False
 
-def generate_ics_file(appointment) -> str:
-    """Generate .ics calendar invite file"""
-    try:
-        from datetime import datetime, timedelta
-        
-        # Format appointment details
-        appointment_date = appointment.date
-        time_slot = appointment.time_slot
-        
-        # Parse time slot (e.g., "10:00" -> 10:00)
-        hour, minute = map(int, time_slot.split(':'))
-        start_time = datetime.combine(appointment_date, datetime.min.time().replace(hour=hour, minute=minute))
-        end_time = start_time + timedelta(minutes=30)  # 30-minute appointment
-        
-        # Create .ics content
-        ics_content = f"""BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:-//Oliva Clinic//Appointment//EN
-CALSCALE:GREGORIAN
-METHOD:REQUEST
-BEGIN:VEVENT
-UID:{appointment.meeting_link.split('/')[-1]}
-DTSTART:{start_time.strftime('%Y%m%dT%H%M%S')}
-DTEND:{end_time.strftime('%Y%m%dT%H%M%S')}
-DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}
-ORGANIZER;CN=Oliva Clinic:mailto:akash.manda@olivaclinic.com
-SUMMARY:Oliva Clinic Appointment
-DESCRIPTION:Virtual consultation with {getattr(appointment, 'doctor_name', 'Doctor')}
-LOCATION:{appointment.meeting_link}
-STATUS:CONFIRMED
-SEQUENCE:0
-BEGIN:VALARM
-TRIGGER:-PT10M
-DESCRIPTION:Reminder
-ACTION:DISPLAY
-END:VALARM
-END:VEVENT
-END:VCALENDAR"""
-        
-        # Save to temporary file
-        ics_filename = f"appointment_{appointment.id}.ics"
-        ics_path = os.path.join("/tmp", ics_filename)
-        
-        # Create temp directory if it doesn't exist
-        os.makedirs("/tmp", exist_ok=True)
-        
-        with open(ics_path, "w", encoding="utf-8") as f:
-            f.write(ics_content)
-        
-        return ics_path
-        
-    except Exception as e:
-        logger.error(f"❌ Failed to generate .ics file: {str(e)}")
-        return None
-
 def send_appointment_details_email(patient_email: str, doctor_email: str, appointment) -> bool:
     """Send appointment confirmation emails to both patient and doctor with calendar invite"""
     try:
@@ -269,8 +230,12 @@ def send_appointment_details_email(patient_email: str, doctor_email: str, appoin
         else:
             time_display = "TBD"
         
-        # Generate calendar invite
-        ics_path = generate_ics_file(appointment)
+        # Render the calendar invite once, in memory, for both recipients
+        try:
+            invite = (f"appointment_{appointment.id}.ics", generate_ics_bytes(appointment))
+        except Exception as e:
+            logger.error(f"❌ Failed to generate .ics invite: {str(e)}")
+            invite = None
         
         # Prepare template data
         template_data = {
@@ -290,8 +255,8 @@ def send_appointment_details_email(patient_email: str, doctor_email: str, appoin
         doctor_subject = f"New Appointment - {appointment_date}"
         
         # Send emails with template data
-        patient_sent = send_email_with_fallback(patient_email, patient_subject, template_data, ics_path)
-        doctor_sent = send_email_with_fallback(doctor_email, doctor_subject, template_data, ics_path)
+        patient_sent = send_email_with_fallback(patient_email, patient_subject, template_data, attachment=invite)
+        doctor_sent = send_email_with_fallback(doctor_email, doctor_subject, template_data, attachment=invite)
         
         return patient_sent and doctor_sent
         
@@ -368,6 +333,40 @@ def send_reminder_email(patient_email: str, doctor_email: str, appointment) -> b
         logger.error(f"❌ Failed to send reminder emails: {str(e)}")
         return False
 
+def send_calendar_feed_email(to_email: str, recipient_name: str, feed_url: str) -> bool:
+    """Email a doctor or patient the subscription link of their own appointment calendar"""
+    try:
+        subject = "Your Oliva Clinic appointment calendar"
+        body = f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Appointment Calendar</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+        .content {{ background: #f9f9f9; padding: 20px; border-radius: 10px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="content">
+            <p>Hello {recipient_name},</p>
+            <p>Subscribe to this link in Google Calendar, Outlook or Apple Calendar to see your Oliva Clinic
+            appointments, kept up to date automatically:</p>
+            <p><a href="{feed_url}">{feed_url}</a></p>
+            <p>The link is personal; do not share it.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+        return send_email_with_fallback(to_email, subject, body)
+    except Exception as e:
+        logger.error(f"❌ Failed to send calendar feed email to {to_email}: {str(e)}")
+        return False
+
 def send_alert_to_admin(message: str) -> bool:
     """Send alert to admin about system issues"""
     try:
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+In-memory .ics rendering for appointment invites and calendar feeds
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable
+from zoneinfo import ZoneInfo
+
+# Resolved once; appointment dates and time slots are clinic-local
+CLINIC_TIMEZONE = ZoneInfo(os.getenv("CLINIC_TIMEZONE", "Asia/Kolkata"))
+APPOINTMENT_DURATION_MINUTES = int(os.getenv("APPOINTMENT_DURATION_MINUTES", "30"))
+ORGANIZER_EMAIL = "akash.manda@olivaclinic.com"
+
+CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//Oliva Clinic//Appointment//EN\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+    "METHOD:{method}\r\n"
+    "X-WR-CALNAME:{name}\r\n"
+)
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+EVENT_TEMPLATE = (
+    "BEGIN:VEVENT\r\n"
+    "UID:{uid}\r\n"
+    "DTSTART:{start}\r\n"
+    "DTEND:{end}\r\n"
+    "DTSTAMP:{stamp}\r\n"
+    "ORGANIZER;CN=Oliva Clinic:mailto:" + ORGANIZER_EMAIL + "\r\n"
+    "SUMMARY:Oliva Clinic Appointment\r\n"
+    "DESCRIPTION:{description}\r\n"
+    "LOCATION:{location}\r\n"
+    "STATUS:{status}\r\n"
+    "SEQUENCE:{sequence}\r\n"
+    "BEGIN:VALARM\r\n"
+    "TRIGGER:-PT10M\r\n"
+    "DESCRIPTION:Reminder\r\n"
+    "ACTION:DISPLAY\r\n"
+    "END:VALARM\r\n"
+    "END:VEVENT\r\n"
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(text: str) -> str:
+    """Fold content lines longer than 75 octets (RFC 5545 3.1)"""
+    lines = []
+    for line in text.split("\r\n"):
+        if len(line.encode("utf-8")) <= 75:
+            lines.append(line)
+            continue
+        chunks, chunk = [], b""
+        for char in line:
+            encoded = char.encode("utf-8")
+            if len(chunk) + len(encoded) > (75 if not chunks else 74):
+                chunks.append(chunk.decode("utf-8"))
+                chunk = b""
+            chunk += encoded
+        chunks.append(chunk.decode("utf-8"))
+        lines.append("\r\n ".join(chunks))
+    return "\r\n".join(lines)
+
+
+def _stamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_event(appointment, stamp: str = None, description: str = None) -> str:
+    """One folded VEVENT for an appointment (date + "HH:MM" time_slot)"""
+    hour, minute = map(int, appointment.time_slot.split(":"))
+    start = datetime.combine(appointment.date, datetime.min.time()).replace(
+        hour=hour, minute=minute, tzinfo=CLINIC_TIMEZONE
+    )
+    cancelled = appointment.status == "cancelled"
+    return _fold(EVENT_TEMPLATE.format(
+        uid=appointment.meeting_link.split("/")[-1],
+        start=_stamp(start),
+        end=_stamp(start + timedelta(minutes=APPOINTMENT_DURATION_MINUTES)),
+        stamp=stamp or _stamp(datetime.now(timezone.utc)),
+        description=_escape(description or f"Virtual consultation with {getattr(appointment, 'doctor_name', None) or 'Doctor'}"),
+        location=_escape(appointment.meeting_link),
+        status="CANCELLED" if cancelled else "CONFIRMED",
+        # Bumped on cancellation so calendar clients replace the earlier copy
+        sequence=1 if cancelled else 0
+    ))
+
+
+def render_calendar(appointments: Iterable, name: str = "Oliva Clinic", method: str = "PUBLISH") -> bytes:
+    """One VCALENDAR holding every appointment, rendered straight to bytes"""
+    stamp = _stamp(datetime.now(timezone.utc))
+    parts = [CALENDAR_HEADER.format(method=method, name=_escape(name))]
+    parts.extend(render_event(appointment, stamp) for appointment in appointments)
+    parts.append(CALENDAR_FOOTER)
+    return _fold("".join(parts)).encode("utf-8")
+
+
+def render_feed(events: Iterable[str], name: str) -> bytes:
+    """Assemble already folded VEVENT blocks (see render_event) into a subscribable calendar"""
+    header = _fold(CALENDAR_HEADER.format(method="PUBLISH", name=_escape(name)))
+    return (header + "".join(events) + CALENDAR_FOOTER).encode("utf-8")
+
+
+def generate_ics_bytes(appointment) -> bytes:
+    """Calendar invite for a single appointment, ready to attach to an email"""
+    return render_calendar([appointment], method="REQUEST")
+
+
+def generate_ics_batch(appointments: Iterable) -> Dict[int, bytes]:
+    """Invites for many appointments at once, keyed by appointment id"""
+    stamp = _stamp(datetime.now(timezone.utc))
+    header = CALENDAR_HEADER.format(method="REQUEST", name="Oliva Clinic")
+    return {
+        appointment.id: _fold(header + render_event(appointment, stamp) + CALENDAR_FOOTER).encode("utf-8")
+        for appointment in appointments
+    }
@@ -4,6 +4,7 @@ from app.config.settings import settings
 from app.controllers.doctor_controller import router as doctor_router
 from app.controllers.appointment_controller import router as appointment_router
 from app.controllers.meeting_controller import router as meeting_router
+from app.controllers.calendar_controller import router as calendar_router
 from app.database.connection import engine, Base, create_schema_if_not_exists
 from app.database.init_db import init_database
 
@@ -34,6 +35,7 @@ app.add_middleware(
 app.include_router(doctor_router)
 app.include_router(appointment_router)
 app.include_router(meeting_router)
+app.include_router(calendar_router)
 
 # Root endpoint
 @app.get("/")